@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Book, BookCopy, BorrowRecord, Author, Fine
+from .models import Category, Book, BookCopy, BorrowRecord, Author, Fine, ChangeEvent
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -15,10 +15,11 @@ class AuthorAdmin(admin.ModelAdmin):
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
-    list_display = ['title', 'isbn', 'published_date', 'recommended', 'category']
+    list_display = ['title', 'isbn', 'published_date', 'recommended', 'category', 'available_copies']
     list_filter = ['category', 'recommended']
     search_fields = ['title', 'isbn']
     filter_horizontal = ['authors']
+    readonly_fields = ['available_copies', 'borrowed_copies', 'lost_copies', 'damaged_copies']  # ✅ Maintained by BookCopy
     ordering = ['title']
 
 @admin.register(BookCopy)
@@ -46,3 +47,9 @@ class FineAdmin(admin.ModelAdmin):
     list_filter = ['paid']
     search_fields = ['borrow_record__student__user_profile__user__username']
     ordering = ['-amount']
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model', 'object_id', 'action', 'created_at']
+    list_filter = ['model', 'action']
+    ordering = ['-id']
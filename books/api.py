@@ -0,0 +1,214 @@
+# ✅ FILE: books/api.py
+
+import base64
+import binascii
+import json
+from datetime import datetime, time
+
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Author, Book, BookCopy, Category
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ApiError(ValueError):
+    """Bad query parameters (message is returned to the client)."""
+
+
+# 🔹 Book fields: name -> value; "copies" is only sent when asked for
+BOOK_FIELDS = {
+    'id': lambda book: book.pk,
+    'title': lambda book: book.title,
+    'isbn': lambda book: book.isbn,
+    'description': lambda book: book.description,
+    'published_date': lambda book: book.published_date,
+    'recommended': lambda book: book.recommended,
+    'category': lambda book: {'id': book.category.pk, 'name': book.category.name} if book.category else None,
+    'authors': lambda book: [{'id': a.pk, 'name': a.name} for a in book.authors.all()],
+    'available_copies': lambda book: book.available_copies,
+    'borrowed_copies': lambda book: book.borrowed_copies,
+    'lost_copies': lambda book: book.lost_copies,
+    'damaged_copies': lambda book: book.damaged_copies,
+    'updated_at': lambda book: book.updated_at,
+    'copies': lambda book: [
+        {'id': c.pk, 'copy_id': c.copy_id, 'status': c.status, 'location': c.library_location}
+        for c in book.bookcopy_set.all()
+    ],
+}
+DEFAULT_BOOK_FIELDS = [name for name in BOOK_FIELDS if name != 'copies']
+BOOK_COLUMNS = {'title', 'isbn', 'description', 'published_date', 'recommended', 'available_copies',
+                'borrowed_copies', 'lost_copies', 'damaged_copies', 'updated_at'}
+
+
+def parse_fields(value, available, default):
+    """``?fields=title,isbn`` -> field names (``id`` is always included)."""
+    if not value:
+        return list(default)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(available))
+    if unknown:
+        raise ApiError(f"unknown fields: {', '.join(unknown)}")
+    return ['id'] + [name for name in dict.fromkeys(fields) if name != 'id']
+
+
+def parse_limit(value):
+    try:
+        limit = int(value or DEFAULT_LIMIT)
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def parse_updated_since(value):
+    """ISO date or datetime; naive values are in TIME_ZONE."""
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None and parse_date(value):
+            moment = datetime.combine(parse_date(value), time.min)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ApiError('updated_since must be an ISO date or datetime')
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+# 🔹 Keyset pagination: the cursor is the order key of the last row sent
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order):
+    """The order key values in ``cursor``, checked field by field (anything else is a 400, not a 500)."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise ApiError('invalid cursor')
+    if not isinstance(values, list) or len(values) != len(order):
+        raise ApiError('invalid cursor')
+    return [_cursor_field(field, value) for field, value in zip(order, values)]
+
+
+def _cursor_field(field, value):
+    if field == 'updated_at':
+        moment = None
+        if isinstance(value, str):
+            try:
+                moment = parse_datetime(value)
+            except ValueError:
+                pass
+        if moment is None:
+            raise ApiError('invalid cursor')
+        return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+    if type(value) is not int:  # ids (bool is an int subclass, so compare the type itself)
+        raise ApiError('invalid cursor')
+    return value
+
+
+def after(order, values):
+    """Rows strictly after ``values`` in ``order`` (a lexicographic row comparison)."""
+    condition = Q(**{f'{order[-1]}__gt': values[-1]})
+    for field, value in zip(reversed(order[:-1]), reversed(values[:-1])):
+        condition = Q(**{f'{field}__gt': value}) | (Q(**{field: value}) & condition)
+    return condition
+
+
+def keyset_page(queryset, order, cursor, limit):
+    """
+    One page of ``queryset`` in ``order`` (the last field must be unique) and the
+    cursor for the next one. Each page is an index range scan, however deep.
+    """
+    if cursor:
+        queryset = queryset.filter(after(order, decode_cursor(cursor, order)))
+    rows = list(queryset.order_by(*order)[:limit + 1])  # One extra row says whether there is a next page
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([_cursor_value(getattr(last, field)) for field in order])
+
+
+def _cursor_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def book_queryset(fields):
+    """Only the columns and relations the requested fields need."""
+    columns = ['id', 'updated_at', *sorted(BOOK_COLUMNS & set(fields))]
+    books = Book.objects.all()
+    if 'category' in fields:
+        books = books.select_related('category')
+        columns.append('category__name')
+    books = books.only(*columns)
+    if 'authors' in fields:
+        books = books.prefetch_related(Prefetch('authors', queryset=Author.objects.only('id', 'name').order_by('pk')))
+    if 'copies' in fields:
+        books = books.prefetch_related(Prefetch('bookcopy_set', queryset=BookCopy.objects.order_by('pk')))
+    return books
+
+
+def serialize(instance, fields, available):
+    return {name: available[name](instance) for name in fields}
+
+
+def book_page(params):
+    """
+    📚 ``?fields=&limit=&cursor=&updated_since=``. Plain listings go by id; with
+    ``updated_since`` rows come in (updated_at, id) order, so a client can page
+    through the changes and keep its last ``updated_at`` for the next poll.
+    Deletions are not listed here; see the change feed.
+    """
+    fields = parse_fields(params.get('fields'), BOOK_FIELDS, DEFAULT_BOOK_FIELDS)
+    books = book_queryset(fields)
+    order = ['id']
+    since = parse_updated_since(params.get('updated_since'))
+    if since:
+        books = books.filter(updated_at__gte=since)
+        order = ['updated_at', 'id']
+    rows, next_cursor = keyset_page(books, order, params.get('cursor'), parse_limit(params.get('limit')))
+    return [serialize(book, fields, BOOK_FIELDS) for book in rows], next_cursor
+
+
+def book_detail(book_id, params):
+    fields = parse_fields(params.get('fields'), BOOK_FIELDS, list(BOOK_FIELDS))
+    book = book_queryset(fields).filter(pk=book_id).first()
+    return serialize(book, fields, BOOK_FIELDS) if book else None
+
+
+AUTHOR_FIELDS = {
+    'id': lambda author: author.pk,
+    'name': lambda author: author.name,
+}
+CATEGORY_FIELDS = {
+    'id': lambda category: category.pk,
+    'name': lambda category: category.name,
+    'location': lambda category: category.location,
+}
+
+
+def _simple_page(queryset, available, params):
+    fields = parse_fields(params.get('fields'), available, available)
+    rows, next_cursor = keyset_page(queryset, ['id'], params.get('cursor'), parse_limit(params.get('limit')))
+    return [serialize(row, fields, available) for row in rows], next_cursor
+
+
+def author_page(params):
+    return _simple_page(Author.objects.all(), AUTHOR_FIELDS, params)
+
+
+def category_page(params):
+    return _simple_page(Category.objects.all(), CATEGORY_FIELDS, params)
+
+
+def envelope(request, results, next_cursor):
+    next_url = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return {'results': results, 'next_cursor': next_cursor, 'next': next_url}
@@ -0,0 +1,74 @@
+# ✅ FILE: books/catalog.py
+
+from django.db import DEFAULT_DB_ALIAS, router
+from django.shortcuts import aget_object_or_404, get_object_or_404
+
+from . import catalog_cache
+from .catalog_cache import AVAILABILITY, BOOKS, book_scope
+from .models import Book, BookCopy
+
+
+async def alist(queryset):
+    """``list(queryset)`` for async code."""
+    return [row async for row in queryset]
+
+
+def book_count():
+    return catalog_cache.get_or_set('book_count', [BOOKS], Book.objects.count)
+
+
+async def abook_count():
+    return await catalog_cache.aget_or_set('book_count', [BOOKS], Book.objects.acount)
+
+
+def _catalog_slice(page_size, number):
+    offset = (number - 1) * page_size
+    return Book.objects.for_catalog().order_by('title', 'id')[offset:offset + page_size]
+
+
+def catalog_page(page_size, number):
+    """Books (with category and authors) on one title-ordered catalog page."""
+    return catalog_cache.get_or_set(
+        f'book_list:{page_size}:{number}', [BOOKS, AVAILABILITY], lambda: list(_catalog_slice(page_size, number)),
+    )
+
+
+async def acatalog_page(page_size, number):
+    return await catalog_cache.aget_or_set(
+        f'book_list:{page_size}:{number}', [BOOKS, AVAILABILITY], lambda: alist(_catalog_slice(page_size, number)),
+    )
+
+
+async def alive_availability(book_ids):
+    """
+    {book id: available_copies} from the primary when catalog reads go to the
+    replica, which can be minutes behind a borrow; {} when they don't.
+    """
+    if router.db_for_read(Book) == DEFAULT_DB_ALIAS:
+        return {}
+    rows = Book.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=book_ids).values_list('pk', 'available_copies')
+    return {pk: available async for pk, available in rows}
+
+
+def book_detail(book_id):
+    """(book, copies) for the detail page; raises Http404 for unknown ids."""
+    def load():
+        book = get_object_or_404(Book.objects.select_related('category'), id=book_id)
+        return book, list(BookCopy.objects.filter(book=book))
+
+    return catalog_cache.get_or_set(f'book_detail:{book_id}', [BOOKS, book_scope(book_id)], load)
+
+
+async def abook_detail(book_id):
+    async def load():
+        # One after the other: the async ORM runs queries on a single thread anyway
+        book = await aget_object_or_404(Book.objects.select_related('category'), id=book_id)
+        return book, await alist(BookCopy.objects.filter(book=book))
+
+    return await catalog_cache.aget_or_set(f'book_detail:{book_id}', [BOOKS, book_scope(book_id)], load)
+
+
+def recommended_books():
+    return catalog_cache.get_or_set(
+        'recommendations', [BOOKS], lambda: list(Book.objects.for_catalog().filter(recommended=True))
+    )
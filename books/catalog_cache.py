@@ -0,0 +1,115 @@
+# ✅ FILE: books/catalog_cache.py
+
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+
+# 🔹 Version scopes
+# 'books'        titles, authors, categories, descriptions (changes a few times a day)
+# 'availability' copy counters of any book (every borrow / return)
+# 'book:<id>'    copies of one book (detail page)
+BOOKS = 'books'
+AVAILABILITY = 'availability'
+
+_MISSING = object()
+
+
+def book_scope(book_id):
+    return f'book:{book_id}'
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope):
+    return f'catalog:version:{scope}'
+
+
+def _fresh_version():
+    # Never restart at 1: if a version key is evicted, entries cached under old versions stay unreachable
+    return int(time.time() * 1000)
+
+
+def versions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = _cache().get_many(keys)
+    for key in keys:
+        if key not in found:
+            _cache().add(key, _fresh_version(), None)
+            found[key] = _cache().get(key)
+    return [found[key] for key in keys]
+
+
+async def aversions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = await _cache().aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await _cache().aadd(key, _fresh_version(), None)
+            found[key] = await _cache().aget(key)
+    return [found[key] for key in keys]
+
+
+async def arow_versions(book_ids):
+    """``'<catalog>.<book>'`` per book id, to key per-book template fragments on."""
+    found = await aversions(BOOKS, *(book_scope(pk) for pk in book_ids))
+    return {pk: f'{found[0]}.{version}' for pk, version in zip(book_ids, found[1:])}
+
+
+def _bump_now(scopes):
+    for scope in scopes:
+        try:
+            _cache().incr(_version_key(scope))
+        except ValueError:  # Not set yet (or evicted)
+            _cache().add(_version_key(scope), _fresh_version(), None)
+
+
+def bump(*scopes):
+    """
+    Make every entry cached under ``scopes`` unreachable. Bumped once now, so the
+    writing transaction reads its own changes, and again after commit, because
+    other requests may have cached the old rows in between.
+    """
+    _bump_now(scopes)
+    transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def bump_books(*book_ids):
+    bump(BOOKS, AVAILABILITY, *(book_scope(pk) for pk in book_ids))
+
+
+def bump_availability(*book_ids):
+    bump(AVAILABILITY, *(book_scope(pk) for pk in book_ids))
+
+
+def _source():
+    # Readers of the replica (possibly minutes behind) and of the primary keep separate
+    # entries: a stale replica page must not be stored under a version a write just bumped
+    return router.db_for_read(apps.get_model('books', 'Book'))
+
+
+def get_or_set(name, scopes, compute):
+    """``compute()`` cached under ``name``, the database read and the current versions of ``scopes``."""
+    timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return compute()  # Caching switched off
+    version = '.'.join(str(v) for v in versions(*scopes))
+    return _cache().get_or_set(f'catalog:{_source()}:{name}:{version}', compute, timeout)
+
+
+async def aget_or_set(name, scopes, compute):
+    """get_or_set() for async views; ``compute`` is a coroutine function."""
+    timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return await compute()
+    version = '.'.join(str(v) for v in await aversions(*scopes))
+    key = f'catalog:{_source()}:{name}:{version}'
+    value = await _cache().aget(key, _MISSING)
+    if value is _MISSING:
+        value = await compute()
+        await _cache().aadd(key, value, timeout)
+    return value
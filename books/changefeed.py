@@ -0,0 +1,64 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Book, BookCopy, BorrowRecord, ChangeEvent, Fine
+
+TRACKED_MODELS = (Book, BookCopy, BorrowRecord, Fine)
+MAX_BATCH = 10000
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def snapshot(instance):
+    data = {field.attname: field.value_from_object(instance) for field in instance._meta.concrete_fields}
+    if isinstance(instance, Book):
+        data['authors'] = sorted(author.pk for author in instance.authors.all())
+    return data
+
+
+def record(instance, action):
+    ChangeEvent.objects.create(
+        model=model_label(type(instance)),
+        object_id=instance.pk,
+        action=action,
+        data=None if action == 'delete' else snapshot(instance),
+    )
+
+
+def record_many(model, ids, action='update'):
+    """Log changes made with update()/bulk_create(), which send no signals."""
+    ids = list(ids)
+    if not ids:
+        return
+    if action == 'delete':
+        events = [ChangeEvent(model=model_label(model), object_id=pk, action=action) for pk in ids]
+    else:
+        queryset = model.objects.filter(pk__in=ids).order_by('pk')
+        if model is Book:
+            queryset = queryset.prefetch_related('authors')
+        events = [
+            ChangeEvent(model=model_label(model), object_id=instance.pk, action=action, data=snapshot(instance))
+            for instance in queryset
+        ]
+    ChangeEvent.objects.bulk_create(events, batch_size=1000)
+
+
+def events_since(cursor=0, limit=1000, models=None):
+    events = ChangeEvent.objects.filter(pk__gt=cursor).order_by('pk')
+    if models:
+        events = events.filter(model__in=models)
+    return list(events[:max(1, min(limit, MAX_BATCH))])
+
+
+def to_jsonl(event):
+    return json.dumps({
+        'id': event.pk,
+        'model': event.model,
+        'object_id': event.object_id,
+        'action': event.action,
+        'created_at': event.created_at,
+        'data': event.data,
+    }, cls=DjangoJSONEncoder) + '\n'
@@ -0,0 +1,132 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.db import OperationalError, transaction
+
+from . import changefeed, dashboard
+from .fines import accrue_fines
+from .models import BookCopy, BorrowRecord, Fine, adjust_copy_counters
+from iam.models import Student
+from subscription.models import StudentSubscription
+
+LOAN_PERIOD_DAYS = 7
+MAX_ATTEMPTS = 5
+CLAIM_CANDIDATES = 5
+RETRY_BASE_DELAY = 0.05  # seconds, doubled on every retry
+
+
+class CirculationError(Exception):
+    """A checkout / return that must not happen (message is user facing)."""
+
+
+class CopyCollision(Exception):
+    """Every candidate copy was claimed by someone else; try again."""
+
+
+def _is_lock_error(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def _with_retries(operation):
+    # Retry lost races and SQLite lock errors with a short jittered backoff
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return operation()
+        except (CopyCollision, OperationalError) as error:
+            if isinstance(error, OperationalError) and not _is_lock_error(error):
+                raise
+            if attempt == MAX_ATTEMPTS - 1:
+                if isinstance(error, CopyCollision):
+                    raise CirculationError('❌ No available copy found.')
+                raise
+            time.sleep(RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def claim_copy(book):
+    """Flip one available copy of ``book`` to borrowed with a conditional UPDATE."""
+    candidates = list(
+        BookCopy.objects.filter(book=book, status='available')
+        .order_by('pk').values_list('pk', flat=True)[:CLAIM_CANDIDATES]
+    )
+    if not candidates:
+        raise CirculationError('❌ No available copy found.')
+
+    for copy_pk in random.sample(candidates, len(candidates)):
+        if BookCopy.objects.filter(pk=copy_pk, status='available').update(status='borrowed'):
+            adjust_copy_counters(book.pk, 'available', 'borrowed')
+            changefeed.record_many(BookCopy, [copy_pk])
+            return BookCopy.objects.get(pk=copy_pk)
+    raise CopyCollision()
+
+
+def check_eligibility(student, today):
+    subscription = (
+        StudentSubscription.objects.select_related('plan')
+        .filter(pk__in=Student.objects.filter(pk=student.pk).values('current_subscription')).first()
+    )
+    if not subscription:
+        raise CirculationError('❌ You must subscribe to a plan before borrowing.')
+
+    if not subscription.is_active(today):
+        raise CirculationError('❌ Your subscription has expired.')
+
+    if Fine.objects.filter(student=student, paid=False).exists():
+        raise CirculationError('❌ You have unpaid fines. Please clear them before borrowing.')
+
+    active_borrows = BorrowRecord.objects.filter(student=student, return_date__isnull=True).count()
+    if active_borrows >= subscription.plan.max_books:
+        raise CirculationError(f'❌ You have reached your limit of {subscription.plan.max_books} books.')
+
+
+def checkout(student, book, today=None):
+    """Issue one copy of ``book`` to ``student`` and return the BorrowRecord."""
+    today = today or date.today()
+
+    def attempt():
+        with transaction.atomic():
+            # Claim first so the checks below run after this transaction holds the
+            # write lock, serialized with other checkouts. claim_copy SELECTs before
+            # its UPDATE, so under a deferred BEGIN the read lock has to be upgraded
+            # and SQLite fails with "database is locked" instead of waiting:
+            # _with_retries retries that, and settings_production avoids it with
+            # transaction_mode=IMMEDIATE (write lock taken at BEGIN).
+            book_copy = claim_copy(book)
+            check_eligibility(student, today)
+            dashboard.invalidate(student.pk)
+            return BorrowRecord.objects.create(
+                student=student,
+                book_copy=book_copy,
+                borrow_date=today,
+                due_date=today + timedelta(days=LOAN_PERIOD_DAYS),
+            )
+
+    return _with_retries(attempt)
+
+
+def return_copy(record, today=None):
+    """Close ``record``, free its copy and raise a fine if it came back late."""
+    today = today or date.today()
+
+    def attempt():
+        with transaction.atomic():
+            closed = BorrowRecord.objects.filter(pk=record.pk, return_date__isnull=True).update(return_date=today)
+            if not closed:
+                raise CirculationError('❌ Book already returned.')
+            record.return_date = today
+            changefeed.record_many(BorrowRecord, [record.pk])
+            dashboard.invalidate(record.student_id)
+
+            copy_id = record.book_copy_id
+            book_id = BookCopy.objects.filter(pk=copy_id).values_list('book_id', flat=True).get()
+            if BookCopy.objects.filter(pk=copy_id, status='borrowed').update(status='available'):
+                adjust_copy_counters(book_id, 'borrowed', 'available')
+                changefeed.record_many(BookCopy, [copy_id])
+
+            if record.return_date > record.due_date:
+                # Same engine as the nightly accrual; replaces any amount accrued while the book was out
+                accrue_fines(today, record_ids=[record.pk])
+                return Fine.objects.filter(borrow_record=record).first()
+            return None
+
+    return _with_retries(attempt)
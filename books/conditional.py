@@ -0,0 +1,97 @@
+# ✅ FILE: books/conditional.py
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .models import Book
+
+# 🔹 Validators for conditional GET. Book.updated_at moves on every write to the
+# book or its copies (see books/signals.py), so a matching ETag means the page
+# would render the same and Django answers 304 before the view runs.
+# condition() calls the validators synchronously, so for async views the
+# value is loaded with the async ORM first and they find it on the request.
+
+
+def _loading_first(load, view):
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        await load(request, *args, **kwargs)
+        return await view(request, *args, **kwargs)
+    return inner
+
+
+def _changed_at_query(book_id):
+    return Book.objects.filter(pk=book_id).values_list('updated_at', flat=True)
+
+
+def _book_changed_at(request, book_id):
+    # etag_func and last_modified_func both ask; one query per request
+    if not hasattr(request, '_book_changed_at'):
+        request._book_changed_at = _changed_at_query(book_id).first()
+    return request._book_changed_at
+
+
+async def _abook_changed_at(request, book_id, **kwargs):
+    if not hasattr(request, '_book_changed_at'):
+        request._book_changed_at = await _changed_at_query(book_id).afirst()
+
+
+def _book_etag(per_user):
+    def etag(request, book_id, **kwargs):
+        changed = _book_changed_at(request, book_id)
+        if changed is None:
+            return None  # Let the view answer 404
+        # HTML pages also show who is logged in, so the tag is per user there
+        return f"{book_id}-{changed.timestamp()}" + (f"-u{request.user.pk}" if per_user else '')
+    return etag
+
+
+def _book_last_modified(request, book_id, **kwargs):
+    return _book_changed_at(request, book_id)
+
+
+def book_condition(per_user=True):
+    """Method decorator for views taking ``book_id``: ETag / Last-Modified and 304s."""
+    def decorate(view):
+        is_async = iscoroutinefunction(view)
+        view = condition(etag_func=_book_etag(per_user), last_modified_func=_book_last_modified)(view)
+        # Private: responses are per login; no-cache: always revalidate (a 304 is cheap)
+        view = cache_control(private=True, no_cache=True)(view)
+        return _loading_first(_abook_changed_at, view) if is_async else view
+    return method_decorator(decorate, name='get')
+
+
+def _catalog_state(request):
+    if not hasattr(request, '_catalog_state'):
+        request._catalog_state = Book.objects.aggregate(count=Count('pk'), changed=Max('updated_at'))
+    return request._catalog_state
+
+
+async def _acatalog_state(request, **kwargs):
+    if not hasattr(request, '_catalog_state'):
+        request._catalog_state = await Book.objects.aaggregate(count=Count('pk'), changed=Max('updated_at'))
+
+
+def _catalog_etag(request, **kwargs):
+    state = _catalog_state(request)
+    # Count catches deletions, which leave no newer updated_at behind
+    return f"{state['count']}-{state['changed'].timestamp() if state['changed'] else 0}"
+
+
+def _catalog_last_modified(request, **kwargs):
+    return _catalog_state(request)['changed']
+
+
+def catalog_condition():
+    """Method decorator for book listings: one cheap aggregate instead of the page."""
+    def decorate(view):
+        is_async = iscoroutinefunction(view)
+        view = condition(etag_func=_catalog_etag, last_modified_func=_catalog_last_modified)(view)
+        view = cache_control(private=True, no_cache=True)(view)
+        return _loading_first(_acatalog_state, view) if is_async else view
+    return method_decorator(decorate, name='get')
@@ -0,0 +1,60 @@
+# ✅ FILE: books/dashboard.py
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import BorrowRecord
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def summary_key(student_id):
+    return f'dashboard:summary:{student_id}'
+
+
+def _summary_aggregates():
+    pending = Q(return_date__isnull=True)
+    return {
+        'total_borrowed': Count('pk'),
+        'total_pending': Count('pk', filter=pending),
+        'total_returned': Count('pk', filter=~pending),
+        'total_fines': Coalesce(Sum('book_fine__amount'), ZERO),
+        'pending_fines': Coalesce(
+            Sum(F('book_fine__amount') - F('book_fine__paid_amount'), filter=Q(book_fine__paid=False)), ZERO,
+        ),
+    }
+
+
+def compute_summary(student_id):
+    """📊 All dashboard counters in one conditional-aggregate query."""
+    return BorrowRecord.objects.filter(student_id=student_id).aggregate(**_summary_aggregates())
+
+
+async def acompute_summary(student_id):
+    return await BorrowRecord.objects.filter(student_id=student_id).aaggregate(**_summary_aggregates())
+
+
+def student_summary(student_id):
+    return cache.get_or_set(
+        summary_key(student_id), lambda: compute_summary(student_id), settings.DASHBOARD_CACHE_TIMEOUT
+    )
+
+
+async def astudent_summary(student_id):
+    summary = await cache.aget(summary_key(student_id))
+    if summary is None:
+        summary = await acompute_summary(student_id)
+        await cache.aadd(summary_key(student_id), summary, settings.DASHBOARD_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate(*student_ids):
+    """Drop cached summaries once the surrounding transaction commits."""
+    keys = [summary_key(student_id) for student_id in student_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
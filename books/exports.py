@@ -0,0 +1,113 @@
+import csv
+import zlib
+from datetime import date
+
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+
+from .models import BorrowRecord
+
+EXPORT_CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+BORROW_RECORD_HEADER = ['Student', 'Book Title', 'Borrow Date', 'Due Date', 'Return Date', 'Overdue', 'Fine Amount', 'Paid']
+
+
+class EchoBuffer:
+    """File-like object for csv.writer that hands each line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv_bytes(header, rows, compress=False):
+    """Yield the CSV as ~64KB byte chunks, optionally gzip compressed."""
+    writer = csv.writer(EchoBuffer())
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    buffer = []
+    size = 0
+
+    def flush(data):
+        return compressor.compress(data) if compressor else data
+
+    for row in _with_header(header, rows):
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            chunk = flush(''.join(buffer).encode('utf-8'))
+            buffer, size = [], 0
+            if chunk:
+                yield chunk
+
+    tail = flush(''.join(buffer).encode('utf-8'))
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+def _with_header(header, rows):
+    yield header
+    yield from rows
+
+
+def csv_response(filename, header, rows, compress=False):
+    response = StreamingHttpResponse(
+        iter_csv_bytes(header, rows, compress=compress),
+        content_type='application/gzip' if compress else 'text/csv',
+    )
+    if compress:
+        filename += '.gz'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def parse_export_filters(params):
+    """Validate ?from=, ?to= (borrow date) and ?status= ; raises ValueError."""
+    filters = {}
+    for key in ('from', 'to'):
+        value = params.get(key)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f'Invalid date for "{key}": {value}')
+            filters[key] = parsed
+    status = params.get('status', '')
+    if status and status not in ('returned', 'pending', 'overdue'):
+        raise ValueError(f'Invalid status: {status}')
+    filters['status'] = status
+    return filters
+
+
+def borrow_record_rows(filters, today=None):
+    today = today or date.today()
+    records = BorrowRecord.objects.all()
+    if filters.get('from'):
+        records = records.filter(borrow_date__gte=filters['from'])
+    if filters.get('to'):
+        records = records.filter(borrow_date__lte=filters['to'])
+    if filters.get('status') == 'returned':
+        records = records.filter(return_date__isnull=False)
+    elif filters.get('status') == 'pending':
+        records = records.filter(return_date__isnull=True)
+    elif filters.get('status') == 'overdue':
+        records = records.filter(return_date__isnull=True, due_date__lt=today)
+
+    # Plain tuples with usernames and fines joined in: no per-row queries, no model instances
+    rows = records.order_by('pk').values_list(
+        'student__user_profile__user__username',
+        'book_copy__book__title',
+        'borrow_date',
+        'due_date',
+        'return_date',
+        'book_fine__amount',
+        'book_fine__paid',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    for username, title, borrow_date, due_date, return_date, fine_amount, paid in rows:
+        overdue = 'Yes' if not return_date and today > due_date else 'No'
+        yield [
+            username, title, borrow_date, due_date, return_date or '', overdue,
+            fine_amount if fine_amount is not None else 0, 'Yes' if paid else 'No',
+        ]
@@ -0,0 +1,114 @@
+# ✅ FILE: books/fines.py
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField, ExpressionWrapper, F, Func, IntegerField, Q, Value,
+)
+from django.db.models.functions import Coalesce, Least
+
+from . import changefeed, dashboard
+from .models import BorrowRecord, Fine
+
+DEFAULT_FINE_PER_DAY = Decimal('10')  # Students without a subscription (same as BorrowRecord.fine_rate)
+MAX_FINE = Decimal('9999.99')  # Fine.amount is max_digits=6
+BATCH_SIZE = 2000
+
+
+class DaysBetween(Func):
+    """Whole days from ``start`` to ``end`` (two DATE expressions), computed by the database."""
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(', **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='DATEDIFF', **extra_context)
+
+
+@dataclass
+class AccrualReport:
+    as_of: date
+    records: int = 0
+    total: Decimal = Decimal('0')
+
+    def __str__(self):
+        return f"{self.records} fines accrued as of {self.as_of} (₹{self.total})"
+
+
+def fine_rate():
+    # Current subscription's plan, like BorrowRecord.fine_rate()
+    return Coalesce(
+        'student__current_subscription__plan__fine_per_day', Value(DEFAULT_FINE_PER_DAY), output_field=DecimalField(),
+    )
+
+
+def accrued_fines(as_of, record_ids=None):
+    """
+    💸 (borrow_record_id, student_id, amount) for every late record as of ``as_of``.
+    Days late run to the return date, or to ``as_of`` for books still out,
+    so the result for a given date never changes when rerun.
+    Records are left out until they owe more than was already paid, so a
+    fine paid while the book is still out reopens for the days since.
+    """
+    records = BorrowRecord.objects.filter(due_date__lt=as_of)
+    if record_ids is None:
+        # Nightly run: only books still out (borrow_open_due_idx); returned books got their final fine on return
+        records = records.filter(return_date__isnull=True)
+    else:
+        records = records.filter(pk__in=record_ids).filter(
+            Q(return_date__isnull=True) | Q(return_date__gt=F('due_date'))
+        )
+
+    end = Least(Coalesce('return_date', Value(as_of)), Value(as_of))
+    amount = ExpressionWrapper(
+        DaysBetween(end, F('due_date')) * fine_rate(),
+        output_field=DecimalField(max_digits=6, decimal_places=2),
+    )
+    return (
+        records.annotate(amount=Least(amount, Value(MAX_FINE)))
+        .filter(amount__gt=Coalesce('book_fine__paid_amount', Value(Decimal('0'))))
+        .order_by().values_list('pk', 'student_id', 'amount')
+    )
+
+
+def accrue_fines(as_of=None, record_ids=None, batch_size=BATCH_SIZE):
+    """
+    📅 Upsert one unpaid Fine per late borrow record: one read query plus
+    one INSERT .. ON CONFLICT per batch. Safe to rerun for any date.
+    Only ``amount - paid_amount`` is owed, so a reopened fine never charges twice.
+    """
+    as_of = as_of or date.today()
+    report = AccrualReport(as_of)
+    with transaction.atomic():
+        rows = list(accrued_fines(as_of, record_ids))
+        for start in range(0, len(rows), batch_size):
+            fines = [
+                Fine(borrow_record_id=record_id, student_id=student_id, amount=amount, paid=False)
+                for record_id, student_id, amount in rows[start:start + batch_size]
+            ]
+            Fine.objects.bulk_create(
+                fines, update_conflicts=True, unique_fields=['borrow_record'], update_fields=['amount', 'paid'],
+            )
+            ids = [fine.pk for fine in fines]  # Set from RETURNING where the backend supports it
+            if None in ids:
+                ids = Fine.objects.filter(
+                    borrow_record_id__in=[fine.borrow_record_id for fine in fines]
+                ).values_list('pk', flat=True)
+            changefeed.record_many(Fine, list(ids))
+        dashboard.invalidate(*{student_id for _, student_id, _ in rows})
+    report.records = len(rows)
+    report.total = sum((amount for _, _, amount in rows), Decimal('0'))
+    return report
@@ -0,0 +1,189 @@
+from dataclasses import dataclass, field
+
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_date
+
+from . import catalog_cache, changefeed, search
+from .models import Author, Book, BookCopy, Category
+
+# CSV layout used by the staff upload page (after the header row)
+COLUMNS = ['title', 'author', 'isbn', 'category', 'description', 'published_date', 'copies']
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_LOCATION = 'Rack A'
+
+
+@dataclass
+class RowError:
+    line: int
+    message: str
+
+    def __str__(self):
+        return f"Line {self.line}: {self.message}"
+
+
+@dataclass
+class IngestReport:
+    rows: int = 0
+    created_books: int = 0
+    linked_books: int = 0
+    created_copies: int = 0
+    created_authors: int = 0
+    created_categories: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def failed_rows(self):
+        return len(self.errors)
+
+    def merge(self, other):
+        for name in ('created_books', 'linked_books', 'created_copies', 'created_authors', 'created_categories'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.errors.extend(other.errors)
+
+
+def parse_row(line, row):
+    if len(row) != len(COLUMNS):
+        raise ValueError(f"expected {len(COLUMNS)} columns, got {len(row)}")
+    values = dict(zip(COLUMNS, (value.strip() for value in row)))
+    if not values['title'] or not values['isbn']:
+        raise ValueError("title and isbn are required")
+    if len(values['isbn']) > 13:
+        raise ValueError(f"ISBN {values['isbn']} is longer than 13 characters")
+    values['published_date'] = parse_date(values['published_date'])
+    if values['published_date'] is None:
+        raise ValueError("published_date must be YYYY-MM-DD")
+    try:
+        values['copies'] = int(values['copies'] or 0)
+    except ValueError:
+        raise ValueError(f"copies must be a number, got {values['copies']!r}")
+    if values['copies'] < 0:
+        raise ValueError("copies cannot be negative")
+    values['line'] = line
+    return values
+
+
+def _resolve_authors(names, report):
+    authors = {}
+    for author in Author.objects.filter(name__in=names).order_by('-pk'):
+        authors[author.name] = author  # Names are not unique: keep the oldest
+    missing = [Author(name=name) for name in names if name not in authors]
+    for author in Author.objects.bulk_create(missing):
+        authors[author.name] = author
+    report.created_authors += len(missing)
+    return authors
+
+
+def _resolve_categories(names, report):
+    categories = {c.name: c for c in Category.objects.filter(name__in=names)}
+    missing = [Category(name=name, location=DEFAULT_LOCATION) for name in names if name not in categories]
+    for category in Category.objects.bulk_create(missing):
+        categories[category.name] = category
+    report.created_categories += len(missing)
+    return categories
+
+
+def _ingest_chunk(rows):
+    report = IngestReport()
+    existing = {b.isbn: b for b in Book.objects.filter(isbn__in={r['isbn'] for r in rows}).only('pk', 'isbn', 'title')}
+
+    # First row per new ISBN creates the book; later rows (and existing ISBNs) only link authors
+    new_rows, link_rows = {}, []
+    for row in rows:
+        known_title = existing[row['isbn']].title if row['isbn'] in existing else new_rows.get(row['isbn'], {}).get('title')
+        if known_title is None:
+            new_rows[row['isbn']] = row
+        elif known_title != row['title']:
+            report.errors.append(RowError(row['line'], f"ISBN {row['isbn']} already belongs to '{known_title}'"))
+        else:
+            link_rows.append(row)
+
+    copy_ids = {f"{r['isbn']}-{i + 1}": r['isbn'] for r in new_rows.values() for i in range(r['copies'])}
+    taken = set()
+    for copy_id in BookCopy.objects.filter(copy_id__in=copy_ids).values_list('copy_id', flat=True):
+        taken.add(copy_ids[copy_id])
+    for isbn in taken:
+        row = new_rows.pop(isbn)
+        report.errors.append(RowError(row['line'], f"copy ids for ISBN {isbn} already exist"))
+    for row in link_rows:
+        if row['isbn'] in taken:  # Its book was never created
+            report.errors.append(RowError(row['line'], f"copy ids for ISBN {row['isbn']} already exist"))
+    link_rows = [r for r in link_rows if r['isbn'] not in taken]
+
+    accepted = list(new_rows.values()) + link_rows
+    authors = _resolve_authors({r['author'] for r in accepted if r['author']}, report)
+    categories = _resolve_categories({r['category'] for r in accepted if r['category']}, report)
+
+    books = Book.objects.bulk_create([
+        Book(
+            title=r['title'],
+            isbn=r['isbn'],
+            description=r['description'],
+            published_date=r['published_date'],
+            category=categories.get(r['category']),
+            available_copies=r['copies'],  # bulk_create skips BookCopy.save, so set the counter here
+        )
+        for r in new_rows.values()
+    ])
+    by_isbn = {**existing, **{b.isbn: b for b in books}}
+
+    Through = Book.authors.through
+    links = {(by_isbn[r['isbn']].pk, authors[r['author']].pk) for r in accepted if r['author']}
+    Through.objects.bulk_create(
+        [Through(book_id=book_id, author_id=author_id) for book_id, author_id in links],
+        ignore_conflicts=True,
+    )
+
+    copies = BookCopy.objects.bulk_create([
+        BookCopy(book=by_isbn[r['isbn']], copy_id=f"{r['isbn']}-{i + 1}", status='available')
+        for r in new_rows.values() for i in range(r['copies'])
+    ])
+
+    # Keep the search index and change feed in step with the batched writes
+    new_ids = [b.pk for b in books]
+    linked_ids = {existing[r['isbn']].pk for r in link_rows if r['isbn'] in existing}
+    search.index_books(new_ids + list(linked_ids))
+    changefeed.record_many(Book, new_ids, 'insert')
+    changefeed.record_many(Book, linked_ids, 'update')
+    changefeed.record_many(BookCopy, [c.pk for c in copies], 'insert')
+    catalog_cache.bump_books(*linked_ids)
+
+    report.created_books += len(books)
+    report.linked_books += len(link_rows)
+    report.created_copies += len(copies)
+    return report
+
+
+def ingest_rows(rows, chunk_size=DEFAULT_CHUNK_SIZE, first_line=2, progress=None):
+    """
+    Load CSV rows (lists in COLUMNS order) into the catalog.
+    Each chunk is one transaction; bad rows are reported, not raised.
+    ``progress(report)`` is called after every chunk.
+    """
+    report = IngestReport()
+    chunk = []
+
+    def flush():
+        if not chunk:
+            return
+        try:
+            with transaction.atomic():
+                report.merge(_ingest_chunk(chunk))
+        except DatabaseError as e:
+            report.errors.extend(RowError(r['line'], f"not saved: {e}") for r in chunk)
+        chunk.clear()
+        if progress:
+            progress(report)
+
+    for offset, row in enumerate(rows):
+        line = first_line + offset
+        if not any(value.strip() for value in row):
+            continue
+        report.rows += 1
+        try:
+            chunk.append(parse_row(line, row))
+        except ValueError as e:
+            report.errors.append(RowError(line, str(e)))
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return report
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from books.fines import accrue_fines
+
+
+class Command(BaseCommand):
+    help = 'Accrue fines for every late borrow record (safe to rerun for any date)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Accrue as of this day (YYYY-MM-DD), default today')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Fines upserted per statement')
+
+    def handle(self, *args, **options):
+        report = accrue_fines(options['date'], batch_size=options['batch_size'])
+        self.stdout.write(f"✅ {report}")
@@ -0,0 +1,45 @@
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from lms_project import benchmarks
+from lms_project.sample_data import build_library
+
+
+class Command(BaseCommand):
+    help = 'Concurrent slow clients against the catalog / dashboard pages under WSGI (threads) and ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--books', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--clients', type=int, nargs='+', default=[8, 32, 128], help='Concurrent connections')
+        parser.add_argument('--requests', type=int, default=3, help='Requests per connection')
+        parser.add_argument('--client-ms', type=int, default=1000, help='Time each client takes to read a response')
+        parser.add_argument('--workers', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('--json', metavar='PATH', help='Write the report as JSON')
+
+    def handle(self, *args, **options):
+        # 🧪 Throwaway test database, as in benchmark_views
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            library = build_library(students=options['students'], books=options['books'], seed=options['seed'])
+            results = benchmarks.run_concurrency(
+                library, servers=options['servers'], clients=options['clients'], requests=options['requests'],
+                client_ms=options['client_ms'], workers=options['workers'],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(benchmarks.format_load_table(results))
+        if options['json']:
+            meta = {key: options[key] for key in ('students', 'books', 'seed', 'requests', 'client_ms', 'workers')}
+            report = {'meta': meta, 'results': [asdict(r) for r in results]}
+            Path(options['json']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"💾 Saved {options['json']}")
@@ -0,0 +1,65 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from lms_project import benchmarks
+from lms_project.sample_data import build_library
+
+
+class Command(BaseCommand):
+    help = 'Time every catalog, dashboard, export and circulation view (p50/p95, queries, peak memory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--books', type=int, default=2000)
+        parser.add_argument('--loans', type=int, default=20, help='Loans per student')
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', nargs='*', help='Endpoint names or groups (catalog, dashboard, export, circulation)')
+        parser.add_argument('--json', metavar='PATH', help='Write the report as JSON (for --compare later)')
+        parser.add_argument('--compare', metavar='PATH', help='Show deltas against an earlier --json report')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+
+        # 🧪 Throwaway test database, so runs are comparable and nothing real is touched
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.stdout.write("📚 Generating dataset ...")
+            library = build_library(
+                students=options['students'], books=options['books'], loans_per_student=options['loans'],
+                years=options['years'], seed=options['seed'],
+            )
+            self.stdout.write(
+                f"   {library.books} books, {library.copies} copies, {library.students} students, {library.records} loans"
+            )
+            results = benchmarks.run(
+                library, iterations=options['iterations'], warmup=options['warmup'], only=options['only'],
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(benchmarks.format_table(results, baseline))
+        if options['json']:
+            meta = {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                **{key: options[key] for key in ('students', 'books', 'loans', 'years', 'seed', 'iterations')},
+            }
+            Path(options['json']).write_text(benchmarks.to_json(results, meta))
+            self.stdout.write(f"💾 Saved {options['json']}")
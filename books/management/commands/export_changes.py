@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from books import changefeed
+
+
+class Command(BaseCommand):
+    help = 'Write change-feed events after a cursor as JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help='Last event id already synced')
+        parser.add_argument('--limit', type=int, default=changefeed.MAX_BATCH)
+        parser.add_argument('--model', action='append', help='Only this model, e.g. books.book (repeatable)')
+        parser.add_argument('--all', action='store_true', help='Keep paging until the feed is drained')
+
+    def handle(self, *args, **options):
+        cursor = options['since']
+        total = 0
+        while True:
+            events = changefeed.events_since(cursor, options['limit'], models=options['model'])
+            for event in events:
+                self.stdout.write(changefeed.to_jsonl(event), ending='')
+            total += len(events)
+            if events:
+                cursor = events[-1].pk
+            if not options['all'] or len(events) < min(options['limit'], changefeed.MAX_BATCH):
+                break
+
+        self.stderr.write(f"✅ {total} changes exported. Next cursor: {cursor}")
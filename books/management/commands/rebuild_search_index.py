@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for the book catalog'
+
+    def handle(self, *args, **kwargs):
+        if not search.fts_enabled():
+            self.stdout.write("⚠️ Full-text search needs SQLite FTS5. Nothing to rebuild.")
+            return
+
+        with transaction.atomic():
+            count = search.rebuild_index()
+
+        self.stdout.write(f"✅ Search index rebuilt for {count} books.")
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from books import catalog_cache
+from books.models import Book, BookCopy, COPY_COUNTER_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Backfill / repair the per-status copy counters stored on Book'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Books checked per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        fields = list(COPY_COUNTER_FIELDS.values())
+        checked = repaired = 0
+        last_id = 0
+        now = timezone.now()
+
+        while True:
+            # Keyset walk over book ids keeps every chunk an indexed range scan
+            with transaction.atomic():
+                books = list(
+                    Book.objects.filter(pk__gt=last_id).order_by('pk').only('pk', *fields)[:chunk_size]
+                )
+                if not books:
+                    break
+                last_id = books[-1].pk
+
+                actual = {}
+                rows = (
+                    BookCopy.objects.filter(book_id__gte=books[0].pk, book_id__lte=last_id)
+                    .values('book_id', 'status').annotate(n=Count('pk')).order_by()
+                )
+                for row in rows:
+                    field = COPY_COUNTER_FIELDS.get(row['status'])
+                    if field:
+                        actual.setdefault(row['book_id'], {})[field] = row['n']
+
+                drifted = []
+                for book in books:
+                    counts = actual.get(book.pk, {})
+                    if any(getattr(book, f) != counts.get(f, 0) for f in fields):
+                        for f in fields:
+                            setattr(book, f, counts.get(f, 0))
+                        book.updated_at = now
+                        drifted.append(book)
+
+                if drifted and not options['dry_run']:
+                    Book.objects.bulk_update(drifted, fields + ['updated_at'])
+                    catalog_cache.bump_availability(*(book.pk for book in drifted))
+
+            checked += len(books)
+            repaired += len(drifted)
+
+        verb = 'would be repaired' if options['dry_run'] else 'repaired'
+        self.stdout.write(f"✅ Checked {checked} books, {repaired} {verb}.")
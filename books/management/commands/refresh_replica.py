@@ -0,0 +1,21 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from lms_project.replica import refresh_replica
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the read replica (online backup, safe while serving)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='Replica file, default DATABASES["replica"]["NAME"]')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            size = refresh_replica(options['target'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"✅ Replica refreshed ({size / 1024 / 1024:.1f} MB) in {time.monotonic() - started:.2f}s.")
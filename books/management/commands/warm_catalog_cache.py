@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from books import catalog
+from books.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Fill the catalog page cache (first list pages, recommendations, detail pages) after a deploy or flush'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5, help='Catalog list pages at the default page size')
+        parser.add_argument('--details', type=int, default=100, help='Detail pages, in catalog order')
+
+    def handle(self, *args, **options):
+        if not settings.CATALOG_CACHE_TIMEOUT:
+            self.stdout.write("⚠️ CATALOG_CACHE_TIMEOUT is 0, the catalog cache is off.")
+            return
+
+        page_size = settings.CATALOG_PAGE_SIZE
+        pages = min(options['pages'], -(-catalog.book_count() // page_size))
+        for number in range(1, pages + 1):
+            catalog.catalog_page(page_size, number)
+        catalog.recommended_books()
+
+        book_ids = list(Book.objects.order_by('title', 'id').values_list('pk', flat=True)[:options['details']])
+        for book_id in book_ids:
+            catalog.book_detail(book_id)
+        self.stdout.write(f"✅ Warmed {pages} list pages, recommendations and {len(book_ids)} detail pages.")
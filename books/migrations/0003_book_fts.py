@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS books_book_fts USING fts5("
+        "title, authors, isbn, category, description, tokenize='unicode61')"
+    )
+    schema_editor.execute(
+        "INSERT INTO books_book_fts (rowid, title, authors, isbn, category, description) "
+        "SELECT b.id, b.title, "
+        "COALESCE((SELECT group_concat(a.name, ' ') FROM books_book_authors ba "
+        "JOIN books_author a ON a.id = ba.author_id WHERE ba.book_id = b.id), ''), "
+        "b.isbn, COALESCE(c.name, ''), b.description "
+        "FROM books_book b LEFT JOIN books_category c ON c.id = b.category_id"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS books_book_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_copy_counters(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    BookCopy = apps.get_model('books', 'BookCopy')
+    counters = {}
+    for status in ('available', 'borrowed', 'lost', 'damaged'):
+        per_book = (
+            BookCopy.objects.filter(book=OuterRef('pk'), status=status)
+            .order_by().values('book').annotate(n=Count('pk')).values('n')
+        )
+        counters[f'{status}_copies'] = Coalesce(Subquery(per_book, output_field=IntegerField()), Value(0))
+    Book.objects.update(**counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='available_copies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='borrowed_copies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='damaged_copies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='lost_copies',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_copy_counters, migrations.RunPython.noop),
+    ]
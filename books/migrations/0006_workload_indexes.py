@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_change_event'),
+        ('iam', '0002_student_current_subscription'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookcopy',
+            index=models.Index(fields=['book', 'status'], name='bookcopy_book_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(fields=['student', 'return_date'], name='borrow_student_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['due_date'], name='borrow_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fine',
+            index=models.Index(condition=models.Q(('paid', False)), fields=['borrow_record'], name='fine_unpaid_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_book_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fine',
+            name='paid_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=6),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_fine_student(apps, schema_editor):
+    BorrowRecord = apps.get_model('books', 'BorrowRecord')
+    Fine = apps.get_model('books', 'Fine')
+    Fine.objects.update(student_id=Subquery(
+        BorrowRecord.objects.filter(pk=OuterRef('borrow_record_id')).values('student_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_fine_paid_amount'),
+        ('iam', '0002_student_current_subscription'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='fine',
+            name='fine_unpaid_idx',
+        ),
+        migrations.AddField(
+            model_name='fine',
+            name='student',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='iam.student'),
+        ),
+        migrations.RunPython(backfill_fine_student, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='fine',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='iam.student'),
+        ),
+        migrations.AddIndex(
+            model_name='fine',
+            index=models.Index(fields=['student', 'paid'], name='fine_student_paid_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:31
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_fine_student'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='borrowrecord',
+            name='borrow_date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
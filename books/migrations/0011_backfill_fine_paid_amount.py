@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:30
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_paid_amount(apps, schema_editor):
+    # Fines paid before paid_amount existed were paid in full
+    Fine = apps.get_model('books', 'Fine')
+    Fine.objects.filter(paid=True).update(paid_amount=F('amount'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_borrow_date_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_paid_amount, migrations.RunPython.noop),
+    ]
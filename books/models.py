@@ -1,5 +1,9 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from datetime import date
+from . import catalog_cache
 from iam.models import Student, UserProfile
 from subscription.models import StudentSubscription, SubscriptionPlan  
 
@@ -21,6 +25,13 @@ class Category(models.Model):
         return self.name
 
 
+# 🔹 Catalog queries
+class BookQuerySet(models.QuerySet):
+    def for_catalog(self):
+        # One query for books + category (+ stored counters), one prefetch for authors
+        return self.select_related('category').prefetch_related('authors')
+
+
 # 🔹 Book Info
 class Book(models.Model):
     title = models.CharField(max_length=200)  # Book name
@@ -32,11 +43,58 @@ class Book(models.Model):
     recommended = models.BooleanField(default=False)  # Recommended Books
     allowed_in_plans = models.ManyToManyField(SubscriptionPlan, blank=True)  #Subscription plan allow to books
 
+    # Copy counters per status, kept up to date by BookCopy writes
+    available_copies = models.PositiveIntegerField(default=0)
+    borrowed_copies = models.PositiveIntegerField(default=0)
+    lost_copies = models.PositiveIntegerField(default=0)
+    damaged_copies = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)  # Also touched by counter, author and category changes (API polling)
+
+    objects = BookQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='book_updated_idx'),  # API ?updated_since= keyset
+        ]
+
     def available_copies_count(self):
-        return self.bookcopy_set.filter(status='available').count()
+        return self.available_copies
+
+
+# 🔹 BookCopy.status -> Book counter column
+COPY_COUNTER_FIELDS = {
+    'available': 'available_copies',
+    'borrowed': 'borrowed_copies',
+    'lost': 'lost_copies',
+    'damaged': 'damaged_copies',
+}
+
+
+def adjust_copy_counters(book_id, from_status=None, to_status=None):
+    """Move one copy between status counters of a book (None = copy added/removed)."""
+    if from_status == to_status:
+        return
+    changes = {}
+    if from_status in COPY_COUNTER_FIELDS:
+        field = COPY_COUNTER_FIELDS[from_status]
+        changes[field] = F(field) - 1
+    if to_status in COPY_COUNTER_FIELDS:
+        field = COPY_COUNTER_FIELDS[to_status]
+        changes[field] = F(field) + 1
+    if changes:
+        Book.objects.filter(pk=book_id).update(**changes, updated_at=timezone.now())
+        catalog_cache.bump_availability(book_id)
+    return bool(changes)
+
+
+def touch_copy_book(book_id):
+    """A copy changed without moving a counter (location, copy id): its book's pages change all the same."""
+    Book.objects.filter(pk=book_id).update(updated_at=timezone.now())
+    catalog_cache.bump_availability(book_id)
 
 
 # 🔹 Book Copies
@@ -56,44 +114,74 @@ class BookCopy(models.Model):
     def __str__(self):
         return f"{self.book.title} - {self.copy_id} - {self.status}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['book', 'status'], name='bookcopy_book_status_idx'),  # claim_copy, counters
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the counters currently reflect for this copy
+        if 'book_id' in instance.__dict__ and 'status' in instance.__dict__:
+            instance._counted = (instance.book_id, instance.status)
+        return instance
+
+    def counted_state(self):
+        if hasattr(self, '_counted'):
+            return self._counted
+        if self._state.adding or self.pk is None:
+            return (None, None)
+        return BookCopy.objects.filter(pk=self.pk).values_list('book_id', 'status').first() or (None, None)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old_book_id, old_status = self.counted_state()
+            super().save(*args, **kwargs)
+            if old_book_id != self.book_id:
+                if old_book_id is not None and not adjust_copy_counters(old_book_id, from_status=old_status):
+                    touch_copy_book(old_book_id)
+                counted = adjust_copy_counters(self.book_id, to_status=self.status)
+            else:
+                counted = adjust_copy_counters(self.book_id, old_status, self.status)
+            if not counted:
+                touch_copy_book(self.book_id)  # Counter updates already touch the book once
+        self._counted = (self.book_id, self.status)
+
 
 # 🔹 Borrow Record
 class BorrowRecord(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)  # Which student can borrow 
     book_copy = models.ForeignKey(BookCopy, on_delete=models.CASCADE)  # Which copies borrow
-    borrow_date = models.DateField(auto_now_add=True)  
+    borrow_date = models.DateField(default=date.today)  # circulation.checkout passes its own 'today'
     due_date = models.DateField() 
     return_date = models.DateField(null=True, blank=True) 
 
     def __str__(self):
         return f"{self.student.user_profile.user.username} - {self.book_copy.book.title}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'return_date'], name='borrow_student_return_idx'),  # eligibility, dashboard
+            models.Index(
+                fields=['due_date'], condition=models.Q(return_date__isnull=True), name='borrow_open_due_idx',
+            ),  # reminders, fine accrual: only books still out
+        ]
+
     def is_late(self):
         return self.return_date and self.return_date > self.due_date
 
     def get_fine_amount(self):
-
+        # Per-record version of books.fines.accrued_fines (used for a single record on screen)
         if self.return_date and self.return_date > self.due_date:
-            late_days = (self.return_date - self.due_date).days
-            try:
-                subscription = StudentSubscription.objects.filter(student=self.student).last()
-                if subscription:
-                    fine_rate = subscription.plan.fine_per_day
-                    return late_days * fine_rate
-            except StudentSubscription.DoesNotExist:
-                pass
-            return late_days * 10  
+            return (self.return_date - self.due_date).days * self.fine_rate()
         return 0
 
     def fine_rate(self):
-
-        try:
-            subscription = StudentSubscription.objects.filter(student=self.student).last()
-            if subscription:
-                return subscription.plan.fine_per_day
-        except StudentSubscription.DoesNotExist:
-            return 10
-        return 10
+        plan = SubscriptionPlan.objects.filter(
+            pk__in=Student.objects.filter(pk=self.student_id).values('current_subscription__plan')
+        ).first()
+        return plan.fine_per_day if plan else 10
 
 
 # 🔹 Fine Model
@@ -103,8 +191,44 @@ class Fine(models.Model):
         on_delete=models.CASCADE,
         related_name='book_fine'
     )  
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, db_index=False)  # Copy of borrow_record.student; indexed below
     amount = models.DecimalField(max_digits=6, decimal_places=2)  
     paid = models.BooleanField(default=False) 
+    paid_amount = models.DecimalField(max_digits=6, decimal_places=2, default=0)  # Paid so far; a book kept out keeps accruing
 
     def __str__(self):
         return f"{self.borrow_record} - ₹{self.amount}"
+
+    def save(self, *args, **kwargs):
+        if self.student_id is None:
+            self.student_id = self.borrow_record.student_id
+        if self.paid and self.paid_amount < self.amount:
+            self.paid_amount = self.amount  # Ticked in the admin: paid in full, so accrual won't reopen it
+        super().save(*args, **kwargs)
+
+    @property
+    def outstanding(self):
+        return self.amount - self.paid_amount
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'paid'], name='fine_student_paid_idx'),  # a student's unpaid fines
+        ]
+
+
+# 🔹 Change feed (append-only; id is the sync cursor)
+class ChangeEvent(models.Model):
+    ACTION_CHOICES = [
+        ('insert', 'Insert'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    model = models.CharField(max_length=50)  # e.g. "books.book"
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # Row snapshot, empty for deletes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.model}:{self.object_id}"
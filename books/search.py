@@ -0,0 +1,115 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, router
+
+from .models import Author, Book, Category
+
+# 🔹 SQLite FTS5 index over the catalog (rowid == Book.id)
+FTS_TABLE = 'books_book_fts'
+
+# bm25 weights: title, authors, isbn, category, description
+FTS_WEIGHTS = (10.0, 6.0, 8.0, 3.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def create_index():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, authors, isbn, category, description, tokenize='unicode61')"
+        )
+
+
+def _index_sql(where):
+    book = Book._meta.db_table
+    category = Category._meta.db_table
+    author = Author._meta.db_table
+    through = Book.authors.through._meta.db_table
+    return (
+        f"INSERT INTO {FTS_TABLE} (rowid, title, authors, isbn, category, description) "
+        f"SELECT b.id, b.title, "
+        f"COALESCE((SELECT group_concat(a.name, ' ') FROM {through} ba "
+        f"JOIN {author} a ON a.id = ba.author_id WHERE ba.book_id = b.id), ''), "
+        f"b.isbn, COALESCE(c.name, ''), b.description "
+        f"FROM {book} b LEFT JOIN {category} c ON c.id = b.category_id {where}"
+    )
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def index_books(book_ids):
+    """Re-index the given books (rows for missing books are just removed)."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(book_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(_index_sql(f"WHERE b.id IN ({placeholders})"), chunk)
+
+
+def remove_books(book_ids):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        for chunk in _chunks(book_ids):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def rebuild_index():
+    """Drop every row and re-index the whole catalog. Returns the row count."""
+    if not fts_enabled():
+        return 0
+    create_index()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_index_sql(''))
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match_query(query):
+    # Every word must match; the last one is a prefix so "harr pot" finds "Harry Potter"
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_book_ids(query, limit=None):
+    """Return book ids matching ``query``, best match first."""
+    match = build_match_query(query)
+    if not match:
+        return []
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY bm25({FTS_TABLE}, {weights}), rowid"
+    )
+    params = [match]
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    # Raw SQL skips the routers, so ask them where Book reads go (the replica, on search pages)
+    with connections[router.db_for_read(Book)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+async def asearch_book_ids(query, limit=None):
+    # Raw cursors have no async API; this runs on the request's database thread like the async ORM
+    return await sync_to_async(search_book_ids)(query, limit=limit)
@@ -0,0 +1,145 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog_cache, changefeed, dashboard, search
+from .models import Author, Book, BookCopy, Category, Fine, adjust_copy_counters, touch_copy_book
+
+
+# 🔹 Keep the full-text index in sync with the catalog
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, **kwargs):
+    search.index_books([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    search.remove_books([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def index_book_authors(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        search.index_books([instance.pk])
+    elif action == 'pre_clear':
+        # Author side: remember the books before the links disappear
+        instance._fts_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.index_books(getattr(instance, '_fts_book_ids', []))
+    else:
+        search.index_books(pk_set or [])
+
+
+@receiver(post_save, sender=Author)
+def index_author_books(sender, instance, created, **kwargs):
+    if not created:
+        search.index_books(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Category)
+def index_category_books(sender, instance, created, **kwargs):
+    if not created:
+        search.index_books(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Category)
+def remember_linked_books(sender, instance, **kwargs):
+    instance._fts_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Category)
+def reindex_linked_books(sender, instance, **kwargs):
+    search.index_books(getattr(instance, '_fts_book_ids', []))
+
+
+# 🔹 Copy counters on Book, which also touch the book and bump its cached pages
+# (BookCopy.save handles saves; deletes can cascade, so they are handled here)
+@receiver(post_delete, sender=BookCopy)
+def uncount_deleted_copy(sender, instance, **kwargs):
+    book_id, status = getattr(instance, '_counted', (instance.book_id, instance.status))
+    if not adjust_copy_counters(book_id, from_status=status):
+        touch_copy_book(book_id)
+
+
+# 🔹 Change feed for downstream sync
+def record_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        changefeed.record(instance, 'insert' if created else 'update')
+
+
+def record_deleted(sender, instance, **kwargs):
+    changefeed.record(instance, 'delete')
+
+
+for tracked_model in changefeed.TRACKED_MODELS:
+    post_save.connect(record_saved, sender=tracked_model, dispatch_uid=f'changefeed_save_{tracked_model.__name__}')
+    post_delete.connect(record_deleted, sender=tracked_model, dispatch_uid=f'changefeed_delete_{tracked_model.__name__}')
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def record_book_authors(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        changefeed.record(instance, 'update')
+    elif pk_set:
+        changefeed.record_many(Book, pk_set)
+
+
+# 🔹 Paying (or editing) a fine changes the student's dashboard totals
+@receiver(post_save, sender=Fine)
+@receiver(post_delete, sender=Fine)
+def invalidate_fine_dashboard(sender, instance, **kwargs):
+    dashboard.invalidate(instance.student_id)
+
+
+# 🔹 Cached catalog pages (books.catalog_cache): new versions on every catalog write
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def bump_book_pages(sender, instance, **kwargs):
+    catalog_cache.bump_books(instance.pk)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_pages(sender, instance, **kwargs):
+    catalog_cache.bump_books()
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def bump_author_pages(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        catalog_cache.bump_books(*([] if reverse else [instance.pk]))
+
+
+# 🔹 Book.updated_at (API ?updated_since=): author / category edits change the book payload too.
+# Python timestamps, not Now(): SQLite compares the stored text, so every write must use one format.
+def touch_books(book_ids):
+    Book.objects.filter(pk__in=list(book_ids)).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Category)
+def touch_linked_books(sender, instance, created, **kwargs):
+    if not created:
+        instance.book_set.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Category)
+def touch_unlinked_books(sender, instance, **kwargs):
+    touch_books(getattr(instance, '_fts_book_ids', []))
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def touch_author_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        touch_books((pk_set or []) if reverse else [instance.pk])
+    elif action == 'post_clear':
+        touch_books(getattr(instance, '_fts_book_ids', []) if reverse else [instance.pk])
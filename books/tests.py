@@ -1,7 +1,37 @@
-from django.test import TestCase
+import copy
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import unittest
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import CommandError, call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, connections, transaction
+from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from iam.models import Student, UserProfile
-from .models import Category, Author, Book, BookCopy, BorrowRecord
+from .models import Category, Author, Book, BookCopy, BorrowRecord, Fine, ChangeEvent
+from . import api, changefeed, circulation, dashboard, fines, ingest, search
+from subscription.models import StudentSubscription, SubscriptionPlan
+from lms_project.replica import PIN_COOKIE, ReplicaRouter, reading_from_replica, refresh_replica, replica_available
+from lms_project.query_budget import QueryBudgetTestMixin, fingerprint
+from lms_project.sample_data import PASSWORD, build_library
 from datetime import date, timedelta
 
 class BookModelTest(TestCase):
@@ -22,7 +52,7 @@ class BookModelTest(TestCase):
             isbn='1234567890123',
             category=self.category,
             description='A test book.',
-            published_date='2020',
+            published_date=date(2020, 1, 1),
             recommended=True
         )
         self.book.authors.add(self.author)
@@ -30,7 +60,7 @@ class BookModelTest(TestCase):
         self.copy = BookCopy.objects.create(
             book=self.book,
             status='available',
-            no_of_copies='C001'
+            copy_id='C001'
         )
 
     def test_book_creation(self):
@@ -47,3 +77,1236 @@ class BookModelTest(TestCase):
         )
         self.assertEqual(borrow.book_copy.status, 'available')
         self.assertEqual(borrow.student.roll_number, '101')
+
+
+class BookListViewTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass')
+        self.client.login(username='reader', password='testpass')
+        category = Category.objects.create(name='Fiction', location='Rack B')
+        author = Author.objects.create(name='Writer')
+        for i in range(30):
+            book = Book.objects.create(
+                title=f'Book {i:02d}',
+                isbn=f'978000000{i:04d}',
+                category=category,
+                description='Catalog book.',
+                published_date=date(2020, 1, 1),
+            )
+            book.authors.add(author)
+            BookCopy.objects.create(book=book, copy_id=f'C-{i}-1', status='available')
+            BookCopy.objects.create(book=book, copy_id=f'C-{i}-2', status='borrowed')
+
+    def test_page_is_annotated_with_availability(self):
+        response = self.client.get(reverse('books:book_list'))
+        rows = response.context['book_data']
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]['available_copies'], 1)
+        self.assertTrue(rows[0]['can_borrow'])
+
+    @override_settings(CATALOG_CACHE_TIMEOUT=0)  # Measure the database path, not the catalog cache
+    def test_query_count_does_not_grow_with_page_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('books:book_list'), {'per_page': 5})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(reverse('books:book_list'), {'per_page': 30})
+        self.assertEqual(len(small), len(large))
+
+    def test_page_size_is_capped(self):
+        with self.settings(CATALOG_MAX_PAGE_SIZE=10):
+            response = self.client.get(reverse('books:book_list'), {'per_page': 1000})
+        self.assertEqual(len(response.context['book_data']), 10)
+
+
+class BookSearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='testpass')
+        self.client.login(username='searcher', password='testpass')
+        self.category = Category.objects.create(name='Astronomy', location='Rack C')
+        self.author = Author.objects.create(name='Carl Sagan')
+        self.cosmos = Book.objects.create(
+            title='Cosmos', isbn='9780345539434', category=self.category,
+            description='A journey through space.', published_date=date(1980, 1, 1),
+        )
+        self.cosmos.authors.add(self.author)
+        self.other = Book.objects.create(
+            title='Pale Blue Dot', isbn='9780345376596',
+            description='Follow-up to Cosmos.', published_date=date(1994, 1, 1),
+        )
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(search.search_book_ids('cosmos'), [self.cosmos.pk, self.other.pk])
+
+    def test_matches_author_isbn_prefix_and_category(self):
+        self.assertEqual(search.search_book_ids('sagan'), [self.cosmos.pk])
+        self.assertEqual(search.search_book_ids('97803455'), [self.cosmos.pk])
+        self.assertEqual(search.search_book_ids('astro'), [self.cosmos.pk])
+
+    def test_index_follows_author_and_category_changes(self):
+        self.author.name = 'Ann Druyan'
+        self.author.save()
+        self.category.name = 'Space'
+        self.category.save()
+        self.assertEqual(search.search_book_ids('sagan'), [])
+        self.assertEqual(search.search_book_ids('druyan space'), [self.cosmos.pk])
+
+        self.cosmos.authors.remove(self.author)
+        self.assertEqual(search.search_book_ids('druyan'), [])
+
+    def test_deleted_book_leaves_index(self):
+        self.cosmos.delete()
+        self.assertEqual(search.search_book_ids('cosmos'), [self.other.pk])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(search.search_book_ids('cosmos'), [self.cosmos.pk, self.other.pk])
+
+    def test_search_view_uses_ranked_order(self):
+        response = self.client.get(reverse('books:search_books'), {'q': 'cosmos'})
+        self.assertEqual([item['book'] for item in response.context['book_data']], [self.cosmos, self.other])
+
+
+class BookCopyCounterTest(TestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Counted', isbn='9781111111111', description='x', published_date=date(2021, 1, 1),
+        )
+        self.copy = BookCopy.objects.create(book=self.book, copy_id='CNT-1')
+        BookCopy.objects.create(book=self.book, copy_id='CNT-2', status='lost')
+
+    def counters(self):
+        self.book.refresh_from_db()
+        return (self.book.available_copies, self.book.borrowed_copies,
+                self.book.lost_copies, self.book.damaged_copies)
+
+    def test_counters_follow_copy_writes(self):
+        self.assertEqual(self.counters(), (1, 0, 1, 0))
+
+        copy = BookCopy.objects.get(pk=self.copy.pk)
+        copy.status = 'borrowed'
+        copy.save()
+        self.assertEqual(self.counters(), (0, 1, 1, 0))
+
+        copy.status = 'damaged'
+        copy.save()
+        copy.save()
+        self.assertEqual(self.counters(), (0, 0, 1, 1))
+
+        copy.delete()
+        self.assertEqual(self.counters(), (0, 0, 1, 0))
+
+    def test_each_copy_write_updates_its_book_once(self):
+        copy = BookCopy.objects.get(pk=self.copy.pk)
+        for field, value in [('status', 'borrowed'), ('library_location', 'Annex')]:
+            with self.subTest(field), CaptureQueriesContext(connection) as queries:
+                setattr(copy, field, value)
+                copy.save()
+            book_updates = [q for q in queries if q['sql'].startswith('UPDATE "books_book"')]
+            self.assertEqual(len(book_updates), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.borrowed_copies, 1)
+
+    def test_cascade_delete_keeps_other_books_intact(self):
+        other = Book.objects.create(title='Other', isbn='9782222222222', description='x', published_date=date(2021, 1, 1))
+        BookCopy.objects.create(book=other, copy_id='OTH-1')
+        self.book.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.available_copies, 1)
+
+    def test_reconcile_repairs_drift(self):
+        Book.objects.filter(pk=self.book.pk).update(available_copies=7, lost_copies=0)
+        out = io.StringIO()
+        call_command('reconcile_book_counters', chunk_size=1, stdout=out)
+        self.assertIn('1 repaired', out.getvalue())
+        self.assertEqual(self.counters(), (1, 0, 1, 0))
+
+
+class CirculationTest(TestCase):
+
+    def setUp(self):
+        self.plan = SubscriptionPlan.objects.create(name='Basic', max_books=2, duration_days=30, price=100, fine_per_day=5)
+        self.student = self.make_student('alice', '201')
+        self.book = Book.objects.create(title='Loaned', isbn='9783333333333', description='x', published_date=date(2019, 1, 1))
+        self.copy = BookCopy.objects.create(book=self.book, copy_id='LN-1')
+
+    def make_student(self, username, roll):
+        user = User.objects.create_user(username=username, password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email=f'{username}@example.com', emergency_contact_no='2')
+        student = Student.objects.create(user_profile=profile, roll_number=roll, branch='CS', year=1)
+        StudentSubscription.objects.create(student=student, plan=self.plan)
+        return student
+
+    def test_checkout_claims_copy_and_updates_counters(self):
+        record = circulation.checkout(self.student, self.book)
+        self.copy.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(record.book_copy, self.copy)
+        self.assertEqual(self.copy.status, 'borrowed')
+        self.assertEqual((self.book.available_copies, self.book.borrowed_copies), (0, 1))
+        self.assertEqual(record.due_date, date.today() + timedelta(days=circulation.LOAN_PERIOD_DAYS))
+
+    def test_checkout_dates_the_loan_from_today(self):
+        today = date.today() + timedelta(days=3)
+        record = circulation.checkout(self.student, self.book, today=today)
+        record.refresh_from_db()
+        self.assertEqual((record.borrow_date, record.due_date), (today, today + timedelta(days=circulation.LOAN_PERIOD_DAYS)))
+
+    def test_last_copy_is_never_issued_twice(self):
+        circulation.checkout(self.student, self.book)
+        with self.assertRaisesMessage(circulation.CirculationError, 'No available copy'):
+            circulation.checkout(self.make_student('bob', '202'), self.book)
+        self.assertEqual(BorrowRecord.objects.count(), 1)
+
+    def test_failed_eligibility_releases_the_claim(self):
+        self.student.studentsubscription_set.all().delete()
+        with self.assertRaisesMessage(circulation.CirculationError, 'subscribe'):
+            circulation.checkout(self.student, self.book)
+        self.copy.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(self.copy.status, 'available')
+        self.assertEqual(self.book.available_copies, 1)
+
+    def test_late_return_frees_copy_and_creates_fine(self):
+        record = circulation.checkout(self.student, self.book)
+        fine = circulation.return_copy(record, today=record.due_date + timedelta(days=3))
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, 'available')
+        self.assertEqual(fine.amount, 15)
+        with self.assertRaisesMessage(circulation.CirculationError, 'already returned'):
+            circulation.return_copy(record)
+
+    def test_students_cannot_return_other_students_books(self):
+        record = circulation.checkout(self.make_student('bob', '202'), self.book)
+        self.client.login(username='alice', password='testpass')
+        response = self.client.get(reverse('books:return_book', args=[record.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class FineAccrualTest(TestCase):
+
+    def setUp(self):
+        self.plan = SubscriptionPlan.objects.create(name='Gold', max_books=5, duration_days=30, price=100, fine_per_day=5)
+        self.book = Book.objects.create(title='Late', isbn='9787777777777', description='x', published_date=date(2019, 1, 1))
+        self.today = date(2024, 3, 20)
+        self.subscribed = self.borrow('gail', subscribe=True, due=self.today - timedelta(days=4))
+        self.unsubscribed = self.borrow('hank', subscribe=False, due=self.today - timedelta(days=2))
+        self.on_time = self.borrow('ivan', subscribe=True, due=self.today + timedelta(days=1))
+
+    def borrow(self, username, subscribe, due):
+        user = User.objects.create_user(username=username, password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email=f'{username}@example.com', emergency_contact_no='2')
+        student = Student.objects.create(user_profile=profile, roll_number=username, branch='CS', year=1)
+        if subscribe:
+            StudentSubscription.objects.create(student=student, plan=self.plan)
+        copy = BookCopy.objects.create(book=self.book, copy_id=f'FA-{username}', status='borrowed')
+        return BorrowRecord.objects.create(student=student, book_copy=copy, due_date=due)
+
+    def amounts(self):
+        return dict(Fine.objects.values_list('borrow_record_id', 'amount'))
+
+    def test_accrues_open_overdue_records_with_plan_rate(self):
+        with self.assertNumQueries(6):  # savepoint + read + upsert + change feed (2) + release
+            report = fines.accrue_fines(self.today)
+        self.assertEqual((report.records, report.total), (2, 40))
+        self.assertEqual(self.amounts(), {self.subscribed.pk: 20, self.unsubscribed.pk: 20})
+
+    def pay(self, record):
+        fine = Fine.objects.get(borrow_record=record)
+        Fine.objects.filter(pk=fine.pk).update(paid=True, paid_amount=fine.amount)  # what PayFineView does
+
+    def test_rerun_updates_in_place_and_keeps_paid_fines(self):
+        fines.accrue_fines(self.today)
+        fines.accrue_fines(self.today)
+        self.assertEqual(Fine.objects.count(), 2)
+
+        self.pay(self.unsubscribed)
+        fines.accrue_fines(self.today)
+        self.assertTrue(Fine.objects.get(borrow_record=self.unsubscribed).paid)
+
+    def test_fines_ticked_paid_in_the_admin_stay_paid(self):
+        fines.accrue_fines(self.today)
+        fine = Fine.objects.get(borrow_record=self.subscribed)
+        fine.paid = True
+        fine.save()
+        fines.accrue_fines(self.today)
+        fine.refresh_from_db()
+        self.assertEqual((fine.paid, fine.paid_amount, fine.outstanding), (True, 20, 0))
+
+    def test_paying_and_keeping_the_book_reopens_the_fine_for_the_days_since(self):
+        fines.accrue_fines(self.today)
+        self.pay(self.unsubscribed)
+
+        fines.accrue_fines(self.today + timedelta(days=1))
+        fine = Fine.objects.get(borrow_record=self.unsubscribed)
+        self.assertEqual((fine.amount, fine.paid_amount, fine.paid, fine.outstanding), (30, 20, False, 10))
+
+        self.pay(self.unsubscribed)
+        BorrowRecord.objects.filter(pk=self.unsubscribed.pk).update(return_date=self.today + timedelta(days=3))
+        fines.accrue_fines(self.today + timedelta(days=3), record_ids=[self.unsubscribed.pk])  # what a return does
+        fine.refresh_from_db()
+        self.assertEqual((fine.amount, fine.outstanding, fine.paid), (50, 20, False))
+
+    def test_pay_fine_page_pays_the_accrued_fine(self):
+        fines.accrue_fines(self.today)
+        self.client.login(username='hank', password='testpass')
+        page = self.client.get(reverse('subscription:pay_fine'))
+        self.assertContains(page, '₹20')
+        self.assertContains(page, 'Late')
+
+        self.client.post(reverse('subscription:pay_fine'), {'record_id': self.unsubscribed.pk})
+        fine = Fine.objects.get(borrow_record=self.unsubscribed)
+        self.assertEqual((fine.paid, fine.paid_amount), (True, 20))
+
+    def test_students_cannot_pay_off_other_students_fines(self):
+        fines.accrue_fines(self.today)
+        self.client.login(username='hank', password='testpass')
+        response = self.client.post(reverse('subscription:pay_fine'), {'record_id': self.subscribed.pk}, follow=True)
+        self.assertContains(response, 'Fine record not found')
+        self.assertFalse(Fine.objects.get(borrow_record=self.subscribed).paid)
+
+    def test_returned_records_stop_accruing(self):
+        BorrowRecord.objects.filter(pk=self.subscribed.pk).update(return_date=self.today - timedelta(days=1))
+        fines.accrue_fines(self.today + timedelta(days=10), record_ids=[self.subscribed.pk])  # what a return does
+        fines.accrue_fines(self.today + timedelta(days=10))
+        self.assertEqual(self.amounts()[self.subscribed.pk], 15)
+
+    def test_command_accepts_a_date(self):
+        out = io.StringIO()
+        call_command('accrue_fines', date='2024-03-19', stdout=out)
+        self.assertIn('2 fines accrued as of 2024-03-19', out.getvalue())
+
+
+class DashboardSummaryTest(TestCase):
+
+    def setUp(self):
+        plan = SubscriptionPlan.objects.create(name='Basic', max_books=5, duration_days=30, price=100, fine_per_day=5)
+        user = User.objects.create_user(username='jane', password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email='jane@example.com', emergency_contact_no='2')
+        self.student = Student.objects.create(user_profile=profile, roll_number='301', branch='CS', year=1)
+        StudentSubscription.objects.create(student=self.student, plan=plan)
+        self.book = Book.objects.create(title='History', isbn='9788888888888', description='x', published_date=date(2019, 1, 1))
+        for i in range(3):
+            BookCopy.objects.create(book=self.book, copy_id=f'DB-{i}')
+        cache.clear()
+        self.client.login(username='jane', password='testpass')
+
+    def test_summary_is_one_query_then_cached(self):
+        late = circulation.checkout(self.student, self.book, today=date.today() - timedelta(days=10))
+        circulation.return_copy(late)
+        Fine.objects.filter(borrow_record=late).update(paid=True)
+        circulation.checkout(self.student, self.book)
+
+        with self.assertNumQueries(1):
+            summary = dashboard.student_summary(self.student.pk)
+        self.assertEqual(
+            (summary['total_borrowed'], summary['total_returned'], summary['total_pending']), (2, 1, 1)
+        )
+        self.assertEqual((summary['total_fines'], summary['pending_fines']), (15, 0))
+        with self.assertNumQueries(0):
+            dashboard.student_summary(self.student.pk)
+
+    def test_borrow_return_and_payment_invalidate(self):
+        response = self.client.get(reverse('books:user_dashboard'))
+        self.assertEqual(response.context['total_borrowed'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record = circulation.checkout(self.student, self.book, today=date.today() - timedelta(days=8))
+        self.assertEqual(self.client.get(reverse('books:user_dashboard')).context['total_pending'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            circulation.return_copy(record)
+        response = self.client.get(reverse('books:user_dashboard'))
+        self.assertEqual((response.context['total_pending'], response.context['pending_fines']), (0, 5))
+
+        fine = Fine.objects.get(borrow_record=record)
+        fine.paid = True
+        with self.captureOnCommitCallbacks(execute=True):
+            fine.save()
+        self.assertEqual(self.client.get(reverse('books:user_dashboard')).context['pending_fines'], 0)
+
+
+class CatalogCacheTest(TestCase):
+
+    def setUp(self):
+        plan = SubscriptionPlan.objects.create(name='Basic', max_books=5, duration_days=30, price=100, fine_per_day=5)
+        user = User.objects.create_user(username='kim', password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email='kim@example.com', emergency_contact_no='2')
+        self.student = Student.objects.create(user_profile=profile, roll_number='401', branch='CS', year=1)
+        StudentSubscription.objects.create(student=self.student, plan=plan)
+        self.category = Category.objects.create(name='Poetry', location='Rack P')
+        self.book = Book.objects.create(
+            title='Odes', isbn='9784444444444', category=self.category, description='x',
+            published_date=date(2019, 1, 1), recommended=True,
+        )
+        self.book.authors.add(Author.objects.create(name='Keats'))
+        BookCopy.objects.create(book=self.book, copy_id='OD-1')
+        self.client.login(username='kim', password='testpass')
+
+    def list_row(self):
+        return self.client.get(reverse('books:book_list')).context['book_data'][0]
+
+    def test_catalog_pages_are_served_from_cache(self):
+        for name, args in [('book_list', []), ('book_detail', [self.book.pk]), ('book_recommendation', [])]:
+            with self.subTest(name):
+                url = reverse(f'books:{name}', args=args)
+                with CaptureQueriesContext(connection) as first:
+                    self.client.get(url)
+                with CaptureQueriesContext(connection) as second:
+                    self.client.get(url)
+                # Only session, user, patron and the ETag lookup are left
+                self.assertLess(len(second), len(first))
+                self.assertFalse([q for q in second if '"books_book"."title"' in q['sql']])
+
+    def test_borrow_and_return_update_availability(self):
+        self.assertEqual(self.list_row()['available_copies'], 1)
+        self.client.get(reverse('books:book_detail', args=[self.book.pk]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record = circulation.checkout(self.student, self.book)
+        self.assertEqual(self.list_row()['available_copies'], 0)
+        detail = self.client.get(reverse('books:book_detail', args=[self.book.pk]))
+        self.assertEqual(detail.context['copies'][0].status, 'borrowed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            circulation.return_copy(record)
+        self.assertEqual(self.list_row()['available_copies'], 1)
+
+    def test_catalog_edits_bump_the_version(self):
+        self.client.get(reverse('books:book_recommendation'))
+        self.book.title = 'Odes, Revised'
+        self.book.save()
+        self.assertContains(self.client.get(reverse('books:book_recommendation')), 'Odes, Revised')
+
+        self.category.name = 'Verse'
+        self.category.save()
+        self.assertEqual(self.list_row()['book'].category.name, 'Verse')
+
+        self.book.authors.add(Author.objects.create(name='Shelley'))
+        self.assertContains(self.client.get(reverse('books:book_list')), 'Shelley')
+
+    def test_book_rows_are_cached_fragments(self):
+        row = self.list_row()
+        key = make_template_fragment_key('book_row', [self.book.pk, row['version'], row['available_copies']])
+        self.assertIn('Keats', cache.get(key))
+
+        # Availability and catalog edits move the row to a new key
+        with self.captureOnCommitCallbacks(execute=True):
+            circulation.checkout(self.student, self.book)
+        self.assertContains(self.client.get(reverse('books:book_list')), 'Not Available')
+        self.book.title = 'Odes, Revised'
+        self.book.save()
+        self.assertContains(self.client.get(reverse('books:search_books'), {'q': 'Odes'}), 'Odes, Revised')
+
+    def test_production_settings_use_cached_loader(self):
+        env = {'DJANGO_SECRET_KEY': 'x' * 50, 'DJANGO_ALLOWED_HOSTS': 'library.example.com'}
+        with mock.patch.dict(os.environ, env):
+            production = importlib.import_module('lms_project.settings_production')
+        options = production.TEMPLATES[0]['OPTIONS']
+        self.assertFalse(production.DEBUG)
+        self.assertEqual(options['loaders'][0][0], 'django.template.loaders.cached.Loader')
+        self.assertNotIn('django.template.context_processors.debug', options['context_processors'])
+        self.assertEqual(production.ALLOWED_HOSTS, ['library.example.com'])
+
+    def test_warm_command_fills_the_cache(self):
+        call_command('warm_catalog_cache', stdout=io.StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('books:book_detail', args=[self.book.pk]))
+        self.assertFalse([q for q in queries if '"books_book"."title"' in q['sql'] or 'books_bookcopy' in q['sql']])
+
+    def test_timeout_zero_switches_the_cache_off(self):
+        with self.settings(CATALOG_CACHE_TIMEOUT=0):
+            self.client.get(reverse('books:book_list'))
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('books:book_list'))
+        self.assertTrue([q for q in queries if 'books_book' in q['sql']])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTest(TestCase):
+    """🔍 Hot queries must keep using an index as tables grow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        plan = SubscriptionPlan.objects.create(name='Plan', max_books=5, duration_days=30, price=100, fine_per_day=5)
+        students = []
+        for i in range(20):
+            user = User.objects.create_user(username=f'qp{i}', password='x')
+            profile = UserProfile.objects.create(user=user, phone_no='1', email=f'qp{i}@example.com', emergency_contact_no='2')
+            students.append(Student.objects.create(user_profile=profile, roll_number=f'QP{i}', branch='CS', year=1))
+            StudentSubscription.objects.create(student=students[-1], plan=plan)
+        books = Book.objects.bulk_create([
+            Book(title=f'Plan {i}', isbn=f'97810000{i:05d}', description='x', published_date=date(2020, 1, 1))
+            for i in range(50)
+        ])
+        copies = BookCopy.objects.bulk_create([
+            BookCopy(book=book, copy_id=f'QP-{book.pk}-{n}', status='available' if n else 'borrowed')
+            for book in books for n in range(4)
+        ])
+        today = date.today()
+        records = BorrowRecord.objects.bulk_create([
+            BorrowRecord(
+                student=students[i % 20], book_copy=copy, due_date=today - timedelta(days=i % 30),
+                return_date=None if i % 5 == 0 else today,
+            )
+            for i, copy in enumerate(copies)
+        ])
+        Fine.objects.bulk_create([
+            Fine(borrow_record=r, student_id=r.student_id, amount=5, paid=i % 5 != 0) for i, r in enumerate(records[::4])
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')  # Plan with real statistics, as a grown database would
+
+    HOT_TABLES = ('books_borrowrecord', 'books_bookcopy', 'books_fine', 'subscription_studentsubscription')
+
+    def assertNoFullScan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            steps = [row[-1] for row in cursor.fetchall()]
+        # Small lookup tables (plans, students) may be scanned; the growing ones must be searched.
+        # 'SCAN t USING INDEX i' still reads every row of the index, so only SEARCH steps count.
+        scans = [
+            step for step in steps
+            if step.split(' ')[1] in self.HOT_TABLES and step.split(' ')[0] != 'SEARCH'
+        ]
+        self.assertEqual(scans, [], f'full table scan in plan: {steps}')
+
+    def test_hot_queries_use_indexes(self):
+        today = date.today()
+        student = Student.objects.first()
+        book = Book.objects.first()
+        hot_queries = {
+            'active borrows': BorrowRecord.objects.filter(student=student, return_date__isnull=True),
+            'due reminders': BorrowRecord.objects.filter(return_date__isnull=True, due_date__lte=today),
+            'fine accrual': fines.accrued_fines(today),
+            'copy claim': BookCopy.objects.filter(book=book, status='available').order_by('pk').values('pk')[:5],
+            'unpaid fines': Fine.objects.filter(student=student, paid=False),
+            'fine on return': Fine.objects.filter(borrow_record=BorrowRecord.objects.first()),
+            'subscription sweep': StudentSubscription.objects.filter(status='active', end_date__lt=today),
+        }
+        for name, queryset in hot_queries.items():
+            with self.subTest(name):
+                self.assertNoFullScan(queryset)
+
+
+class ExportBorrowRecordsTest(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='testpass', is_staff=True)
+        self.client.login(username='staff', password='testpass')
+        user = User.objects.create_user(username='carol', password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email='carol@example.com', emergency_contact_no='2')
+        student = Student.objects.create(user_profile=profile, roll_number='301', branch='CS', year=1)
+        book = Book.objects.create(title='Exported', isbn='9784444444444', description='x', published_date=date(2018, 1, 1))
+        for i in range(3):
+            copy = BookCopy.objects.create(book=book, copy_id=f'EX-{i}')
+            record = BorrowRecord.objects.create(student=student, book_copy=copy, due_date=date.today() - timedelta(days=1))
+            if i == 0:
+                record.return_date = date.today()
+                record.save()
+                Fine.objects.create(borrow_record=record, amount=10, paid=True)
+
+    def read(self, response):
+        body = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            body = gzip.decompress(body)
+        return list(csv.reader(io.StringIO(body.decode('utf-8'))))
+
+    def test_streams_rows_with_constant_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.read(self.client.get(reverse('books:export_borrow_records')))
+        self.assertEqual(rows[1][0], 'carol')
+        self.assertEqual(rows[1][6:], ['10.00', 'Yes'])
+        self.assertEqual(len(rows), 4)
+        self.assertLessEqual(len(queries), 4)  # session, user, export
+
+    def test_status_filter_and_gzip(self):
+        response = self.client.get(reverse('books:export_borrow_records'), {'status': 'overdue', 'gzip': '1'})
+        self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+        rows = self.read(response)
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row[5] == 'Yes' for row in rows[1:]))
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse('books:export_borrow_records'), {'from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeFeedTest(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='sync', password='testpass', is_staff=True)
+        self.client.login(username='sync', password='testpass')
+        self.book = Book.objects.create(title='Synced', isbn='9785555555555', description='x', published_date=date(2017, 1, 1))
+        self.copy = BookCopy.objects.create(book=self.book, copy_id='SY-1')
+
+    def test_writes_are_recorded_in_order(self):
+        cursor = ChangeEvent.objects.latest('pk').pk
+        self.copy.status = 'damaged'
+        self.copy.save()
+        self.book.delete()
+
+        events = changefeed.events_since(cursor)
+        self.assertEqual(
+            [(e.model, e.action) for e in events],
+            [('books.bookcopy', 'update'), ('books.bookcopy', 'delete'), ('books.book', 'delete')],
+        )
+        self.assertEqual(events[0].data['status'], 'damaged')
+
+    def test_feed_endpoint_pages_by_cursor(self):
+        response = self.client.get(reverse('books:change_feed'), {'limit': 1})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        first = json.loads(lines[0])
+        self.assertEqual((first['model'], first['action']), ('books.book', 'insert'))
+        self.assertEqual(int(response['X-Next-Cursor']), first['id'])
+
+        response = self.client.get(reverse('books:change_feed'), {'since': first['id'], 'model': 'books.bookcopy'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['data']['copy_id'] for row in rows], ['SY-1'])
+
+    def test_feed_rejects_limits_below_one(self):
+        for limit in ('0', '-1'):
+            with self.subTest(limit=limit):
+                response = self.client.get(reverse('books:change_feed'), {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(changefeed.events_since(0, limit=-1)), 1)  # direct callers get at least one event
+
+    def test_export_command(self):
+        out = io.StringIO()
+        call_command('export_changes', since=0, stdout=out, stderr=io.StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), ChangeEvent.objects.count())
+
+
+class CatalogApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=3, books=40)
+
+    def setUp(self):
+        self.client.force_login(self.library.student_user)
+
+    def walk(self, url, params):
+        ids, queries, cursor = [], [], None
+        while True:
+            with CaptureQueriesContext(connection) as captured:
+                data = self.client.get(url, {**params, **({'cursor': cursor} if cursor else {})}).json()
+            queries.append(len(captured))
+            ids += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids, queries
+
+    def test_keyset_walk_sees_every_book_once_in_constant_queries(self):
+        ids, queries = self.walk(reverse('books:api_books'), {'limit': 7})
+        self.assertEqual(ids, list(Book.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(len(set(queries)), 1)  # Last page costs the same as the first
+
+    def test_sparse_fields(self):
+        data = self.client.get(reverse('books:api_books'), {'fields': 'title,copies', 'limit': 1}).json()
+        row = data['results'][0]
+        self.assertEqual(list(row), ['id', 'title', 'copies'])
+        self.assertEqual(len(row['copies']), 3)
+        self.assertNotIn('copies', self.client.get(reverse('books:api_books')).json()['results'][0])
+
+    def test_updated_since_follows_circulation_and_author_edits(self):
+        since = timezone.now()
+        Book.objects.update(updated_at=since - timedelta(days=1))
+        url = reverse('books:api_books')
+        self.assertEqual(self.client.get(url, {'updated_since': since.isoformat()}).json()['results'], [])
+
+        book = Book.objects.filter(available_copies__gt=0).first()
+        BookCopy.objects.filter(book=book, status='available').first().delete()  # Counter change
+        author = Author.objects.exclude(book=book).filter(book__isnull=False).first()
+        author.name = 'Renamed'
+        author.save()
+
+        ids, _ = self.walk(url, {'updated_since': since.isoformat(), 'limit': 2})
+        self.assertEqual(sorted(ids), sorted({book.pk, *author.book_set.values_list('pk', flat=True)}))
+
+    def test_bad_parameters_and_anonymous_clients(self):
+        url = reverse('books:api_books')
+        for params in [{'fields': 'title,secret'}, {'cursor': '!!'}, {'limit': 'x'}, {'updated_since': 'yesterday'}]:
+            with self.subTest(params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.client.get(reverse('books:api_book_detail', args=[0])).status_code, 404)
+
+        # Well-formed cursors holding the wrong kind of values
+        for values, params in [
+            (['abc'], {}), ([{'a': 1}], {}), ([True], {}), ([1.5], {}),
+            (['garbage', 1], {'updated_since': '2020-01-01'}), ([1, 1], {'updated_since': '2020-01-01'}),
+            ([timezone.now().isoformat(), 'x'], {'updated_since': '2020-01-01'}),
+        ]:
+            with self.subTest(values):
+                response = self.client.get(url, {**params, 'cursor': api.encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_authors_and_categories(self):
+        ids, _ = self.walk(reverse('books:api_authors'), {'limit': 4})
+        self.assertEqual(len(ids), Author.objects.count())
+        row = self.client.get(reverse('books:api_categories')).json()['results'][0]
+        self.assertEqual(set(row), {'id', 'name', 'location'})
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=3, books=10)
+
+    def setUp(self):
+        self.client.force_login(self.library.student_user)
+        self.book = self.library.book
+
+    def test_unchanged_book_pages_answer_304_without_rendering(self):
+        for name in ['book_detail', 'book_copies', 'api_book_detail']:
+            with self.subTest(name):
+                url = reverse(f'books:{name}', args=[self.book.pk])
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertIn('private', first['Cache-Control'])
+                with CaptureQueriesContext(connection) as queries:
+                    again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(again.status_code, 304)
+                self.assertFalse([q for q in queries if 'books_bookcopy' in q['sql']])
+                modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+                self.assertEqual(modified.status_code, 304)
+
+    def test_copy_and_circulation_writes_change_the_etag(self):
+        url = reverse('books:book_detail', args=[self.book.pk])
+        etag = self.client.get(url)['ETag']
+        copy = BookCopy.objects.filter(book=self.book).first()
+        copy.library_location = 'Annex'
+        copy.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Annex')
+
+        etag = response['ETag']
+        borrower = Student.objects.exclude(pk=self.library.student.pk).first()
+        Fine.objects.filter(borrow_record__student=borrower).update(paid=True)
+        circulation.checkout(borrower, self.book)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_html_etags_are_per_user_and_api_list_has_one(self):
+        url = reverse('books:book_detail', args=[self.book.pk])
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.library.staff_user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        api_url = reverse('books:api_books')
+        etag = self.client.get(api_url)['ETag']
+        self.assertEqual(self.client.get(api_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Book.objects.filter(pk=self.book.pk).delete()
+        self.assertEqual(self.client.get(api_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@mock.patch('lms_project.replica.replica_available', return_value=True)
+class ReplicaRoutingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=3, books=10)
+
+    def setUp(self):
+        self.client.force_login(self.library.student_user)
+        # The mirror is a second connection and cannot see this test's uncommitted rows; share the first
+        replica = connections['replica']
+        connections['replica'] = connections['default']
+        self.addCleanup(connections.__setitem__, 'replica', replica)
+
+    def recording_reads(self, picked):
+        """Patch the router to note (model, alias) for every read into ``picked``."""
+        original = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            picked.append((model._meta.label, original(router, model, **hints)))
+            return picked[-1][1]
+
+        return mock.patch.object(ReplicaRouter, 'db_for_read', record)
+
+    def routed_reads(self, url):
+        """Aliases the router picked for the reads of one request (the replica mirrors default in tests)."""
+        picked = []
+        with self.recording_reads(picked):
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, picked
+
+    def test_router_sends_catalog_reads_to_replica_until_a_write(self, available):
+        self.assertEqual(Book.objects.all().db, 'default')
+        with reading_from_replica():
+            self.assertEqual(Book.objects.all().db, 'replica')
+            self.assertEqual(User.objects.all().db, 'default')  # Sessions, users, students: always primary
+            Category.objects.create(name='New', location='Rack N')
+            self.assertEqual(Book.objects.all().db, 'default')  # Read-your-writes
+        self.assertEqual(Book.objects.all().db, 'default')
+
+    def test_catalog_and_export_pages_read_from_replica(self, available):
+        for url in [reverse('books:book_list'), reverse('books:search_books') + '?q=river', reverse('books:api_books')]:
+            with self.subTest(url):
+                _, picked = self.routed_reads(url)
+                self.assertIn(('books.Book', 'replica'), picked)
+                self.assertNotIn(('auth.User', 'replica'), picked)
+        self.client.force_login(self.library.staff_user)
+        _, picked = self.routed_reads(reverse('books:export_borrow_records'))
+        self.assertIn(('books.BorrowRecord', 'replica'), picked)
+
+        self.client.force_login(self.library.student_user)
+        _, picked = self.routed_reads(reverse('books:my_fines'))
+        self.assertNotIn('replica', {alias for _, alias in picked})
+
+    def test_writes_pin_the_browser_to_the_primary(self, available):
+        from lms_project.benchmarks import make_borrower
+        borrower = make_borrower('pin')
+        self.client.force_login(borrower)
+        response = self.client.get(reverse('books:borrow_book', args=[self.library.book.pk]))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        _, picked = self.routed_reads(reverse('books:book_list'))
+        self.assertNotIn('replica', {alias for _, alias in picked})
+
+    async def test_async_views_read_from_replica_under_asgi(self, available):
+        picked = []
+        await self.async_client.aforce_login(self.library.student_user)
+        with self.recording_reads(picked):
+            response = await self.async_client.get(reverse('books:search_books') + '?q=river')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(('books.Book', 'replica'), picked)
+
+
+class ReplicaCacheTest(TransactionTestCase):
+    """🔀 A separate replica file, minutes behind: its pages never reach readers of the primary."""
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.library = build_library(students=3, books=10)
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'replica.sqlite3')
+        replica = sqlite3.connect(path)
+        connection.ensure_connection()
+        connection.connection.backup(replica)  # Committed data: TransactionTestCase
+        replica.close()
+
+        old_settings, old_connection = connections.settings['replica'], connections['replica']
+        connections.settings['replica'] = {**old_settings, 'NAME': path}
+        del connections['replica']
+
+        def restore():
+            connections['replica'].close()
+            connections.settings['replica'] = old_settings
+            connections['replica'] = old_connection
+        self.addCleanup(restore)
+
+    def available(self, client, book):
+        response = client.get(reverse('books:book_list') + '?per_page=100')
+        return next(row['available_copies'] for row in response.context['book_data'] if row['book'].pk == book.pk)
+
+    def test_stale_replica_page_is_not_served_after_a_borrow(self):
+        from lms_project.benchmarks import make_borrower
+        book = Book.objects.filter(available_copies__gt=0).first()
+        before = book.available_copies
+        other, borrower = Client(), Client()
+        other.force_login(self.library.student_user)
+        borrower.force_login(make_borrower('stale'))
+
+        self.assertEqual(self.available(other, book), before)
+        borrower.get(reverse('books:borrow_book', args=[book.pk]))
+        self.assertIn(PIN_COOKIE, borrower.cookies)
+        # Not refreshed yet, but everyone sees the borrow: the counters come from the primary
+        self.assertEqual(self.available(other, book), before - 1)
+        self.assertEqual(self.available(borrower, book), before - 1)
+        with connections['replica'].cursor() as cursor:
+            cursor.execute('SELECT available_copies FROM books_book WHERE id = %s', [book.pk])
+            self.assertEqual(cursor.fetchone()[0], before)  # The page itself was read from the replica
+
+    def test_replica_with_an_older_schema_is_not_used(self):
+        self.assertTrue(replica_available())
+        connections['replica'].close()
+        path = connections.settings['replica']['NAME']
+        old = sqlite3.connect(path)
+        old.execute("DELETE FROM django_migrations WHERE app = 'books'")  # As if copied before the last migrate
+        old.commit()
+        old.close()
+        os.utime(path, ns=(0, 0))  # A refresh gives the file a new modification time
+        self.assertFalse(replica_available())
+        with reading_from_replica():
+            self.assertEqual(Book.objects.all().db, 'default')
+
+
+class AsyncViewsTest(TestCase):
+    """⚡ The async catalog, search and dashboard views through the ASGI handler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=3, books=10)
+
+    def setUp(self):
+        cache.clear()  # Dashboard summaries are keyed by student id, which other tests reuse
+
+    async def test_pages_render_through_the_async_stack(self):
+        await self.async_client.aforce_login(self.library.student_user)
+        book = self.library.book
+        for url, text in [
+            (reverse('books:book_list'), 'Available'),
+            (reverse('books:search_books') + f'?q={book.isbn}', book.title),
+            (reverse('books:book_detail', args=[book.pk]), book.isbn),
+            (reverse('books:user_dashboard'), self.library.student_user.username),
+        ]:
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, text)
+
+        response = await self.async_client.get(reverse('books:book_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_row_fragments_are_cached_by_the_view(self):
+        await self.async_client.aforce_login(self.library.student_user)
+        await self.async_client.get(reverse('books:book_list'))
+        with mock.patch('books.views.render_to_string') as render_row:
+            response = await self.async_client.get(reverse('books:book_list'))
+        self.assertContains(response, 'Available')
+        render_row.assert_not_called()  # Every row came from the cache
+
+    async def test_dashboard_matches_the_sync_summary(self):
+        await self.async_client.aforce_login(self.library.student_user)
+        response = await self.async_client.get(reverse('books:user_dashboard'))
+        summary = await dashboard.acompute_summary(self.library.student.pk)
+        self.assertEqual(summary, await sync_to_async(dashboard.compute_summary)(self.library.student.pk))
+        self.assertEqual(response.context['total_borrowed'], summary['total_borrowed'])
+        self.assertEqual(len(response.context['pending_books']), summary['total_pending'])
+
+    async def test_login_required_and_conditional_get(self):
+        response = await self.async_client.get(reverse('books:book_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('iam:login'), response['Location'])
+
+        await self.async_client.aforce_login(self.library.student_user)
+        url = reverse('books:book_detail', args=[self.library.book.pk])
+        first = await self.async_client.get(url)
+        again = await self.async_client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    async def test_query_budget_is_counted_under_asgi(self):
+        await self.async_client.aforce_login(self.library.student_user)
+        with self.settings(QUERY_BUDGETS={'books:user_dashboard': {'queries': 1}}):
+            with self.assertLogs('lms_project.query_budget', 'WARNING') as logs:
+                await self.async_client.get(reverse('books:user_dashboard'))
+        self.assertIn('queries > 1', logs.output[0])
+
+
+class BulkIngestTest(TestCase):
+
+    def rows(self, *lines):
+        return list(csv.reader(io.StringIO('\n'.join(lines))))
+
+    def test_batched_ingest_creates_books_links_and_copies(self):
+        Author.objects.create(name='Known Author')
+        report = ingest.ingest_rows(self.rows(
+            'Book A,Known Author,9786000000001,Poetry,Desc,2020-01-01,2',
+            'Book B,New Author,9786000000002,Poetry,Desc,2020-01-02,1',
+            'Book A,New Author,9786000000001,Poetry,Desc,2020-01-01,2',
+        ), chunk_size=2)
+
+        self.assertEqual((report.created_books, report.linked_books, report.created_copies), (2, 1, 3))
+        self.assertEqual((report.created_authors, report.created_categories), (1, 1))
+        self.assertEqual(report.errors, [])
+        book_a = Book.objects.get(isbn='9786000000001')
+        self.assertEqual(sorted(book_a.authors.values_list('name', flat=True)), ['Known Author', 'New Author'])
+        self.assertEqual(book_a.available_copies, 2)
+        self.assertEqual(len(search.search_book_ids('poetry')), 2)
+
+    def test_bad_rows_are_reported_per_line(self):
+        Book.objects.create(title='Taken', isbn='9786000000009', description='x', published_date=date(2000, 1, 1))
+        report = ingest.ingest_rows(self.rows(
+            'Only,three,columns',
+            'No Date,Someone,9786000000003,Misc,Desc,someday,1',
+            'Clash,Someone,9786000000009,Misc,Desc,2020-01-01,1',
+            'Fine,Someone,9786000000004,Misc,Desc,2020-01-01,1',
+        ))
+        self.assertEqual([e.line for e in report.errors], [2, 3, 4])
+        self.assertEqual(report.created_books, 1)
+
+    def test_every_row_of_a_rejected_isbn_is_reported(self):
+        other = Book.objects.create(title='Other', isbn='9786000000008', description='x', published_date=date(2000, 1, 1))
+        BookCopy.objects.create(book=other, copy_id='9786000000005-1')
+        report = ingest.ingest_rows(self.rows(
+            'Dup,Someone,9786000000005,Misc,Desc,2020-01-01,1',
+            'Dup,Another,9786000000005,Misc,Desc,2020-01-01,1',
+        ))
+        self.assertEqual(([e.line for e in report.errors], report.failed_rows), ([2, 3], 2))
+        self.assertFalse(Book.objects.filter(isbn='9786000000005').exists())
+
+    def test_insert_count_does_not_grow_per_row(self):
+        lines = [f'Title {i},Author {i % 3},97870000{i:05d},Cat {i % 2},Desc,2020-01-01,3' for i in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            report = ingest.ingest_rows(self.rows(*lines))
+        self.assertEqual(report.created_copies, 150)
+        self.assertLess(len(queries), 30)
+
+
+class BooksQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """⏱️ Every books URL against a few hundred books, loans and fines."""
+
+    # url name: (who, max queries[, max repeats]); login is session + user, request.patron is one more
+    BUDGETS = {
+        'book_list': ('student', 6),
+        'borrow_book': ('student', 16, 3),  # one change event per touched model
+        'return_book': ('student', 16, 3),
+        'search_books': ('student', 8),
+        'book_recommendation': ('student', 4),
+        'my_fines': ('student', 4),
+        'send_reminders': ('staff', 8),
+        'book_copies': ('student', 4),
+        'my_borrowed_books': ('student', 4),
+        'export_books': ('staff', 5),
+        'user_dashboard': ('student', 6),
+        'export_borrow_records': ('staff', 3),
+        'book_detail': ('student', 6),
+        'change_feed': ('staff', 3),
+        'api_books': ('student', 5),  # + the ETag aggregate
+        'api_book_detail': ('student', 6),
+        'api_authors': ('student', 3),
+        'api_categories': ('student', 3),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=30, books=200)
+
+    def url_kwargs(self):
+        return {'book_id': self.library.book.pk, 'record_id': self.library.open_record.pk}
+
+    def test_middleware_logs_views_over_budget(self):
+        self.client.login(username=self.library.student_user.username, password=PASSWORD)
+        with self.settings(QUERY_BUDGETS={'books:book_list': {'queries': 2}}):
+            with self.assertLogs('lms_project.query_budget', 'WARNING') as logs:
+                self.client.get(reverse('books:book_list'))
+        self.assertIn('books:book_list', logs.output[0])
+        self.assertIn('queries > 2', logs.output[0])
+
+    def test_fingerprints_ignore_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'"),
+            fingerprint("SELECT *  FROM t WHERE id IN (4, 5) AND name = 'it''s'"),
+        )
+
+    def test_every_url_has_a_budget(self):
+        from books.urls import urlpatterns
+        self.assertEqual({p.name for p in urlpatterns}, set(self.BUDGETS))
+
+    def test_urls_stay_within_budget(self):
+        from books.urls import urlpatterns
+        for pattern in urlpatterns:
+            who, queries, *repeats = self.BUDGETS[pattern.name]
+            user = self.library.staff_user if who == 'staff' else self.library.student_user
+            kwargs = {k: v for k, v in self.url_kwargs().items() if k in pattern.pattern.converters}
+            with self.subTest(pattern.name):
+                self.client.login(username=user.username, password=PASSWORD)
+                self.assertQueryBudget(reverse(f'books:{pattern.name}', kwargs=kwargs), queries, *repeats)
+
+
+class BenchmarkTest(TestCase):
+    """📈 The dataset generator and the view benchmark, at toy scale."""
+
+    def test_generate_dataset(self):
+        out = io.StringIO()
+        call_command('generate_dataset', students=5, books=20, copies=2, loans=4, years=2, stdout=out)
+        self.assertEqual(Book.objects.count(), 20)
+        self.assertEqual(BookCopy.objects.count(), 40)
+        self.assertEqual(BorrowRecord.objects.count(), 20)
+        # Counters match the copies that are actually out
+        self.assertEqual(
+            sum(Book.objects.values_list('borrowed_copies', flat=True)),
+            BorrowRecord.objects.filter(return_date__isnull=True).count(),
+        )
+        self.assertTrue(BorrowRecord.objects.filter(borrow_date__lt=date.today() - timedelta(days=365)).exists())
+
+        # A second run needs its own prefix; its ISBNs continue after the first
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', students=1, books=1, stdout=out)
+        call_command('generate_dataset', students=1, books=5, prefix='more', stdout=out)
+        self.assertEqual(Book.objects.count(), 25)
+
+    def test_run_reports_every_endpoint(self):
+        from lms_project import benchmarks
+        library = build_library(students=5, books=30)
+        results = benchmarks.run(library, iterations=2, warmup=0)
+        self.assertEqual({r.name for r in results}, {e.name for e in benchmarks.endpoints(library)})
+        for r in results:
+            with self.subTest(r.name):
+                self.assertEqual(r.errors, 0)
+                self.assertEqual(r.iterations, 2)
+                self.assertGreater(r.queries, 0)
+        # Every borrow was handed back
+        self.assertFalse(BorrowRecord.objects.filter(
+            student__user_profile__user__username='bench_borrower', return_date__isnull=True,
+        ).exists())
+
+        report = json.loads(benchmarks.to_json(results, {}))
+        self.assertIn('Δp50', benchmarks.format_table(results, report))
+
+    def test_percentile_is_nearest_rank(self):
+        from lms_project.benchmarks import percentile
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+class ConcurrencyBenchmarkTest(TransactionTestCase):
+    """📈 The ASGI / WSGI load benchmark at toy scale (other threads need committed data)."""
+
+    def test_both_servers_serve_every_request(self):
+        from lms_project import benchmarks
+        library = build_library(students=3, books=10)
+        results = benchmarks.run_concurrency(library, clients=(3,), requests=2, client_ms=1, workers=2)
+        self.assertEqual(
+            [(r.server, r.clients, r.requests, r.errors) for r in results],
+            [('wsgi', 3, 6, 0), ('asgi', 3, 6, 0)],
+        )
+        self.assertIn('asgi', benchmarks.format_load_table(results))
+
+
+class SQLiteTuningTest(unittest.TestCase):
+    """
+    🗄️ The production SQLite profile, on real database files. Plain unittest: these
+    aliases live only in the test and the in-memory test database is not involved.
+    """
+
+    def setUp(self):
+        env = {'DJANGO_SECRET_KEY': 'x' * 50}
+        with mock.patch.dict(os.environ, env):
+            self.production = importlib.import_module('lms_project.settings_production')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def add_database(self, alias, **pragmas):
+        config = copy.deepcopy(self.production.DATABASES['default'])
+        config['NAME'] = os.path.join(self.tmp, f'{alias}.sqlite3')
+        if pragmas:
+            config['OPTIONS']['init_command'] += ''.join(f';PRAGMA {k}={v}' for k, v in pragmas.items())
+        connections.settings[alias] = connections.configure_settings({'default': config})['default']
+        self.addCleanup(self.drop_database, alias)
+        with connections[alias].schema_editor() as editor:
+            for model in (Category, Book, BookCopy):
+                editor.create_model(model)
+        Category.objects.using(alias).create(name='Fiction', location='Rack A')
+        return alias
+
+    def drop_database(self, alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def in_thread(self, alias, work):
+        def run():
+            try:
+                work()
+            finally:
+                connections[alias].close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_pragmas_are_set_on_every_connection(self):
+        alias = self.add_database('tuned')
+        seen = []
+        def check():
+            with connections[alias].cursor() as cursor:
+                seen.append([cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                             for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')])
+        for _ in range(2):  # A fresh connection each time
+            self.in_thread(alias, check).join()
+        self.assertEqual(seen, [['wal', 1, 20000, -64000]] * 2)
+        self.assertEqual(self.production.DATABASES['default']['CONN_MAX_AGE'], 600)
+
+    def test_reads_progress_during_bulk_uploads_and_checkouts(self):
+        alias = self.add_database('tuned')
+        category = Category.objects.using(alias).get()
+        writing, done = threading.Event(), threading.Event()
+        reads = []
+
+        def upload_and_checkout():
+            with transaction.atomic(using=alias):  # BEGIN IMMEDIATE: holds the write lock throughout
+                books = Book.objects.using(alias).bulk_create([
+                    Book(title=f'Bulk {i}', isbn=f'97900000{i:05d}', category=category,
+                         description='x', published_date=date(2020, 1, 1), available_copies=1)
+                    for i in range(500)
+                ])
+                BookCopy.objects.using(alias).bulk_create([BookCopy(book=b, copy_id=f'B-{b.pk}') for b in books])
+                BookCopy.objects.using(alias).filter(pk__lte=100).update(status='borrowed')
+                writing.set()
+                time.sleep(0.5)  # Still uncommitted
+            done.set()
+
+        def read():
+            writing.wait(5)
+            while not done.is_set():
+                started = time.perf_counter()
+                count = Book.objects.using(alias).count()
+                reads.append((count, time.perf_counter() - started))
+
+        threads = [self.in_thread(alias, upload_and_checkout), self.in_thread(alias, read)]
+        for thread in threads:
+            thread.join(10)
+        # Many reads finished while the write transaction was open, none waited on it,
+        # and each saw a committed state: before the upload or after it, never half of it
+        self.assertGreater(len(reads), 10)
+        self.assertLess(max(seconds for _, seconds in reads), 0.2)
+        self.assertEqual(reads[0][0], 0)
+        self.assertLessEqual({count for count, _ in reads}, {0, 500})
+        self.assertEqual(Book.objects.using(alias).count(), 500)
+
+    def test_refresh_replica_copies_the_primary(self):
+        alias = self.add_database('primary')
+        target = os.path.join(self.tmp, 'replica.sqlite3')
+        refresh_replica(target, source=alias)
+        reader = sqlite3.connect(target)  # Stays open, like a persistent replica connection
+        self.addCleanup(reader.close)
+        self.assertEqual(reader.execute('SELECT name FROM books_category').fetchall(), [('Fiction',)])
+
+        Category.objects.using(alias).create(name='History', location='Rack H')
+        refresh_replica(target, source=alias)
+        self.assertEqual(reader.execute('SELECT count(*) FROM books_category').fetchone(), (2,))
+        with self.assertRaises(ImproperlyConfigured):
+            refresh_replica(connections[alias].settings_dict['NAME'], source=alias)
+
+    def test_rollback_journal_blocks_readers_at_commit(self):
+        # For contrast: while a writer holds the commit (EXCLUSIVE) lock, rollback-journal
+        # readers wait and WAL readers do not
+        for mode, expect_reads in [('WAL', True), ('DELETE', False)]:
+            with self.subTest(mode):
+                alias = self.add_database(f'journal_{mode}', journal_mode=mode)
+                holding, released = threading.Event(), threading.Event()
+                reads_while_locked = []
+
+                def commit_lock():
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute('BEGIN EXCLUSIVE')
+                        holding.set()
+                        time.sleep(0.3)
+                        released.set()
+                        cursor.execute('COMMIT')
+
+                def read():
+                    holding.wait(5)
+                    Category.objects.using(alias).count()
+                    if not released.is_set():
+                        reads_while_locked.append(True)
+
+                threads = [self.in_thread(alias, commit_lock), self.in_thread(alias, read)]
+                for thread in threads:
+                    thread.join(10)
+                self.assertEqual(bool(reads_while_locked), expect_reads)
@@ -13,7 +13,12 @@ from .views import (
     UserDashboardView,
     ExportBorrowRecordsCSV,
     BookDetailView,
+    ChangeFeedView,
+    CatalogApiView,
+    BookApiListView,
+    BookApiDetailView,
 )
+from . import api
 app_name = 'books'
 
 urlpatterns = [
@@ -30,4 +35,9 @@ urlpatterns = [
     path('dashboard/', UserDashboardView.as_view(), name='user_dashboard'),
     path('export/borrow-records/', ExportBorrowRecordsCSV.as_view(), name='export_borrow_records'),
     path('book/<int:book_id>/detail/', BookDetailView.as_view(), name='book_detail'),  
+    path('changes/', ChangeFeedView.as_view(), name='change_feed'),
+    path('api/books/', BookApiListView.as_view(), name='api_books'),
+    path('api/books/<int:book_id>/', BookApiDetailView.as_view(), name='api_book_detail'),
+    path('api/authors/', CatalogApiView.as_view(page=api.author_page), name='api_authors'),
+    path('api/categories/', CatalogApiView.as_view(page=api.category_page), name='api_categories'),
 ]
@@ -1,6 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
-from django.core.mail import send_mail
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.admin.views.decorators import staff_member_required
@@ -13,25 +18,30 @@ import csv
 import io
 
 from .models import Book, BookCopy, BorrowRecord, Fine  # ✅ Models used for logic
-from iam.models import Student, UserProfile  # ✅ User identity
-from subscription.models import StudentSubscription  # ✅ Subscription data
+from . import api, catalog, catalog_cache, changefeed, circulation, dashboard, exports, search
+from .conditional import book_condition, catalog_condition
+from iam.patron import student_or_404  # ✅ User identity (request.patron)
+from subscription.custom_email_tasks import send_due_reminders
 from django.contrib.auth.models import User
 
-class BookCopiesView(LoginRequiredMixin, View):
-    def get(self, request, book_id):
-        book = get_object_or_404(Book, id=book_id)
-        copies = BookCopy.objects.filter(book=book)
-        return render(request, 'books/book_copies.html', {
-            'book': book,
-            'copies': copies
-        })
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """LoginRequiredMixin for views with ``async def`` handlers (no sync user lookup)."""
 
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()  # Templates and handle_no_permission() read request.user
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await View.dispatch(self, request, *args, **kwargs)
 
-class BookDetailView(LoginRequiredMixin, View):
-    def get(self, request, book_id):
-        book = get_object_or_404(Book, id=book_id)
-        copies = BookCopy.objects.filter(book=book)
-        available_copies = copies.filter(status='available').count()
+
+# 🔹 Catalog, search and dashboard pages are async: under ASGI a request waiting
+# on a slow client or the cache holds no worker thread. Their ORM queries still
+# run one at a time on Django's shared sync thread (thread_sensitive).
+@book_condition()
+class BookDetailView(AsyncLoginRequiredMixin, View):
+    async def get(self, request, book_id):
+        book, copies = await catalog.abook_detail(book_id)  # ✅ Cached until the book or its copies change
+        available_copies = book.available_copies
 
         return render(request, 'books/book_detail.html', {
             'book': book,
@@ -40,153 +50,130 @@ class BookDetailView(LoginRequiredMixin, View):
         })
 
 
-class BookListView(LoginRequiredMixin, View):
-    def get(self, request):
-        books = Book.objects.all()
-        book_data = []
-
-        for book in books:
-            available_copies = book.available_copies_count()
-            copies = BookCopy.objects.filter(book=book)
-            is_allowed = available_copies > 0
-            can_borrow = copies.filter(status='available').exists()
-
-            book_data.append({
-                'book': book,
-                'available_copies': available_copies,
-                'copies': copies,
-                'is_allowed': is_allowed,
-                'can_borrow': can_borrow,
-            })
+def catalog_page_size(request):
+    page_size = getattr(settings, 'CATALOG_PAGE_SIZE', 25)
+    max_page_size = getattr(settings, 'CATALOG_MAX_PAGE_SIZE', 100)
+    try:
+        page_size = int(request.GET.get('per_page', page_size))
+    except ValueError:
+        pass
+    return min(max(page_size, 1), max_page_size)
+
+
+async def acatalog_rows(books):
+    books = list(books)
+    versions = await catalog_cache.arow_versions([book.pk for book in books])  # Keys for the cached row fragments
+    live = await catalog.alive_availability([book.pk for book in books])  # Borrow buttons are never stale
+    book_data = []
+    for book in books:
+        available_copies = live.get(book.pk, book.available_copies)
+        book_data.append({
+            'book': book,
+            'available_copies': available_copies,
+            'is_allowed': available_copies > 0,
+            'can_borrow': available_copies > 0,
+            'version': versions[book.pk],
+        })
+    return book_data
+
+
+async def arender_rows(book_data, fragment, template_name):
+    """
+    Each row's cells as ``item['row_html']``, cached per book version and
+    availability. This replaces ``{% cache %}``, which would call the sync cache
+    backend (a blocking file or Redis read) on the event loop.
+    """
+    timeout = settings.CATALOG_CACHE_TIMEOUT
+    keys = {
+        make_template_fragment_key(fragment, [item['book'].pk, item['version'], item['available_copies']]): item
+        for item in book_data
+    }
+    found = await cache.aget_many(list(keys)) if timeout else {}
+    rendered = {}
+    for key, item in keys.items():
+        if key not in found:
+            found[key] = rendered[key] = render_to_string(template_name, {'item': item})  # Data is already loaded
+        item['row_html'] = mark_safe(found[key])
+    if rendered and timeout:
+        await cache.aset_many(rendered, timeout)
+    return book_data
+
+
+class BookListView(AsyncLoginRequiredMixin, View):
+    async def get(self, request):
+        page_size = catalog_page_size(request)
+        # Only the count is needed to paginate; the page itself comes from the catalog cache
+        page_obj = Paginator(range(await catalog.abook_count()), page_size).get_page(request.GET.get('page'))
+        page_obj.object_list = await catalog.acatalog_page(page_size, page_obj.number)
+
+        return render(request, 'books/book_list.html', {
+            'book_data': await arender_rows(await acatalog_rows(page_obj), 'book_row', 'books/book_row.html'),
+            'page_obj': page_obj,
+            'per_page': page_size,
+        })
 
-        return render(request, 'books/book_list.html', {'book_data': book_data})
 
-
-class BookSearchView(LoginRequiredMixin, View):
-    def get(self, request):
-        query = request.GET.get('q', '')
-        books = Book.objects.all()
-
-        if query:
-            books = books.filter(
-                Q(title__icontains=query) |
-                Q(authors__name__icontains=query) |
-                Q(isbn__icontains=query) |
-                Q(category__name__icontains=query)
-            ).distinct()
-
-        book_data = []
-        for book in books:
-            available_copies = book.available_copies_count()
-            copies = BookCopy.objects.filter(book=book)
-            is_allowed = available_copies > 0
-            can_borrow = copies.filter(status='available').exists()
-
-            book_data.append({
-                'book': book,
-                'available_copies': available_copies,
-                'copies': copies,
-                'is_allowed': is_allowed,
-                'can_borrow': can_borrow,
-            })
+class BookSearchView(AsyncLoginRequiredMixin, View):
+    async def get(self, request):
+        query = request.GET.get('q', '').strip()
+        page_size = catalog_page_size(request)
+        books = Book.objects.for_catalog().prefetch_related('bookcopy_set')
+
+        if query and search.fts_enabled():
+            # 🔍 Ranked ids come from the FTS index; only the visible page is loaded
+            ranked_ids = await search.asearch_book_ids(query, limit=getattr(settings, 'SEARCH_MAX_RESULTS', 1000))
+            page_obj = Paginator(ranked_ids, page_size).get_page(request.GET.get('page'))
+            by_id = await books.ain_bulk(page_obj.object_list)
+            page_books = [by_id[pk] for pk in page_obj.object_list if pk in by_id]
+        else:
+            if query:
+                books = books.filter(
+                    Q(title__icontains=query) |
+                    Q(authors__name__icontains=query) |
+                    Q(isbn__icontains=query) |
+                    Q(category__name__icontains=query)
+                ).distinct()
+            # Paginator would count synchronously: count with acount(), then load the page slice
+            page_obj = Paginator(range(await books.acount()), page_size).get_page(request.GET.get('page'))
+            offset = (page_obj.number - 1) * page_size
+            page_books = await catalog.alist(books.order_by('title', 'id')[offset:offset + page_size])
+            page_obj.object_list = page_books
 
         return render(request, 'books/search_results.html', {
-            'books': books,
+            'books': page_books,
             'query': query,
-            'book_data': book_data
+            'book_data': await arender_rows(await acatalog_rows(page_books), 'search_row', 'books/search_row.html'),
+            'page_obj': page_obj,
+            'per_page': page_size,
         })
 
 
 class BorrowBookView(LoginRequiredMixin, View):
     def get(self, request, book_id):
         book = get_object_or_404(Book, id=book_id)
-        available_copy = BookCopy.objects.filter(book=book, status='available').first()
-
-        if not available_copy:
-            return render(request, 'books/error.html', {'message': '❌ No available copy found.'})
-
-        user_profile = get_object_or_404(UserProfile, user=request.user)
-        student = get_object_or_404(Student, user_profile=user_profile)
-
-        subscription = StudentSubscription.objects.filter(student=student).last()
-        if not subscription:
-            return render(request, 'books/error.html', {'message': '❌ You must subscribe to a plan before borrowing.'})
-
-        expiry_date = subscription.start_date + timedelta(days=subscription.plan.duration_days)
-        if date.today() > expiry_date:
-            return render(request, 'books/error.html', {'message': '❌ Your subscription has expired.'})
-
-        # 🔄 Updated: Check for unpaid fines
-        unpaid_fines = Fine.objects.filter(borrow_record__student=student, paid=False)
-        if unpaid_fines.exists():
-            return render(request, 'books/error.html', {'message': '❌ You have unpaid fines. Please clear them before borrowing.'})
-
-        # 🔄 Updated: Check if student has reached book limit
-        active_borrows = BorrowRecord.objects.filter(student=student, return_date__isnull=True).count()
-        if active_borrows >= subscription.plan.max_books:
-            return render(request, 'books/error.html', {
-                'message': f'❌ You have reached your limit of {subscription.plan.max_books} books.'
-            })
-
-        # ✅ Borrowing is allowed, create record
-        BorrowRecord.objects.create(
-            student=student,
-            book_copy=available_copy,
-            borrow_date=date.today(),
-            due_date=date.today() + timedelta(days=7),
-        )
-
-# ✅ Feature: Send Email Reminder 1 day before due date
-def send_due_soon_reminders():
-    # उद्याचा दिवस
-    tomorrow = date.today() + timedelta(days=1)
-
-    # ज्यांचं due_date उद्या आहे आणि अजून return केलेलं नाही
-    due_soon = BorrowRecord.objects.filter(due_date=tomorrow, return_date__isnull=True)
-
-    for record in due_soon:
-        user = record.student.user_profile.user  # User object
-        email = user.email
-
-        if email:
-            send_mail(
-                subject='📅 Reminder: Book Due Tomorrow',
-                message=(
-                    f"Hi {user.username},\n\n"
-                    f'Your borrowed book "{record.book_copy.book.title}" is due tomorrow ({record.due_date}).\n'
-                    "Please return it on time to avoid fines.\n\n"
-                    "Thank you,\nLibrary Team"
-                ),
-                from_email='noreply@library.com', 
-                recipient_list=[email],
-                fail_silently=False
-            )
-
+        student = student_or_404(request)
 
-        available_copy.status = 'borrowed'
-        available_copy.save()
+        # ✅ Eligibility checks, copy claim and record creation run in one transaction
+        try:
+            circulation.checkout(student, book)
+        except circulation.CirculationError as e:
+            return render(request, 'books/error.html', {'message': str(e)})
 
         messages.success(request, '✅ Book borrowed successfully.')
         return redirect('books:book_list')
 
 
-
 class ReturnBookView(LoginRequiredMixin, View):
     def get(self, request, record_id):
-        record = get_object_or_404(BorrowRecord, id=record_id)
-        if record.return_date:
-            return render(request, 'books/error.html', {'message': '❌ Book already returned.'})
-
-        record.return_date = date.today()
-        record.save()
+        records = BorrowRecord.objects.all()
+        if not request.user.is_staff:
+            records = records.filter(student__user_profile__user=request.user)  # ✅ Only your own books
+        record = get_object_or_404(records, id=record_id)
 
-        book_copy = record.book_copy
-        book_copy.status = 'available'
-        book_copy.save()
-
-        if record.return_date > record.due_date:
-            fine_amount = record.get_fine_amount()
-            Fine.objects.create(borrow_record=record, amount=fine_amount, paid=False)
+        try:
+            circulation.return_copy(record)
+        except circulation.CirculationError as e:
+            return render(request, 'books/error.html', {'message': str(e)})
 
         messages.success(request, '✅ Book returned successfully.')
         return redirect('books:my_borrowed_books')
@@ -194,41 +181,35 @@ class ReturnBookView(LoginRequiredMixin, View):
 
 class BookRecommendationView(LoginRequiredMixin, View):
     def get(self, request):
-        books = Book.objects.filter(recommended=True)
+        books = catalog.recommended_books()
         return render(request, 'books/recommendations.html', {'books': books})
 
 
 class MyFinesView(LoginRequiredMixin, View):
     def get(self, request):
-        user_profile = get_object_or_404(UserProfile, user=request.user)
-        student = get_object_or_404(Student, user_profile=user_profile)
-        fines = Fine.objects.filter(borrow_record__student=student)
+        student = student_or_404(request)
+        fines = Fine.objects.filter(student=student).select_related('borrow_record__book_copy__book')
         return render(request, 'books/fines.html', {'fines': fines})
 
 
 @method_decorator(staff_member_required, name='dispatch')
 class ExportBorrowRecordsCSV(View):
     def get(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="borrow_records.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Student', 'Book Title', 'Borrow Date', 'Due Date', 'Return Date', 'Overdue','Fine Amount', 'Paid'])
-
-        records = BorrowRecord.objects.select_related('student', 'book_copy__book').all()
-        for record in records:
-            student_name = record.student.user_profile.user.username
-            title = record.book_copy.book.title
-            borrow_date = record.borrow_date
-            due_date = record.due_date
-            return_date = record.return_date if record.return_date else ''
-            overdue = 'Yes' if not record.return_date and date.today() > due_date else 'No'
-            fine = Fine.objects.filter(borrow_record=record).first()
-            fine_amount = fine.amount if fine else 0
-            paid_status = 'Yes' if fine and fine.paid else 'No'
-            writer.writerow([student_name, title, borrow_date, due_date, return_date, overdue, fine_amount, paid_status])
-        return response
+        # ?from=YYYY-MM-DD&to=YYYY-MM-DD&status=returned|pending|overdue&gzip=1
+        try:
+            filters = exports.parse_export_filters(request.GET)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        return exports.csv_response(
+            'borrow_records.csv',
+            exports.BORROW_RECORD_HEADER,
+            exports.borrow_record_rows(filters),
+            compress=request.GET.get('gzip') == '1',
+        )
 
 
+@book_condition()
 class BookCopiesView(LoginRequiredMixin, View):
     def get(self, request, book_id):
         book = get_object_or_404(Book, id=book_id)
@@ -241,9 +222,11 @@ class BookCopiesView(LoginRequiredMixin, View):
 
 class MyBorrowedBooksView(LoginRequiredMixin, View):
     def get(self, request):
-        user_profile = get_object_or_404(UserProfile, user=request.user)
-        student = get_object_or_404(Student, user_profile=user_profile)
-        borrow_records = BorrowRecord.objects.filter(student=student, return_date__isnull=True)
+        student = student_or_404(request)
+        borrow_records = (
+            BorrowRecord.objects.filter(student=student, return_date__isnull=True)
+            .select_related('book_copy__book', 'book_fine')
+        )
         return render(request, 'books/my_borrowed_books.html', {
             'borrow_records': borrow_records
         })
@@ -252,78 +235,47 @@ class MyBorrowedBooksView(LoginRequiredMixin, View):
 @method_decorator(staff_member_required, name='dispatch')
 class ExportBooksCSV(View):
     def get(self, request):
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="books.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Title', 'Author(s)', 'ISBN'])
-        for book in Book.objects.all():
-            writer.writerow([book.title, ', '.join([a.name for a in book.authors.all()]), book.isbn])
-        return response
+        # Authors are prefetched per chunk, so the query count does not grow with the catalog
+        books = Book.objects.only('title', 'isbn').prefetch_related('authors').order_by('pk').iterator(chunk_size=2000)
+        rows = ([book.title, ', '.join(a.name for a in book.authors.all()), book.isbn] for book in books)
+        return exports.csv_response('books.csv', ['Title', 'Author(s)', 'ISBN'], rows)
 
 
-class UserDashboardView(LoginRequiredMixin, View):
-    def get(self, request):
+class UserDashboardView(AsyncLoginRequiredMixin, View):
+    async def get(self, request):
         if request.user.is_staff:
             return render(request, 'books/staff_dashboard.html')
 
-        try:
-            user_profile = UserProfile.objects.get(user=request.user)
-            student = Student.objects.get(user_profile=user_profile)
-        except (UserProfile.DoesNotExist, Student.DoesNotExist):
+        patron = await request.apatron()  # Student, profile and subscription (with plan) in one query
+        student = patron.student
+        if student is None:
             return render(request, 'books/error.html', {
                 'message': '⚠️ Access Denied\n❌ Student profile not found.'
             })
 
-        borrowed_books = BorrowRecord.objects.filter(student=student)
-        pending_books = borrowed_books.filter(return_date__isnull=True)
-        returned_books = borrowed_books.exclude(return_date__isnull=True)
-
-        fines = Fine.objects.filter(borrow_record__student=student)
-        unpaid_fines = fines.filter(paid=False)
-
-        subscription = StudentSubscription.objects.filter(student=student).last()
-        is_expired = False
-        if subscription:
-            expiry_date = subscription.start_date + timedelta(days=subscription.plan.duration_days)
-            if date.today() > expiry_date:
-                is_expired = True
+        # The async ORM runs queries one at a time on a single thread, so these are awaited in turn
+        pending_books = await catalog.alist(
+            BorrowRecord.objects.filter(student=student, return_date__isnull=True)
+            .select_related('book_copy__book').order_by('due_date')
+        )
+        summary = await dashboard.astudent_summary(student.pk)  # 📊 Cached counters and fine totals
+        subscription = patron.subscription
+        is_expired = bool(subscription) and not subscription.is_active()
 
         return render(request, 'books/user_dashboard.html', {
-            'borrowed_books': borrowed_books,
             'pending_books': pending_books,
-            'returned_books': returned_books,
-            'fines': fines,
-            'unpaid_fines': unpaid_fines,
             'subscription': subscription,
-            'total_borrowed': borrowed_books.count(),
-            'total_returned': returned_books.count(),
-            'total_pending': pending_books.count(),
-            'total_fines': sum(f.amount for f in fines),
-            'pending_fines': sum(f.amount for f in unpaid_fines),
             'is_expired': is_expired,
+            **summary,
         })
 
 
 @method_decorator(staff_member_required, name='dispatch')
 class SendDueRemindersView(View):
     def get(self, request):
-        today = date.today()
-        due_records = BorrowRecord.objects.filter(return_date__isnull=True, due_date__lt=today)
-
-        for record in due_records:
-            student = record.student
-            email = student.user_profile.user.email
-            book_title = record.book_copy.book.title
-
-            send_mail(
-                subject='📚 Book Due Reminder',
-                message=f'Hello {student.user_profile.user.username},\n\nThe book "{book_title}" is overdue.\nPlease return it as soon as possible to avoid fines.',
-                from_email='library@example.com',
-                recipient_list=[email],
-                fail_silently=True
-            )
-
-        messages.success(request, '✅ Due reminders sent successfully.')
+        # 📧 One digest per student, queued for the deliver_outbox worker
+        report = send_due_reminders(include_today=False)
+        messages.success(request, f'✅ Due reminders queued ({report}).')
         return redirect('books:book_list')
 
 @method_decorator(staff_member_required, name='dispatch')
@@ -369,3 +321,56 @@ class UploadBulkBooksView(View):
         except Exception as e:
             messages.error(request, f'❌ Error: {str(e)}')
             return redirect('books:upload_bulk_books')
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class ChangeFeedView(View):
+    def get(self, request):
+        # ?since=<last seen id>&limit=<n>&model=books.book (repeatable)
+        try:
+            cursor = int(request.GET.get('since', 0))
+            limit = int(request.GET.get('limit', 1000))
+        except ValueError:
+            return HttpResponseBadRequest('since and limit must be integers')
+        if limit < 1:
+            return HttpResponseBadRequest('limit must be at least 1')
+
+        events = changefeed.events_since(cursor, limit, models=request.GET.getlist('model'))
+        response = StreamingHttpResponse(
+            (changefeed.to_jsonl(event) for event in events),
+            content_type='application/x-ndjson',
+        )
+        response['X-Next-Cursor'] = events[-1].pk if events else cursor
+        return response
+
+
+# 🔹 Read-only JSON catalog API (books/api.py); errors come back as JSON too
+class CatalogApiView(LoginRequiredMixin, View):
+    raise_exception = True  # API clients get a 403, not a login page
+    page = None  # api.book_page / api.author_page / api.category_page
+
+    def get(self, request):
+        try:
+            results, next_cursor = self.page(request.GET)
+        except api.ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(api.envelope(request, results, next_cursor))
+
+
+@catalog_condition()
+class BookApiListView(CatalogApiView):
+    page = staticmethod(api.book_page)
+
+
+@book_condition(per_user=False)
+class BookApiDetailView(LoginRequiredMixin, View):
+    raise_exception = True
+
+    def get(self, request, book_id):
+        try:
+            book = api.book_detail(book_id, request.GET)
+        except api.ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        if book is None:
+            return JsonResponse({'error': 'book not found'}, status=404)
+        return JsonResponse(book)
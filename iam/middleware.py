@@ -0,0 +1,34 @@
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .patron import aload_patron, load_patron
+
+
+async def apatron(request):
+    if not hasattr(request, '_apatron'):
+        request._apatron = await aload_patron(await request.auser())
+    return request._apatron
+
+
+class PatronMiddleware:
+    """
+    🔹 Adds ``request.patron``. Nothing is queried until a view touches it,
+    then the result is reused for the rest of the request.
+    Async views use ``await request.apatron()`` instead (like ``request.auser()``).
+    Must come after AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)  # Returns get_response's coroutine as is
+
+    def __call__(self, request):
+        request.patron = SimpleLazyObject(lambda: load_patron(request.user))
+        request.apatron = partial(apatron, request)
+        return self.get_response(request)
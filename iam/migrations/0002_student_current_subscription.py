@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iam', '0001_initial'),
+        ('subscription', '0004_scheduler_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='current_subscription',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='subscription.studentsubscription'),
+        ),
+    ]
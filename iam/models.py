@@ -30,6 +30,12 @@ class Student(models.Model):
     roll_number = models.CharField(max_length=20, unique=True)
     branch = models.CharField(max_length=100)
     year = models.IntegerField()
+    current_subscription = models.ForeignKey(
+        'subscription.StudentSubscription',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+',
+    )  # Latest subscription, kept by StudentSubscription.save()
 
     def __str__(self):
         return f"{self.user_profile.user.username} ({self.roll_number})"
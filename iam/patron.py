@@ -0,0 +1,74 @@
+# ✅ FILE: iam/patron.py
+
+from django.http import Http404
+
+from .models import Student, UserProfile
+
+
+class Patron:
+    """👤 Who is asking: user, profile, student and their current subscription (with plan)."""
+
+    def __init__(self, user, profile=None, student=None, subscription=None):
+        self.user = user
+        self.profile = profile
+        self.student = student
+        self.subscription = subscription
+
+    @property
+    def plan(self):
+        return self.subscription.plan if self.subscription else None
+
+    @property
+    def is_student(self):
+        return self.student is not None
+
+
+def _students(user):
+    return (
+        Student.objects.filter(user_profile__user=user)
+        .select_related('user_profile', 'current_subscription__plan')
+        .order_by('pk')
+    )
+
+
+def load_patron(user):
+    """One joined query for students; a single profile lookup for everyone else."""
+    if not user.is_authenticated:
+        return Patron(user)
+
+    student = _students(user).first()
+    if student is None:
+        return Patron(user, profile=UserProfile.objects.filter(user=user).first())
+    return _student_patron(user, student)
+
+
+async def aload_patron(user):
+    """See load_patron()."""
+    if not user.is_authenticated:
+        return Patron(user)
+
+    student = await _students(user).afirst()
+    if student is None:
+        return Patron(user, profile=await UserProfile.objects.filter(user=user).afirst())
+    return _student_patron(user, student)
+
+
+def _student_patron(user, student):
+    profile = student.user_profile
+    profile.user = user  # Already loaded by AuthenticationMiddleware
+    subscription = student.current_subscription
+    if subscription is not None:
+        subscription.student = student
+    return Patron(user, profile, student, subscription)
+
+
+def student_or_404(request):
+    if request.patron.student is None:
+        raise Http404('Student profile not found.')
+    return request.patron.student
+
+
+def profile_or_404(request):
+    if request.patron.profile is None:
+        raise Http404('Profile not found.')
+    return request.patron.profile
@@ -1,3 +1,78 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
 
-# Create your tests here.
+from lms_project.query_budget import QueryBudgetTestMixin
+from lms_project.sample_data import PASSWORD, build_library
+from subscription.models import StudentSubscription, SubscriptionPlan
+from .models import Student, UserProfile
+from .patron import load_patron
+
+
+class PatronTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='kate', password='testpass')
+        self.profile = UserProfile.objects.create(user=self.user, phone_no='1', email='kate@example.com', emergency_contact_no='2')
+        self.student = Student.objects.create(user_profile=self.profile, roll_number='401', branch='CS', year=2)
+        old = SubscriptionPlan.objects.create(name='Old', max_books=1, duration_days=30, price=50)
+        self.plan = SubscriptionPlan.objects.create(name='Premium', max_books=5, duration_days=90, price=300)
+        StudentSubscription.objects.create(student=self.student, plan=old)
+        StudentSubscription.objects.create(student=self.student, plan=self.plan)
+
+    def test_student_context_is_one_query(self):
+        with self.assertNumQueries(1):
+            patron = load_patron(self.user)
+            self.assertEqual(patron.student, self.student)
+            self.assertEqual(patron.profile.user, self.user)
+            self.assertEqual(patron.plan, self.plan)  # Latest subscription wins
+            self.assertEqual(patron.subscription.student.roll_number, '401')
+
+    def test_profile_without_student(self):
+        self.student.delete()
+        patron = load_patron(self.user)
+        self.assertEqual((patron.profile, patron.student, patron.subscription), (self.profile, None, None))
+
+    def test_views_resolve_the_patron_once(self):
+        self.client.login(username='kate', password='testpass')
+        # session + user + patron + borrowed books
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('books:my_borrowed_books'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_patron_pages_render(self):
+        self.client.login(username='kate', password='testpass')
+        for name in ('iam:profile', 'iam:edit_profile', 'subscription:my_subscription', 'subscription:pay_fine',
+                     'subscription:select_plan', 'books:my_fines', 'books:user_dashboard'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+
+class IamQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """⏱️ Every iam URL against a generated library."""
+
+    BUDGETS = {
+        'signup': (None, 0),
+        'login': (None, 0),
+        'logout': ('student', 3),
+        'profile': ('student', 3),
+        'edit_profile': ('student', 3),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=30, books=50)
+
+    def test_every_url_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({p.name for p in urlpatterns}, set(self.BUDGETS))
+
+    def test_urls_stay_within_budget(self):
+        from .urls import urlpatterns
+        for pattern in urlpatterns:
+            who, queries = self.BUDGETS[pattern.name]
+            with self.subTest(pattern.name):
+                self.client.logout()
+                if who:
+                    self.client.login(username=self.library.student_user.username, password=PASSWORD)
+                self.assertQueryBudget(reverse(f'iam:{pattern.name}'), queries)
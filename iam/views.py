@@ -1,12 +1,12 @@
 from django.views import View
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 from .forms import SignupForm, UserForm, UserProfileForm
-from .models import UserProfile
+from .patron import profile_or_404
 
 
 # ✅ 1️⃣ Signup View - Class Based
@@ -46,9 +46,8 @@ class SignupView(View):
 # ✅ 2️⃣ User Profile View
 class UserProfileView(LoginRequiredMixin, View):
     def get(self, request):
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-        except UserProfile.DoesNotExist:
+        profile = request.patron.profile
+        if profile is None:
             messages.error(request, "⚠️ Profile not found.")
             return redirect('iam:signup')
 
@@ -61,7 +60,7 @@ class UserProfileView(LoginRequiredMixin, View):
 # ✅ 3️⃣ Edit Profile View
 class EditProfileView(LoginRequiredMixin, View):
     def get(self, request):
-        user_profile = get_object_or_404(UserProfile, user=request.user)
+        user_profile = profile_or_404(request)
         user_form = UserForm(instance=request.user)
         profile_form = UserProfileForm(instance=user_profile)
 
@@ -71,7 +70,7 @@ class EditProfileView(LoginRequiredMixin, View):
         })
 
     def post(self, request):
-        user_profile = get_object_or_404(UserProfile, user=request.user)
+        user_profile = profile_or_404(request)
         user_form = UserForm(request.POST, instance=request.user)
         profile_form = UserProfileForm(request.POST, request.FILES, instance=user_profile)
 
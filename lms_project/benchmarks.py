@@ -0,0 +1,359 @@
+# ✅ FILE: lms_project/benchmarks.py
+
+import asyncio
+import io
+import json
+import math
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.urls import reverse
+
+from books.models import Book, BorrowRecord
+from iam.models import Student, UserProfile
+from subscription.models import StudentSubscription, SubscriptionPlan
+from .query_budget import collect
+
+BORROWER = 'bench'
+
+@dataclass
+class Endpoint:
+    name: str
+    group: str  # catalog / dashboard / export / circulation
+    user: str  # 'student', 'staff' or 'borrower'
+    url: object  # callable(iteration) -> url
+    writes: bool = False  # Changes data; skipped when benchmarking a live database
+
+
+@dataclass
+class Result:
+    name: str
+    group: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    queries: int
+    peak_kb: float
+    errors: int = 0
+    samples: list = field(default_factory=list, repr=False)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (no interpolation, so small runs report real samples)."""
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def make_borrower(prefix=BORROWER):
+    """A student with a large, fresh plan and no history, so every borrow is allowed."""
+    plan = SubscriptionPlan.objects.create(name=f'{prefix} plan', max_books=1000, duration_days=3650, price=0, fine_per_day=0)
+    user = User.objects.create(username=f'{prefix}_borrower', password=make_password(None))
+    profile = UserProfile.objects.create(user=user, phone_no='0', email=f'{prefix}_borrower@example.com', emergency_contact_no='0')
+    student = Student.objects.create(user_profile=profile, roll_number=f'{prefix}-borrower', branch='CS', year=1)
+    StudentSubscription.objects.create(student=student, plan=plan)
+    return user
+
+
+def endpoints(library):
+    """🎯 Every catalog, dashboard, export and circulation endpoint worth timing."""
+    book_ids = list(Book.objects.filter(available_copies__gt=0).order_by('pk').values_list('pk', flat=True)[:500])
+
+    def borrow_url(i):
+        return reverse('books:borrow_book', args=[book_ids[i % len(book_ids)]])
+
+    def return_url(i):
+        # Hand back whatever the borrow endpoint just took out
+        record = BorrowRecord.objects.filter(
+            student__user_profile__user__username=f'{BORROWER}_borrower', return_date__isnull=True,
+        ).order_by('-pk').values_list('pk', flat=True).first()
+        return reverse('books:return_book', args=[record or 0])
+
+    book = library.book.pk
+    return [
+        Endpoint('book_list', 'catalog', 'student', lambda i: reverse('books:book_list')),
+        Endpoint('book_list_last_page', 'catalog', 'student', lambda i: reverse('books:book_list') + '?page=999999'),
+        Endpoint('search', 'catalog', 'student', lambda i: reverse('books:search_books') + '?q=river'),
+        Endpoint('book_detail', 'catalog', 'student', lambda i: reverse('books:book_detail', args=[book])),
+        Endpoint('book_copies', 'catalog', 'student', lambda i: reverse('books:book_copies', args=[book])),
+        Endpoint('recommendations', 'catalog', 'student', lambda i: reverse('books:book_recommendation')),
+        Endpoint('user_dashboard', 'dashboard', 'student', lambda i: reverse('books:user_dashboard')),
+        Endpoint('my_borrowed_books', 'dashboard', 'student', lambda i: reverse('books:my_borrowed_books')),
+        Endpoint('my_fines', 'dashboard', 'student', lambda i: reverse('books:my_fines')),
+        Endpoint('my_subscription', 'dashboard', 'student', lambda i: reverse('subscription:my_subscription')),
+        Endpoint('export_books', 'export', 'staff', lambda i: reverse('books:export_books')),
+        Endpoint('export_borrow_records', 'export', 'staff', lambda i: reverse('books:export_borrow_records')),
+        Endpoint('export_borrow_records_gzip', 'export', 'staff', lambda i: reverse('books:export_borrow_records') + '?gzip=1'),
+        Endpoint('change_feed', 'export', 'staff', lambda i: reverse('books:change_feed') + '?limit=1000'),
+        Endpoint('borrow', 'circulation', 'borrower', borrow_url, writes=True),
+        Endpoint('return', 'circulation', 'borrower', return_url, writes=True),
+    ]
+
+
+def _request(client, url):
+    response = client.get(url)
+    if getattr(response, 'streaming', False):
+        for _ in response.streaming_content:  # Time the whole body, not just the headers
+            pass
+    return response
+
+
+def run(library, iterations=20, warmup=2, only=None, include_writes=True):
+    """
+    ⏱️ Hit each endpoint through the test client. Latency and query counts come
+    from the timed iterations; peak memory from one extra traced request
+    (tracemalloc would distort the timings).
+    """
+    clients = {'student': Client(), 'staff': Client()}
+    clients['student'].force_login(library.student_user)
+    clients['staff'].force_login(library.staff_user)
+    if include_writes:
+        clients['borrower'] = Client()
+        clients['borrower'].force_login(make_borrower())
+
+    selected = [
+        e for e in endpoints(library)
+        if (not only or e.name in only or e.group in only) and (include_writes or not e.writes)
+    ]
+    samples = {e.name: [] for e in selected}
+    queries = {e.name: [] for e in selected}
+    errors = {e.name: 0 for e in selected}
+
+    # Interleave endpoints per iteration, so each borrow is returned before the next one
+    for i in range(warmup + iterations):
+        for endpoint in selected:
+            client = clients[endpoint.user]
+            url = endpoint.url(i)
+            with collect() as stats:
+                started = time.perf_counter()
+                response = _request(client, url)
+                elapsed = (time.perf_counter() - started) * 1000
+            if i < warmup:
+                continue
+            samples[endpoint.name].append(elapsed)
+            queries[endpoint.name].append(stats.count)
+            if response.status_code >= 400:
+                errors[endpoint.name] += 1
+
+    results = []
+    for endpoint in selected:
+        tracemalloc.start()
+        _request(clients[endpoint.user], endpoint.url(warmup + iterations))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        values = samples[endpoint.name]
+        results.append(Result(
+            name=endpoint.name,
+            group=endpoint.group,
+            iterations=len(values),
+            p50_ms=round(percentile(values, 50), 2),
+            p95_ms=round(percentile(values, 95), 2),
+            mean_ms=round(statistics.fmean(values), 2),
+            queries=int(statistics.median(queries[endpoint.name])),
+            peak_kb=round(peak / 1024, 1),
+            errors=errors[endpoint.name],
+            samples=[round(v, 3) for v in values],
+        ))
+    return results
+
+
+def format_table(results, baseline=None):
+    """Plain-text report; with ``baseline`` (a previous JSON report) adds p50/p95 deltas."""
+    previous = {row['name']: row for row in (baseline or {}).get('results', [])}
+    header = f"{'endpoint':<28}{'group':<13}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}{'peak KB':>10}{'errors':>8}"
+    if previous:
+        header += f"{'Δp50':>9}{'Δp95':>9}{'Δq':>6}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        line = f"{r.name:<28}{r.group:<13}{r.p50_ms:>9.2f}{r.p95_ms:>9.2f}{r.queries:>9}{r.peak_kb:>10.1f}{r.errors:>8}"
+        old = previous.get(r.name)
+        if old:
+            line += f"{_delta(r.p50_ms, old['p50_ms']):>9}{_delta(r.p95_ms, old['p95_ms']):>9}{r.queries - old['queries']:>+6}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def _delta(new, old):
+    return f"{(new - old) / old * 100:+.0f}%" if old else 'n/a'
+
+
+def to_json(results, meta):
+    return json.dumps({'meta': meta, 'results': [asdict(r) for r in results]}, indent=2)
+
+
+# 🔹 Concurrency: the async catalog / dashboard pages under ASGI vs WSGI
+
+@dataclass
+class LoadResult:
+    server: str  # 'asgi' or 'wsgi'
+    clients: int
+    requests: int
+    seconds: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    errors: int = 0
+
+
+def concurrency_urls(library):
+    return [
+        reverse('books:book_list'),
+        reverse('books:search_books') + '?q=river',
+        reverse('books:book_detail', args=[library.book.pk]),
+        reverse('books:user_dashboard'),
+    ]
+
+
+def _session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    morsel = client.cookies[settings.SESSION_COOKIE_NAME]
+    return f'{morsel.key}={morsel.value}'
+
+
+def _wsgi_environ(url, cookie):
+    parts = urlsplit(url)
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': parts.path, 'QUERY_STRING': parts.query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def _load_wsgi(urls, cookie, clients, requests, client_ms, workers):
+    """
+    A threaded WSGI server (like ``gunicorn --threads``): each connection holds
+    a worker until its response has been written to the (slow) client.
+    """
+    app = get_wsgi_application()
+    latencies, errors = [], []
+
+    def serve(url):
+        status = []
+        body = app(_wsgi_environ(url, cookie), lambda s, headers, exc_info=None: status.append(s))
+        try:
+            for _ in body:
+                pass
+            time.sleep(client_ms / 1000)  # Sending to a slow client blocks the worker
+        finally:
+            body.close()
+        return int(status[0].split()[0])
+
+    def client(n, pool):
+        for i in range(requests):
+            started = time.perf_counter()
+            code = pool.submit(serve, urls[(n + i) % len(urls)]).result()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if code >= 400:
+                errors.append(code)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        threads = [threading.Thread(target=client, args=(n, pool)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return latencies, len(errors)
+
+
+def _load_asgi(urls, cookie, clients, requests, client_ms):
+    """One event loop; a slow client only keeps its own coroutine waiting."""
+    app = get_asgi_application()
+    latencies, errors = [], []
+
+    async def serve(url):
+        parts = urlsplit(url)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': parts.path, 'raw_path': parts.path.encode(), 'query_string': parts.query.encode(),
+            'root_path': '', 'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        received, status = [], []
+
+        async def receive():
+            if not received:
+                received.append(True)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Future()  # The client never disconnects early
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                await asyncio.sleep(client_ms / 1000)  # Sending to a slow client
+
+        await app(scope, receive, send)
+        return status[0]
+
+    async def client(n):
+        for i in range(requests):
+            started = time.perf_counter()
+            code = await serve(urls[(n + i) % len(urls)])
+            latencies.append((time.perf_counter() - started) * 1000)
+            if code >= 400:
+                errors.append(code)
+
+    async def main():
+        await asyncio.gather(*(client(n) for n in range(clients)))
+
+    asyncio.run(main())
+    return latencies, len(errors)
+
+
+def run_concurrency(library, servers=('wsgi', 'asgi'), clients=(8, 32, 128), requests=3, client_ms=1000, workers=8):
+    """
+    ⏱️ ``clients`` concurrent connections, each fetching ``requests`` catalog /
+    dashboard pages in turn and reading every response ``client_ms`` slowly.
+    WSGI gets ``workers`` threads; ASGI one event loop. Both handlers run in
+    process, so only the server model differs.
+    """
+    urls = concurrency_urls(library)
+    cookie = _session_cookie(library.student_user)
+    results = []
+    for server in servers:
+        for count in clients:
+            started = time.perf_counter()
+            if server == 'asgi':
+                latencies, errors = _load_asgi(urls, cookie, count, requests, client_ms)
+            else:
+                latencies, errors = _load_wsgi(urls, cookie, count, requests, client_ms, workers)
+            seconds = time.perf_counter() - started
+            results.append(LoadResult(
+                server=server,
+                clients=count,
+                requests=len(latencies),
+                seconds=round(seconds, 2),
+                rps=round(len(latencies) / seconds, 1),
+                p50_ms=round(percentile(latencies, 50), 1),
+                p95_ms=round(percentile(latencies, 95), 1),
+                errors=errors,
+            ))
+    return results
+
+
+def format_load_table(results):
+    header = f"{'server':<8}{'clients':>9}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.server:<8}{r.clients:>9}{r.requests:>10}{r.rps:>9.1f}{r.p50_ms:>10.1f}{r.p95_ms:>10.1f}{r.errors:>8}"
+        )
+    return '\n'.join(lines)
+
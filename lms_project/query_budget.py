@@ -0,0 +1,149 @@
+# ✅ FILE: lms_project/query_budget.py
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = {'queries': 25, 'duplicates': 2, 'db_ms': 250}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SAVEPOINTS = re.compile(r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b')
+
+
+def fingerprint(sql):
+    """SQL with literals and IN (...) lists collapsed, so repeats of one query look the same."""
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LISTS.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+class QueryStats:
+    """📊 Queries seen on every DB connection while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0  # seconds
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            if not _SAVEPOINTS.match(sql):
+                self.count += 1
+                self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def db_ms(self):
+        return round(self.db_time * 1000, 1)
+
+    @property
+    def duplicates(self):
+        """Fingerprints that ran more than once, most repeated first (the N+1 suspects)."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > 1]
+
+    def over_budget(self, budget):
+        problems = []
+        if self.count > budget['queries']:
+            problems.append(f"{self.count} queries > {budget['queries']}")
+        worst = self.duplicates[0][1] if self.duplicates else 1
+        if worst > budget['duplicates']:
+            problems.append(f"a query repeated {worst}x > {budget['duplicates']}")
+        if self.db_ms > budget['db_ms']:
+            problems.append(f"{self.db_ms} ms in the database > {budget['db_ms']}")
+        return problems
+
+
+@contextmanager
+def collect():
+    stats = QueryStats()
+    # Once per connection object: an alias may share another's connection (test mirrors)
+    unique = {id(connections[alias]): connections[alias] for alias in connections}
+    wrappers = [connection.execute_wrapper(stats) for connection in unique.values()]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        yield stats
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+
+def budget_for(view_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return {**DEFAULT_BUDGET, **budgets.get('default', {}), **budgets.get(view_name, {})}
+
+
+class QueryBudgetMiddleware:
+    """
+    ⏱️ Counts queries, repeated queries and DB time for each request and logs
+    the views that go over their budget (settings.QUERY_BUDGETS, keyed by URL name).
+    Streaming bodies are consumed after this runs and are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        # Connections belong to the thread the async ORM runs queries in, not to the event loop
+        collector = collect()
+        stats = await sync_to_async(collector.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(collector.__exit__)(None, None, None)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        problems = stats.over_budget(budget_for(view_name))
+        if problems:
+            logger.warning(
+                "Query budget exceeded for %s (%s): %s\n%s",
+                view_name, request.path, '; '.join(problems),
+                '\n'.join(f"  {n}x {sql[:300]}" for sql, n in (stats.duplicates or stats.fingerprints.most_common(5))[:5]),
+            )
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(stats.count)
+            response['X-DB-Time-Ms'] = str(stats.db_ms)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """🧪 For TestCase classes: ``assertQueryBudget(url, queries=..., duplicates=...)``."""
+
+    def assertQueryBudget(self, url, queries, duplicates=DEFAULT_BUDGET['duplicates'], method='get', **kwargs):
+        with collect() as stats:
+            response = getattr(self.client, method)(url, **kwargs)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)  # Streamed rows are part of the cost
+        self.assertLess(response.status_code, 500, url)
+        report = '\n'.join(f"  {n}x {sql}" for sql, n in stats.fingerprints.most_common(10))
+        self.assertLessEqual(stats.count, queries, f"{url}: {stats.count} queries\n{report}")
+        worst = stats.duplicates[0][1] if stats.duplicates else 1
+        self.assertLessEqual(worst, duplicates, f"{url}: query repeated {worst}x\n{report}")
+        return response
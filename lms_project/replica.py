@@ -0,0 +1,191 @@
+# ✅ FILE: lms_project/replica.py
+
+import contextvars
+import functools
+import os
+import sqlite3
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.loader import MigrationLoader
+
+from books import catalog_cache
+
+REPLICA = 'replica'
+
+# Per request (or per thread / task): may reads go to the replica, and has this request written?
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+PIN_COOKIE = 'lms_primary'
+
+
+def replica_available():
+    """
+    A replica alias is configured and, for SQLite, has been refreshed since the
+    last ``migrate``: a copy with the old schema would make catalog pages fail.
+    """
+    if REPLICA not in connections.settings:
+        return False
+    replica = connections[REPLICA]
+    if replica.settings_dict['NAME'] == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        return False  # Same database (a test mirror): nothing to offload
+    if replica.vendor == 'sqlite' and not replica.is_in_memory_db():
+        path = str(replica.settings_dict['NAME'])
+        return os.path.exists(path) and _replica_migrated(path, os.stat(path).st_mtime_ns)
+    return True
+
+
+@functools.cache
+def _latest_migrations():
+    return frozenset(MigrationLoader(None, ignore_no_migrations=True).graph.leaf_nodes())
+
+
+@functools.lru_cache(maxsize=4)
+def _replica_migrated(path, mtime_ns):
+    # Checked once per replica file version: a refresh changes the modification time
+    replica = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True)
+    try:
+        applied = set(replica.execute('SELECT app, name FROM django_migrations'))
+    except sqlite3.DatabaseError:  # Not a copy of a migrated database
+        return False
+    finally:
+        replica.close()
+    return _latest_migrations() <= applied
+
+
+def _replica_apps():
+    return set(getattr(settings, 'REPLICA_APPS', ()))
+
+
+@contextmanager
+def reading_from_replica():
+    """Send reads of REPLICA_APPS models in this block to the replica (until something is written)."""
+    use = _use_replica.set(replica_available())
+    wrote = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _wrote.reset(wrote)
+        _use_replica.reset(use)
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+class ReplicaRouter:
+    """
+    🔀 Reads of catalog models (REPLICA_APPS) go to the replica inside
+    ``reading_from_replica()``; everything else, every write and every read
+    after a write stays on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _wrote.get() and model._meta.app_label in _replica_apps():
+            return REPLICA
+        return None  # Django's default: the instance's database, else default
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in _replica_apps():
+            _wrote.set(True)  # Read-your-writes for the rest of the request
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data; no opinion on any other database
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA  # The replica is a copy; refresh_replica brings the schema along
+
+
+class ReplicaMiddleware:
+    """
+    Runs the views in settings.REPLICA_VIEWS (catalog, search, reports, exports)
+    inside ``reading_from_replica()``. A request that writes catalog data sets a
+    short-lived cookie that keeps that browser on the primary until the replica
+    has caught up (REPLICA_PIN_SECONDS, about one refresh interval).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = _use_replica.set(False), _wrote.set(False)  # Per request; worker threads are reused
+        try:
+            return self.finish(self.get_response(request))
+        finally:
+            _reset(tokens)
+
+    async def __acall__(self, request):
+        tokens = _use_replica.set(False), _wrote.set(False)
+        try:
+            return self.finish(await self.get_response(request))
+        finally:
+            _reset(tokens)
+
+    def finish(self, response):
+        if _use_replica.get() and response.streaming and not response.is_async:
+            # Streamed exports run their queries after this returns
+            response.streaming_content = _stream_from_replica(response.streaming_content)
+        if _wrote.get():
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Under ASGI this runs through sync_to_async, which carries the context variables back
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        if view_name in settings.REPLICA_VIEWS and request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES:
+            _use_replica.set(replica_available())
+        return None
+
+
+def _reset(tokens):
+    use, wrote = tokens
+    _wrote.reset(wrote)
+    _use_replica.reset(use)
+
+
+def refresh_replica(target=None, source=DEFAULT_DB_ALIAS):
+    """
+    📥 Copy the primary into the replica file with SQLite's online backup API.
+    Safe while the site is up: the copy is one consistent snapshot, and replica
+    readers (persistent connections included) see the new data once it is done.
+    """
+    primary = connections[source]
+    if primary.vendor != 'sqlite':
+        raise ImproperlyConfigured('refresh_replica copies SQLite files; use the database server\'s replication.')
+    target = str(target or connections.settings[REPLICA]['NAME'])
+    if primary.is_in_memory_db() or os.path.abspath(target) == os.path.abspath(str(primary.settings_dict['NAME'])):
+        raise ImproperlyConfigured('The replica must be a different database file than the primary.')
+
+    primary.ensure_connection()
+    replica = sqlite3.connect(target, timeout=30)  # Waits for replica readers to finish their transaction
+    try:
+        # One step: a single read transaction on the primary, which WAL writers do not wait for.
+        # A stepwise copy would restart every time the primary changes underneath it.
+        primary.connection.backup(replica)
+    finally:
+        replica.close()
+    # Pages read from the stale replica may have been cached under versions bumped since;
+    # start the catalog cache over now that the replica has caught up
+    catalog_cache.bump_books()
+    return os.path.getsize(target)
+
+
+def _stream_from_replica(content):
+    with reading_from_replica():
+        yield from content
@@ -0,0 +1,186 @@
+# ✅ FILE: lms_project/sample_data.py
+
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+
+from books import catalog_cache, search
+from books.models import Author, Book, BookCopy, BorrowRecord, Category, Fine
+from iam.models import StaffProfile, Student, UserProfile
+from subscription.models import StudentSubscription, SubscriptionPlan
+
+PASSWORD = 'library123'  # Every generated account uses it
+BATCH_SIZE = 2000
+
+
+@dataclass
+class Library:
+    """Handles to a few generated rows, for tests and benchmarks to log in / link to."""
+    student_user: User
+    staff_user: User
+    student: Student
+    book: Book
+    open_record: BorrowRecord
+    books: int
+    students: int
+    copies: int
+    records: int
+
+
+def _bulk(model, objects):
+    return model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+
+
+@transaction.atomic
+def build_library(students=50, books=300, copies_per_book=3, loans_per_student=6, years=1, seed=0, prefix='gen'):
+    """
+    📚 A realistic, reproducible library: plans, students with subscriptions,
+    a catalog with copies, and a borrowing history with overdue books and fines.
+    Everything goes in with bulk_create, then the derived data (copy counters,
+    search index, current subscriptions) is filled in the same way the app keeps it.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    password = make_password(PASSWORD)  # Hash once, not once per user
+
+    plans = _bulk(SubscriptionPlan, [
+        SubscriptionPlan(name=f'{prefix} {name}', max_books=max_books, duration_days=days, price=price, fine_per_day=fine)
+        for name, max_books, days, price, fine in [
+            ('Basic', 3, 30, 99, 5), ('Standard', 5, 90, 249, 3), ('Premium', 10, 365, 799, 1),
+        ]
+    ])
+    categories = _bulk(Category, [
+        Category(name=f'{prefix} {name}', location=f'Rack {chr(65 + i)}')
+        for i, name in enumerate(['Fiction', 'Science', 'History', 'Technology', 'Philosophy', 'Art', 'Poetry', 'Travel'])
+    ])
+    authors = _bulk(Author, [Author(name=f'{prefix} Author {i}') for i in range(max(books // 4, 1))])
+
+    # 👤 Accounts: one staff member plus the students
+    users = _bulk(User, [
+        User(username=f'{prefix}_staff', password=password, email=f'{prefix}_staff@example.com', is_staff=True),
+    ] + [
+        User(username=f'{prefix}_student{i}', password=password, email=f'{prefix}_student{i}@example.com', first_name=f'Student{i}')
+        for i in range(students)
+    ])
+    users = list(User.objects.filter(username__startswith=f'{prefix}_').order_by('pk'))
+    staff_user, student_users = users[0], users[1:]
+    profiles = _bulk(UserProfile, [
+        UserProfile(user=user, phone_no='9000000000', email=f'{user.username}@profile.example.com', emergency_contact_no='9111111111')
+        for user in users
+    ])
+    profiles = list(UserProfile.objects.filter(user__in=users).order_by('user_id'))
+    _bulk(StaffProfile, [StaffProfile(user_profile=profiles[0], position='Librarian', staff_id=f'{prefix}-ST-1')])
+    student_rows = _bulk(Student, [
+        Student(user_profile=profile, roll_number=f'{prefix}-{i:06d}', branch=rng.choice(['CS', 'IT', 'ME', 'EE']), year=rng.randint(1, 4))
+        for i, profile in enumerate(profiles[1:])
+    ])
+    student_rows = list(Student.objects.filter(user_profile__in=profiles[1:]).order_by('pk'))
+
+    subscriptions = []
+    for student in student_rows:
+        plan = rng.choice(plans)
+        start = today - timedelta(days=rng.randint(0, plan.duration_days + 30))
+        end = start + timedelta(days=plan.duration_days)
+        subscriptions.append(StudentSubscription(
+            student=student, plan=plan, start_date=start, end_date=end,
+            status='active' if end >= today else 'expired',
+        ))
+    subscriptions = _bulk(StudentSubscription, subscriptions)
+    current = {s.student_id: s.pk for s in StudentSubscription.objects.filter(student__in=student_rows)}
+    for student in student_rows:
+        student.current_subscription_id = current[student.pk]
+    Student.objects.bulk_update(student_rows, ['current_subscription'], batch_size=BATCH_SIZE)
+    # start_date is auto_now_add, so bulk_create stamped today; put the generated dates back
+    StudentSubscription.objects.bulk_update(subscriptions, ['start_date'], batch_size=BATCH_SIZE)
+
+    # 📖 Catalog
+    # Generated ISBNs use the 979 range and continue after any earlier run
+    last_isbn = Book.objects.filter(isbn__startswith='979', isbn__regex=r'^[0-9]{13}$').aggregate(m=Max('isbn'))['m']
+    isbn_base = int(last_isbn) + 1 if last_isbn else 9790000000000
+    book_rows = _bulk(Book, [
+        Book(
+            title=f'{rng.choice(["The", "A", "On", "Beyond"])} {rng.choice(["Silent", "Quantum", "Lost", "Modern", "Hidden"])} '
+                  f'{rng.choice(["River", "Theory", "Empire", "Garden", "Algorithm"])} {i}',
+            isbn=str(isbn_base + i),
+            category=rng.choice(categories),
+            description='Generated catalog entry.',
+            published_date=date(1950, 1, 1) + timedelta(days=rng.randint(0, 27000)),
+            recommended=rng.random() < 0.05,
+        )
+        for i in range(books)
+    ])
+    book_rows = list(Book.objects.filter(isbn__in=[b.isbn for b in book_rows]).order_by('pk'))
+    Book.authors.through.objects.bulk_create([
+        Book.authors.through(book_id=book.pk, author_id=author.pk)
+        for book in book_rows for author in rng.sample(authors, min(len(authors), rng.choice([1, 1, 2])))
+    ], batch_size=BATCH_SIZE)
+    copies = _bulk(BookCopy, [
+        BookCopy(book=book, copy_id=f'{prefix}-{book.pk}-{n}', status='available')
+        for book in book_rows for n in range(copies_per_book)
+    ])
+    copies = list(BookCopy.objects.filter(book__in=book_rows).order_by('pk'))
+
+    # 🔁 Borrowing history over ``years``: old loans are returned (some late),
+    # and about one loan in five per student is still out, some of them overdue.
+    records, borrowed = [], set()
+    free = list(copies)
+    rng.shuffle(free)
+    for student in student_rows:
+        for _ in range(loans_per_student):
+            if rng.random() < 0.2 and free:
+                copy = free.pop()  # Each copy is out to one student at a time
+                borrowed.add(copy.pk)
+                due = today - timedelta(days=rng.randint(-7, 30))
+                records.append(BorrowRecord(
+                    student=student, book_copy=copy, borrow_date=due - timedelta(days=7), due_date=due, return_date=None,
+                ))
+            else:
+                due = today - timedelta(days=rng.randint(8, max(years * 365, 9)))
+                returned = due + timedelta(days=rng.randint(-6, 10) if rng.random() < 0.3 else rng.randint(-6, 0))
+                records.append(BorrowRecord(
+                    student=student, book_copy=rng.choice(copies), borrow_date=due - timedelta(days=7),
+                    due_date=due, return_date=min(returned, today),
+                ))
+    records = _bulk(BorrowRecord, records)
+    records = list(BorrowRecord.objects.filter(student__in=student_rows).order_by('pk'))
+
+    BookCopy.objects.filter(pk__in=borrowed).update(status='borrowed')
+    borrowed_per_book = {}
+    for copy in copies:
+        if copy.pk in borrowed:
+            borrowed_per_book[copy.book_id] = borrowed_per_book.get(copy.book_id, 0) + 1
+    for book in book_rows:
+        book.borrowed_copies = borrowed_per_book.get(book.pk, 0)
+        book.available_copies = copies_per_book - book.borrowed_copies
+    Book.objects.bulk_update(book_rows, ['available_copies', 'borrowed_copies'], batch_size=BATCH_SIZE)
+
+    rate = {s.student_id: s.plan.fine_per_day for s in subscriptions}
+    fines = [
+        Fine(borrow_record=r, student_id=r.student_id, amount=(r.return_date - r.due_date).days * rate[r.student_id])
+        for r in records if r.return_date and r.return_date > r.due_date
+    ]
+    for fine in fines:
+        fine.paid = rng.random() < 0.6
+        fine.paid_amount = fine.amount if fine.paid else 0
+    _bulk(Fine, fines)
+
+    search.index_books([book.pk for book in book_rows])
+    catalog_cache.bump_books()  # Everything above skipped the model signals
+
+    open_record = next((r for r in records if r.return_date is None), records[0])
+    return Library(
+        student_user=open_record.student.user_profile.user,
+        staff_user=staff_user,
+        student=open_record.student,
+        book=book_rows[0],
+        open_record=open_record,
+        books=len(book_rows),
+        students=len(student_rows),
+        copies=len(copies),
+        records=len(records),
+    )
@@ -34,11 +34,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'lms_project.query_budget.QueryBudgetMiddleware',  # ⏱️ First, so it sees every query of the request
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'iam.middleware.PatronMiddleware',  # request.patron (profile, student, subscription)
+    'lms_project.replica.ReplicaMiddleware',  # REPLICA_VIEWS read catalog data from the replica
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -67,9 +70,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # 🔀 Read replica for catalog / export traffic, a local copy made by `manage.py refresh_replica`.
+    # Unused until that has run once; in tests it is the default database.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'OPTIONS': {'init_command': 'PRAGMA query_only=1'},  # Only refresh_replica writes here
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['lms_project.replica.ReplicaRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,4 +126,61 @@ EMAIL_HOST_USER = 'shivtejkalbhor02@gmail.com'          # तुमचा email
 EMAIL_HOST_PASSWORD = 'ynhu tyri jbto pciz'    # Gmail app password
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
-CSRF_TRUSTED_ORIGINS = ['http://127.0.0.1:8000']
\ No newline at end of file
+CSRF_TRUSTED_ORIGINS = ['http://127.0.0.1:8000']
+
+# 📚 Catalog listing
+CATALOG_PAGE_SIZE = 25
+CATALOG_MAX_PAGE_SIZE = 100
+SEARCH_MAX_RESULTS = 1000
+
+# ⏱️ Per-view query budgets (URL name -> limits); views over budget are logged
+QUERY_BUDGETS = {
+    'default': {'queries': 25, 'duplicates': 2, 'db_ms': 250},
+    'books:borrow_book': {'duplicates': 3},
+    'books:return_book': {'duplicates': 3},
+}
+
+# 🔀 Replica routing (lms_project/replica.py): models of these apps, on these pages
+REPLICA_APPS = ['books']
+# List and search pages read live availability counters from the primary (catalog.alive_availability);
+# the detail and copies pages show the status of each copy, so they stay on the primary.
+REPLICA_VIEWS = {
+    'books:book_list', 'books:search_books', 'books:book_recommendation',
+    'books:export_books', 'books:export_borrow_records', 'books:api_books', 'books:api_book_detail',
+    'books:api_authors', 'books:api_categories',
+}
+REPLICA_PIN_SECONDS = 6 * 60  # After writing, a browser reads from the primary for one refresh interval + margin
+
+# 📊 Student dashboard summary (invalidated on borrow / return / fine changes)
+DASHBOARD_CACHE_TIMEOUT = 60 * 15
+
+# 📚 Catalog pages (list, detail, recommendations); versioned keys bumped by catalog and
+# circulation writes, so the timeout only bounds memory. 0 switches the cache off.
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 6
+CATALOG_CACHE_ALIAS = 'default'
+
+
+# 📅 In-process scheduler (python manage.py run_scheduler)
+# "minute hour day month weekday", evaluated in TIME_ZONE
+SCHEDULED_JOBS = {
+    'due_reminders': {
+        'schedule': '0 10 * * *',
+        'task': 'subscription.custom_email_tasks.send_due_reminders',
+    },
+    'due_soon_reminders': {
+        'schedule': '0 10 * * *',
+        'task': 'subscription.custom_email_tasks.send_due_soon_reminders',
+    },
+    'accrue_fines': {
+        'schedule': '5 0 * * *',
+        'task': 'books.fines.accrue_fines',
+    },
+    'expire_subscriptions': {
+        'schedule': '1 0 * * *',
+        'task': 'subscription.expiry.expire_subscriptions',
+    },
+    'refresh_replica': {
+        'schedule': '*/5 * * * *',
+        'task': 'lms_project.replica.refresh_replica',
+    },
+}
@@ -0,0 +1,99 @@
+"""
+Production settings: DJANGO_SETTINGS_MODULE=lms_project.settings_production
+
+Everything from settings.py, with debug off, secrets from the environment,
+a tuned SQLite connection, compiled templates kept in memory and a cache
+shared by all worker processes (the catalog version counters must be seen by
+every worker).
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+
+# 🔹 SQLite tuned for many readers and a few writers
+# WAL: readers keep reading their snapshot while circulation / bulk uploads write.
+# synchronous=NORMAL is durable in WAL mode except for the last commits on power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # ms to wait for the write lock instead of failing at once
+    'cache_size': -64000,  # KiB (negative), i.e. 64 MB of page cache per connection
+    'mmap_size': 268435456,  # 256 MB of the file read through the OS page cache
+    'temp_store': 'MEMORY',
+}
+
+# Persistent connections suit threaded WSGI workers. Under ASGI each request runs its
+# queries on a thread of its own, so kept connections would pile up: asgi.py sets 0.
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 600))
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_PATH', str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': CONN_MAX_AGE,  # Keep connections (and their pragmas / page cache) between requests
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Run on every new connection; per-connection pragmas would otherwise reset
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            # Writers take the lock at BEGIN, so a read transaction never has to upgrade (and fail)
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_REPLICA_PATH', str(BASE_DIR / 'db.replica.sqlite3')),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(
+                f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items() if name != 'journal_mode'
+            ) + ';PRAGMA query_only=1',
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# 🔹 Templates are read and compiled once per process, not on every render
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,  # Not allowed together with explicit loaders
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            p for p in TEMPLATES[0]['OPTIONS']['context_processors'] if p != 'django.template.context_processors.debug'
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# 🔹 Shared cache: Redis when REDIS_URL is set, otherwise files on this host
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('DJANGO_CACHE_DIR', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        },
+    }
@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import SubscriptionPlan, StudentSubscription, Fine, BulkUpload
+from .models import SubscriptionPlan, StudentSubscription, Fine, BulkUpload, OutboxEmail, JobRun, NotificationLedger
 
 admin.site.register(SubscriptionPlan)
 admin.site.register(StudentSubscription)
 admin.site.register(Fine)
 admin.site.register(BulkUpload)
+admin.site.register(OutboxEmail)
+admin.site.register(JobRun)
+admin.site.register(NotificationLedger)
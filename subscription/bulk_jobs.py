@@ -0,0 +1,100 @@
+# ✅ FILE: subscription/bulk_jobs.py
+
+import csv
+import io
+import time
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from books.ingest import ingest_rows
+from .models import BulkUpload
+
+STALE_JOB = timedelta(minutes=15)  # "running" jobs with no progress for this long belong to a dead worker
+
+
+def claim_next_job(now=None):
+    """
+    🔒 Take the oldest pending upload. The conditional update makes sure two
+    workers never pick the same job.
+    """
+    now = now or timezone.now()
+    BulkUpload.objects.filter(status='running', heartbeat_at__lt=now - STALE_JOB).update(status='pending')
+
+    for job_id in BulkUpload.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True)[:5]:
+        claimed = BulkUpload.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return BulkUpload.objects.get(pk=job_id)
+    return None
+
+
+def _open_rows(job):
+    # Stream the stored file instead of reading it into memory
+    handle = job.upload_file.open('rb')
+    text = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    next(reader, None)  # skip header row
+    return text, reader
+
+
+def _count_rows(job):
+    text, reader = _open_rows(job)
+    try:
+        return sum(1 for row in reader if any(value.strip() for value in row))
+    finally:
+        text.close()
+
+
+def process_job(job, chunk_size=1000):
+    """
+    📚 Run one upload through the ingest engine, writing progress to the job row
+    after every chunk so the status page can poll it.
+    """
+    started = time.monotonic()
+    try:
+        total = _count_rows(job)
+        BulkUpload.objects.filter(pk=job.pk).update(total_rows=total, heartbeat_at=timezone.now())
+
+        def progress(report):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            BulkUpload.objects.filter(pk=job.pk).update(
+                processed_rows=report.rows,
+                failed_rows=report.failed_rows,
+                created_books=report.created_books,
+                rows_per_second=round(report.rows / elapsed, 1),
+                heartbeat_at=timezone.now(),  # Still alive: keeps claim_next_job from reclaiming the job
+            )
+
+        text, reader = _open_rows(job)
+        try:
+            report = ingest_rows(reader, chunk_size=chunk_size, progress=progress)
+        finally:
+            text.close()
+    except Exception as e:  # Bad encoding, missing file, ...
+        BulkUpload.objects.filter(pk=job.pk).update(
+            status='failed', message=str(e), finished_at=timezone.now()
+        )
+        job.refresh_from_db()
+        return job
+
+    job.refresh_from_db()
+    if report.errors:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['line', 'error'])
+        writer.writerows([error.line, error.message] for error in report.errors)
+        job.error_file.save(f'upload_{job.pk}_errors.csv', ContentFile(out.getvalue().encode('utf-8')), save=False)
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    job.status = 'done'
+    job.total_rows = report.rows
+    job.processed_rows = report.rows
+    job.failed_rows = report.failed_rows
+    job.created_books = report.created_books
+    job.rows_per_second = round(report.rows / elapsed, 1)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
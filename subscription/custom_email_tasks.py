@@ -1,60 +1,197 @@
 # ✅ FILE: subscription/custom_email_tasks.py
 
+from dataclasses import dataclass, field
 from datetime import timedelta, date
-from django.core.mail import send_mail
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
 from books.models import BorrowRecord
+from .models import NotificationLedger
+from .outbox import enqueue_many
+
+
+@dataclass
+class ReminderReport:
+    queued: int = 0
+    sent: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def __str__(self):
+        counts = f"{self.sent} sent, {self.skipped} skipped, {self.failed} failed"
+        return f"{self.queued} queued, {counts}" if self.queued else counts
 
 
-def send_due_soon_reminders():
+@dataclass
+class Digest:
+    student_id: int
+    username: str
+    first_name: str
+    email: str
+    books: list  # (title, due_date) pairs
+    record_ids: list
+
+
+def build_digests(records):
+    """
+    📬 Group borrow records into one digest per student.
+    Everything needed comes from one joined query (no per-record lookups).
+    """
+    rows = records.order_by('student_id', 'due_date', 'pk').values_list(
+        'student_id',
+        'student__user_profile__user__username',
+        'student__user_profile__user__first_name',
+        'student__user_profile__user__email',
+        'book_copy__book__title',
+        'due_date',
+        'pk',
+    )
+    digests = []
+    for student_id, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        _, username, first_name, email, _, _, _ = group[0]
+        digests.append(Digest(
+            student_id, username, first_name, email,
+            [(row[4], row[5]) for row in group], [row[6] for row in group],
+        ))
+    return digests
+
+
+def not_yet_notified(records, kind, today):
+    """Drop records that already got this kind of reminder today (reruns are no-ops)."""
+    done = NotificationLedger.objects.filter(kind=kind, notified_on=today).values('borrow_record_id')
+    return records.exclude(pk__in=done)
+
+
+def record_notified(digests, kind, today):
+    # No ignore_conflicts: a concurrent run that got here first makes this one fail
+    NotificationLedger.objects.bulk_create([
+        NotificationLedger(kind=kind, borrow_record_id=record_id, notified_on=today)
+        for digest in digests for record_id in digest.record_ids
+    ], batch_size=500)
+
+
+def render_digest(digest, heading, closing):
+    lines = '\n'.join(f'  • "{title}" (due {due_date})' for title, due_date in digest.books)
+    return (
+        f"Dear {digest.first_name or digest.username},\n\n"
+        f"{heading}\n\n{lines}\n\n"
+        f"{closing}\n\n"
+        "Thank you,\nLibrary Management System"
+    )
+
+
+def send_digests(digests, subject, heading, closing, connection=None, queue=True, kind=None, today=None):
+    """
+    📧 Queue digests in the outbox (default), or send them now over one reused
+    mail connection, one message per call: when a call fails, exactly that
+    message failed (a failed multi-message call may have delivered some of its
+    messages already, and resending them would send duplicates).
+    With ``kind`` set, every delivered digest is written to the notification ledger.
+    """
+    report = ReminderReport()
+    outgoing = []
+    for digest in digests:
+        if not digest.email:
+            report.skipped += 1
+            continue
+        body = render_digest(digest, heading, closing)
+        outgoing.append((digest, EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [digest.email])))
+    if not outgoing:
+        return report
+
+    if queue:
+        try:
+            with transaction.atomic():
+                if kind:
+                    record_notified([digest for digest, _ in outgoing], kind, today)
+                report.queued = len(enqueue_many([message for _, message in outgoing]))
+        except IntegrityError:
+            report.errors.append("another run already sent these reminders")
+        return report
+
+    delivered = []
+    connection = connection or get_connection(fail_silently=False)
+    connection.open()
+    try:
+        for digest, message in outgoing:
+            try:
+                report.sent += connection.send_messages([message]) or 0
+                delivered.append(digest)
+            except Exception as e:
+                report.failed += 1
+                report.errors.append(f"{digest.username}: {e}")
+    finally:
+        connection.close()
+
+    if kind and delivered:
+        try:
+            record_notified(delivered, kind, today)
+        except IntegrityError:
+            report.errors.append("another run already sent these reminders")
+    return report
+
+
+def send_due_soon_reminders(today=None, connection=None, queue=True):
     """
     📅 Sends reminder emails for books due tomorrow.
     Called manually or via cron/command.
     """
-    today = date.today()
+    today = today or date.today()
     reminder_date = today + timedelta(days=1)  # Target books due tomorrow
 
     # Only borrowed books not yet returned
     records = BorrowRecord.objects.filter(return_date__isnull=True, due_date=reminder_date)
+    return send_digests(
+        build_digests(not_yet_notified(records, 'due_soon', today)),
+        subject="📚 Reminder: Books Due Tomorrow",
+        heading=f"The following borrowed books are due tomorrow ({reminder_date}):",
+        closing="Please return them on time to avoid any fine.",
+        connection=connection,
+        queue=queue,
+        kind='due_soon',
+        today=today,
+    )
+
 
-    for record in records:
-        user = record.student.user_profile.user
-        if user.email:
-            send_mail(
-                subject="📚 Reminder: Book Due Tomorrow",
-                message=(
-                    f"Dear {user.first_name},\n\n"
-                    f"Your borrowed book '{record.book_copy.book.title}' is due tomorrow ({record.due_date}).\n"
-                    "Please return it on time to avoid any fine.\n\n"
-                    "Thank you,\nLibrary Management System"
-                ),
-                from_email=None,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-
-
-def send_overdue_reminders():
+def send_overdue_reminders(today=None, connection=None, queue=True):
     """
     📧 Sends DAILY email reminders for books overdue by 3+ days and not yet returned.
     """
-    today = date.today()
+    today = today or date.today()
     overdue_threshold = today - timedelta(days=3)
 
     # Target books that are overdue for 3 or more days
     records = BorrowRecord.objects.filter(return_date__isnull=True, due_date__lte=overdue_threshold)
+    return send_digests(
+        build_digests(not_yet_notified(records, 'overdue', today)),
+        subject="⚠️ Overdue Book Alert",
+        heading="The following borrowed books are overdue:",
+        closing="Please return them as soon as possible to avoid more fines.",
+        connection=connection,
+        queue=queue,
+        kind='overdue',
+        today=today,
+    )
 
-    for record in records:
-        user = record.student.user_profile.user
-        if user.email:
-            send_mail(
-                subject="⚠️ Overdue Book Alert",
-                message=(
-                    f"Dear {user.first_name},\n\n"
-                    f"Your borrowed book '{record.book_copy.book.title}' was due on {record.due_date} and is now overdue.\n"
-                    "Please return it as soon as possible to avoid more fines.\n\n"
-                    "Thank you,\nLibrary Management System"
-                ),
-                from_email=None,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
+
+def send_due_reminders(today=None, include_today=True, connection=None, queue=True):
+    """
+    📚 Reminders for every book that is due (or past due) and not yet returned.
+    """
+    today = today or date.today()
+    records = BorrowRecord.objects.filter(return_date__isnull=True)
+    records = records.filter(due_date__lte=today) if include_today else records.filter(due_date__lt=today)
+    return send_digests(
+        build_digests(not_yet_notified(records, 'due', today)),
+        subject="📚 Reminder: Books Due",
+        heading="This is a friendly reminder that the following books are due:",
+        closing="Please return them as soon as possible to avoid any late fines.",
+        connection=connection,
+        queue=queue,
+        kind='due',
+        today=today,
+    )
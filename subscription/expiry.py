@@ -0,0 +1,11 @@
+# ✅ FILE: subscription/expiry.py
+
+from datetime import date
+
+from .models import StudentSubscription
+
+
+def expire_subscriptions(today=None):
+    """⏳ Mark every lapsed subscription as expired in one indexed UPDATE; returns the count."""
+    today = today or date.today()
+    return StudentSubscription.objects.filter(status='active', end_date__lt=today).update(status='expired')
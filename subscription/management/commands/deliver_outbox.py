@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from subscription.outbox import OutboxDeliverer, claim_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox with a bounded worker pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due now, then exit')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent SMTP connections')
+        parser.add_argument('--rate', type=float, default=5, help='Max messages per second per recipient domain')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when idle')
+
+    def handle(self, *args, **options):
+        deliverer = OutboxDeliverer(workers=options['workers'], rate_per_host=options['rate'])
+        totals = [0, 0, 0]
+        try:
+            while True:
+                batch = claim_batch(options['batch_size'])
+                if not batch:
+                    if options['once']:
+                        break
+                    deliverer.close()  # Don't hold SMTP connections open while idle
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                counts = deliverer.deliver(batch)
+                totals = [t + c for t, c in zip(totals, counts)]
+                self.stdout.write(f"📧 Batch of {len(batch)}: {counts[0]} sent, {counts[1]} retrying, {counts[2]} dead")
+        finally:
+            deliverer.shutdown()
+
+        self.stdout.write(f"✅ Outbox drained: {totals[0]} sent, {totals[1]} retrying, {totals[2]} dead.")
@@ -0,0 +1,16 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from subscription.expiry import expire_subscriptions
+
+
+class Command(BaseCommand):
+    help = 'Mark subscriptions past their end date as expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Treat this day (YYYY-MM-DD) as today')
+
+    def handle(self, *args, **options):
+        expired = expire_subscriptions(options['date'])
+        self.stdout.write(f"✅ {expired} subscriptions expired.")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from subscription.bulk_jobs import claim_next_job, process_job
+
+
+class Command(BaseCommand):
+    help = 'Background worker that processes pending bulk book uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process pending jobs, then exit')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when idle')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write("📦 Bulk upload worker started.")
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            job = process_job(job, chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"{'✅' if job.status == 'done' else '❌'} Upload #{job.pk}: {job.status}, "
+                f"{job.processed_rows} rows ({job.failed_rows} failed) at {job.rows_per_second} rows/s"
+            )
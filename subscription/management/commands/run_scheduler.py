@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from subscription import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Long-lived scheduler: runs SCHEDULED_JOBS in-process on their cron schedules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=float, default=30.0, help='Seconds between schedule checks')
+        parser.add_argument('--run-now', metavar='JOB', help='Run one job immediately (still recorded in the ledger)')
+
+    def handle(self, *args, **options):
+        jobs = scheduler.load_jobs()
+
+        if options['run_now']:
+            job = next((j for j in jobs if j.name == options['run_now']), None)
+            if job is None:
+                raise CommandError(f"Unknown job {options['run_now']!r}. Known: {', '.join(j.name for j in jobs)}")
+            run = scheduler.run_job(job, timezone.now().replace(microsecond=0))
+            self.report(run)
+            return
+
+        self.stdout.write(f"📅 Scheduler started with {len(jobs)} jobs: " + ', '.join(
+            f"{j.name} [{j.schedule.expression}]" for j in jobs
+        ))
+        last_tick = timezone.now()
+        while True:
+            time.sleep(options['tick'])
+            close_old_connections()
+            now = timezone.now()
+            for run in scheduler.tick(jobs, last_tick, now):
+                self.report(run)
+            last_tick = now
+
+    def report(self, run):
+        if run is None:
+            self.stdout.write("⏭️ Skipped: this slot was already run.")
+            return
+        icon = '✅' if run.status == 'succeeded' else '❌'
+        self.stdout.write(f"{icon} {run.job} @ {run.scheduled_for:%Y-%m-%d %H:%M} {run.status} in {run.duration_ms} ms {run.detail[:200]}")
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iam', '0001_initial'),
+        ('subscription', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkupload',
+            name='created_books',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='error_file',
+            field=models.FileField(blank=True, upload_to='bulk_uploads/errors/'),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='failed_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='processed_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='rows_per_second',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='bulkupload',
+            name='total_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='bulkupload',
+            name='uploaded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='iam.staffprofile'),
+        ),
+    ]
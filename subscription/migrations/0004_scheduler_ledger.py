@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_change_event'),
+        ('subscription', '0003_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=100)),
+                ('scheduled_for', models.DateTimeField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('detail', models.TextField(blank=True)),
+            ],
+            options={
+                'unique_together': {('job', 'scheduled_for')},
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('notified_on', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('borrow_record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='books.borrowrecord')),
+            ],
+            options={
+                'unique_together': {('kind', 'borrow_record', 'notified_on')},
+            },
+        ),
+    ]
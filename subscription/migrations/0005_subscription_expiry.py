@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+def backfill_expiry(apps, schema_editor):
+    StudentSubscription = apps.get_model('subscription', 'StudentSubscription')
+    Student = apps.get_model('iam', 'Student')
+
+    subscriptions = list(StudentSubscription.objects.select_related('plan'))
+    for subscription in subscriptions:
+        subscription.end_date = subscription.start_date + timedelta(days=subscription.plan.duration_days)
+    StudentSubscription.objects.bulk_update(subscriptions, ['end_date'], batch_size=1000)
+    StudentSubscription.objects.filter(end_date__lt=date.today()).update(status='expired')
+
+    latest = (
+        StudentSubscription.objects.filter(student=models.OuterRef('pk'))
+        .order_by('-pk').values('pk')[:1]
+    )
+    Student.objects.update(current_subscription=models.Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iam', '0002_student_current_subscription'),
+        ('subscription', '0004_scheduler_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentsubscription',
+            name='end_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentsubscription',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('expired', 'Expired')], default='active', max_length=10),
+        ),
+        migrations.RunPython(backfill_expiry, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='studentsubscription',
+            name='end_date',
+            field=models.DateField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='studentsubscription',
+            index=models.Index(fields=['status', 'end_date'], name='subscription_status_end_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:51
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_heartbeat(apps, schema_editor):
+    # Jobs already running have only their start time to go on
+    BulkUpload = apps.get_model('subscription', 'BulkUpload')
+    BulkUpload.objects.filter(status='running').update(heartbeat_at=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0005_subscription_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkupload',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_heartbeat, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from iam.models import Student, StaffProfile
-from datetime import timedelta
+from datetime import date, timedelta
+from django.utils import timezone
 
 
 # 🔹 Subscription Plan
@@ -15,21 +16,53 @@ class SubscriptionPlan(models.Model):
         return self.name
 
 
+class StudentSubscriptionQuerySet(models.QuerySet):
+    def active(self, today=None):
+        return self.filter(status='active', end_date__gte=today or date.today())
+
+    def expiring_between(self, start, end):
+        return self.filter(status='active', end_date__range=(start, end))
+
+
 # 🔹 Student's Chosen Subscription
 class StudentSubscription(models.Model):
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('expired', 'Expired'),
+    ]
+
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     plan = models.ForeignKey(SubscriptionPlan, on_delete=models.CASCADE)
     start_date = models.DateField(auto_now_add=True)
+    end_date = models.DateField(blank=True)  # Stored so "active" / "expiring" are indexed lookups
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')  # Flipped by expire_subscriptions
 
-    @property
-    def end_date(self):
-        return self.start_date + timedelta(days=self.plan.duration_days)
+    objects = StudentSubscriptionQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.student.user_profile.user.username} subscribed to {self.plan.name}"
 
+    def is_active(self, today=None):
+        # end_date wins over status between midnight and the nightly sweep
+        return self.status == 'active' and self.end_date >= (today or date.today())
+
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        if not self.end_date:
+            self.end_date = (self.start_date or date.today()) + timedelta(days=self.plan.duration_days)
+        self.status = 'active' if self.end_date >= date.today() else 'expired'
+        super().save(*args, **kwargs)
+        if creating:
+            # 📌 Newest subscription becomes the student's current one
+            Student.objects.filter(pk=self.student_id).update(current_subscription=self)
+            if self._meta.get_field('student').is_cached(self):
+                self.student.current_subscription = self
+
     class Meta:
         unique_together = ('student', 'plan')  # Optional: prevent duplicate subscriptions
+        indexes = [
+            models.Index(fields=['status', 'end_date'], name='subscription_status_end_idx'),
+        ]
 
 
 # 🔹 Fine for Borrowed Books (from books app)
@@ -46,11 +79,104 @@ class Fine(models.Model):
         return f"{self.borrow_record.student.user_profile.user.username} - ₹{self.amount}"
 
 
-# 🔹 Bulk Book Uploads (by Staff only)
+# 🔹 Bulk Book Uploads (by Staff only) – processed by the bulk upload worker
 class BulkUpload(models.Model):
-    uploaded_by = models.ForeignKey(StaffProfile, on_delete=models.CASCADE)
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    uploaded_by = models.ForeignKey(StaffProfile, on_delete=models.CASCADE, null=True, blank=True)  # Empty for superusers
     upload_file = models.FileField(upload_to='bulk_uploads/')  # File path
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    created_books = models.PositiveIntegerField(default=0)
+    rows_per_second = models.FloatField(default=0)
+    error_file = models.FileField(upload_to='bulk_uploads/errors/', blank=True)  # CSV of skipped rows
+    message = models.TextField(blank=True)  # Fatal error, if any
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Bumped after every chunk while running
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        uploader = self.uploaded_by.user_profile.user.username if self.uploaded_by else 'admin'
+        return f"Upload by {uploader} on {self.uploaded_at}"
+
+    @property
+    def progress_percent(self):
+        if not self.total_rows:
+            return 100 if self.status == 'done' else 0
+        return min(100, round(100 * self.processed_rows / self.total_rows))
+
+
+# 🔹 Email Outbox (drained by the deliver_outbox worker)
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),  # Gave up after too many attempts
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)  # Empty = DEFAULT_FROM_EMAIL
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)  # Worker batch token
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
+
+
+# 🔹 Scheduler ledger: one row per job slot, so restarts/overlaps never run it twice
+class JobRun(models.Model):
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    job = models.CharField(max_length=100)
+    scheduled_for = models.DateTimeField()  # Cron slot this run belongs to
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    detail = models.TextField(blank=True)  # Job result or traceback
+
+    class Meta:
+        unique_together = ('job', 'scheduled_for')
+
+    def __str__(self):
+        return f"{self.job} @ {self.scheduled_for} ({self.status})"
+
+
+# 🔹 Notification ledger: one row per reminder kind, borrow record and day
+class NotificationLedger(models.Model):
+    kind = models.CharField(max_length=20)  # due_soon / overdue / due
+    borrow_record = models.ForeignKey('books.BorrowRecord', on_delete=models.CASCADE)
+    notified_on = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('kind', 'borrow_record', 'notified_on')
 
     def __str__(self):
-        return f"Upload by {self.uploaded_by.user_profile.user.username} on {self.uploaded_at}"
+        return f"{self.kind} reminder for record {self.borrow_record_id} on {self.notified_on}"
@@ -0,0 +1,151 @@
+# ✅ FILE: subscription/outbox.py
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 60  # seconds; 1m, 2m, 4m, 8m ...
+BACKOFF_MAX = 6 * 60 * 60
+STALE_CLAIM = timedelta(minutes=15)  # "sending" rows older than this belong to a dead worker
+
+
+def enqueue(to_email, subject, body, from_email=''):
+    return OutboxEmail.objects.create(to_email=to_email, subject=subject, body=body, from_email=from_email or '')
+
+
+def enqueue_many(messages):
+    """📥 ``messages`` are EmailMessage objects with a single recipient each."""
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(to_email=m.to[0], subject=m.subject, body=m.body, from_email=m.from_email or '')
+        for m in messages
+    ], batch_size=500)
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX))
+
+
+def claim_batch(limit=100, now=None):
+    """🔒 Mark up to ``limit`` due emails as ours; other workers skip them."""
+    now = now or timezone.now()
+    OutboxEmail.objects.filter(status='sending', claimed_at__lt=now - STALE_CLAIM).update(status='pending')
+
+    token = uuid.uuid4().hex
+    due_ids = list(
+        OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'pk').values_list('pk', flat=True)[:limit]
+    )
+    OutboxEmail.objects.filter(pk__in=due_ids, status='pending').update(
+        status='sending', claimed_by=token, claimed_at=now
+    )
+    return list(OutboxEmail.objects.filter(claimed_by=token, status='sending').order_by('pk'))
+
+
+class HostRateLimiter:
+    """⏱️ At most ``rate`` messages per second to each recipient domain."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class OutboxDeliverer:
+    """
+    📧 Sends claimed emails with a bounded thread pool.
+    Each thread keeps one open mail connection; all DB writes stay on the calling thread.
+    """
+
+    def __init__(self, workers=4, rate_per_host=5, connection_factory=None):
+        self.workers = workers
+        self.limiter = HostRateLimiter(rate_per_host)
+        self.connection_factory = connection_factory or (lambda: get_connection(fail_silently=False))
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers)  # Threads (and their connections) live across batches
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self.connection_factory()
+            with self.connections_lock:
+                self.connections.append(connection)
+        if getattr(connection, 'connection', None) is None:
+            # New, closed while idle, or closed after an error: reopen so the
+            # backend reuses it instead of opening a session per message
+            connection.open()
+        return connection
+
+    def _send(self, email):
+        self.limiter.wait(email.to_email.rpartition('@')[2].lower())
+        try:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email or settings.DEFAULT_FROM_EMAIL, [email.to_email],
+                connection=self._connection(),
+            )
+            message.send()
+        except Exception as e:
+            connection = getattr(self.local, 'connection', None)
+            if connection is not None:
+                try:
+                    connection.close()  # Start clean next time
+                except Exception:
+                    pass
+            return str(e) or e.__class__.__name__
+        return None
+
+    def deliver(self, emails):
+        """Returns (sent, retried, dead) counts."""
+        sent = retried = dead = 0
+        results = list(self.pool.map(self._send, emails))
+
+        now = timezone.now()
+        for email, error in zip(emails, results):
+            email.attempts += 1
+            email.claimed_by = ''
+            if error is None:
+                email.status, email.sent_at, email.last_error = 'sent', now, ''
+                sent += 1
+            elif email.attempts >= MAX_ATTEMPTS:
+                email.status, email.last_error = 'dead', error
+                dead += 1
+            else:
+                email.status, email.last_error = 'pending', error
+                email.next_attempt_at = now + backoff_delay(email.attempts)
+                retried += 1
+        OutboxEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'claimed_by', 'sent_at', 'last_error', 'next_attempt_at'], batch_size=500
+        )
+        return sent, retried, dead
+
+    def close(self):
+        # Each thread reopens its connection on its next send, so this is safe between batches
+        for connection in self.connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+        self.close()
@@ -1,21 +1,16 @@
-import schedule
-import time
 import os
+import sys
+
 import django
 
-# Django setup
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LibraryProject.settings')
+# Django setup (this file lives in subscription/, the project root is one level up)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms_project.settings')
 django.setup()
 
-def job():
-    print("🔁 Running send_reminders command...")
-    os.system("python manage.py send_reminders")
-
-# Run daily at 10:00 AM
-schedule.every().day.at("10:00").do(job)
-
-print("📅 Reminder Scheduler Started... Waiting for 10:00 AM")
+from django.core.management import call_command  # noqa: E402
 
-while True:
-    schedule.run_pending()
-    time.sleep(60)
+# 📅 Jobs run in-process on the schedules in settings.SCHEDULED_JOBS
+# (same as: python manage.py run_scheduler)
+if __name__ == '__main__':
+    call_command('run_scheduler')
@@ -0,0 +1,131 @@
+# ✅ FILE: subscription/scheduler.py
+
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import JobRun
+
+logger = logging.getLogger(__name__)
+
+CATCH_UP = timedelta(minutes=5)  # Slots missed by a late tick are still run within this window
+STALE_RUN = timedelta(hours=1)  # "running" ledger rows older than this belong to a crashed scheduler
+
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]  # minute hour day month weekday (0 = Sunday)
+
+
+class CronSchedule:
+    """
+    ⏰ Minimal 5-field cron expression: numbers, '*', 'a-b', 'a,b' and '/step'.
+    Like cron, when both day-of-month and day-of-week are restricted either one may match.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.allowed = [self._parse(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)]
+        self.either_day = not fields[2].startswith('*') and not fields[4].startswith('*')
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            base, _, step = part.partition('/')
+            step = int(step) if step else 1
+            if base == '*':
+                start, end = low, high
+            elif '-' in base:
+                start, end = (int(v) for v in base.split('-'))
+            else:
+                start = end = int(base)
+                if step > 1:
+                    end = high
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field {field!r} is out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment):
+        minute, hour, day, month, weekday = self.allowed
+        day_ok, weekday_ok = moment.day in day, (moment.isoweekday() % 7) in weekday
+        return (
+            moment.minute in minute and moment.hour in hour and moment.month in month
+            and ((day_ok or weekday_ok) if self.either_day else (day_ok and weekday_ok))
+        )
+
+
+class Job:
+    def __init__(self, name, schedule, task):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.task = import_string(task) if isinstance(task, str) else task
+
+
+def load_jobs(config=None):
+    config = settings.SCHEDULED_JOBS if config is None else config
+    return [Job(name, spec['schedule'], spec['task']) for name, spec in config.items()]
+
+
+def due_slots(job, since, until):
+    """Cron slots of ``job`` in (since, until], in local time, one per minute."""
+    slot = timezone.localtime(since).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    until = timezone.localtime(until)
+    while slot <= until:
+        if job.schedule.matches(slot):
+            yield slot
+        slot += timedelta(minutes=1)
+
+
+def run_job(job, slot):
+    """
+    ▶️ Run ``job`` for ``slot`` unless the ledger already has that slot.
+    Returns the JobRun, or None when another process owns / finished the slot.
+    """
+    try:
+        with transaction.atomic():
+            run = JobRun.objects.create(job=job.name, scheduled_for=slot)
+    except IntegrityError:
+        return None
+
+    started = time.monotonic()
+    try:
+        result = job.task()
+        run.status, run.detail = 'succeeded', '' if result is None else str(result)
+    except Exception:
+        run.status, run.detail = 'failed', traceback.format_exc()
+        logger.exception("Scheduled job %s failed", job.name)
+    run.duration_ms = int((time.monotonic() - started) * 1000)
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'detail', 'duration_ms', 'finished_at'])
+    logger.info("Scheduled job %s (%s) %s in %d ms", job.name, slot, run.status, run.duration_ms)
+    return run
+
+
+def fail_stale_runs(now=None):
+    """🧹 Close ledger rows a crashed scheduler left 'running' so they don't look in progress forever."""
+    now = now or timezone.now()
+    return JobRun.objects.filter(status='running', started_at__lt=now - STALE_RUN).update(
+        status='failed', detail='Abandoned: the scheduler stopped before the job finished', finished_at=now,
+    )
+
+
+def tick(jobs, last_tick, now=None):
+    """Run every slot that came due since the previous tick; returns the finished runs."""
+    now = now or timezone.now()
+    fail_stale_runs(now)
+    since = max(last_tick, now - CATCH_UP)
+    runs = []
+    for job in jobs:
+        for slot in due_slots(job, since, now):
+            run = run_job(job, slot)
+            if run:
+                runs.append(run)
+    return runs
@@ -1,3 +1,393 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.urls import reverse
+from django.utils import timezone
+
+from books.models import Book, BookCopy, BorrowRecord
+from iam.models import Student, UserProfile
+from .custom_email_tasks import send_due_reminders, send_due_soon_reminders, send_overdue_reminders
+from . import bulk_jobs, expiry, outbox, scheduler, views
+from lms_project.query_budget import QueryBudgetTestMixin
+from lms_project.sample_data import PASSWORD, build_library
+from .models import BulkUpload, JobRun, NotificationLedger, OutboxEmail, StudentSubscription, SubscriptionPlan
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkUploadJobTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        User.objects.create_superuser(username='admin', password='testpass', email='admin@example.com')
+        self.client.login(username='admin', password='testpass')
+
+    def upload(self, content):
+        upload = SimpleUploadedFile('books.csv', content.encode('utf-8'))
+        return self.client.post(reverse('subscription:upload_bulk_books'), {'upload_file': upload})
+
+    def test_upload_is_queued_and_processed_by_worker(self):
+        response = self.upload(
+            'title,author,isbn,category,description,published_date,copies\n'
+            'Dune,Frank Herbert,9780441013593,Sci-Fi,Desert planet,1965-08-01,2\n'
+            'Broken,row\n'
+        )
+        job = BulkUpload.objects.get()
+        self.assertRedirects(response, reverse('subscription:bulk_upload_status', args=[job.pk]))
+        self.assertEqual(job.status, 'pending')
+        self.assertFalse(Book.objects.exists())
+
+        call_command('run_bulk_upload_worker', once=True, stdout=io.StringIO())
+
+        progress = self.client.get(reverse('subscription:bulk_upload_progress', args=[job.pk])).json()
+        self.assertEqual(progress['status'], 'done')
+        self.assertEqual((progress['processed_rows'], progress['failed_rows'], progress['progress_percent']), (2, 1, 100))
+        self.assertEqual(Book.objects.get(isbn='9780441013593').available_copies, 2)
+
+        errors = self.client.get(reverse('subscription:bulk_upload_errors', args=[job.pk]))
+        self.assertIn(b'3,"expected 7 columns, got 2"', b''.join(errors.streaming_content))
+
+    def test_undecodable_file_marks_job_failed(self):
+        upload = SimpleUploadedFile('books.csv', b'title\n\xff\xfe\xfa\n')
+        self.client.post(reverse('subscription:upload_bulk_books'), {'upload_file': upload})
+        call_command('run_bulk_upload_worker', once=True, stdout=io.StringIO())
+        job = BulkUpload.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.message)
+
+    def test_jobs_left_running_by_a_dead_worker_are_reclaimed(self):
+        self.upload('title,author,isbn,category,description,published_date,copies\n')
+        job = BulkUpload.objects.get()
+        now = timezone.now()
+        BulkUpload.objects.filter(pk=job.pk).update(
+            status='running', started_at=now - timedelta(hours=3), heartbeat_at=now - timedelta(minutes=1),
+        )
+        self.assertIsNone(bulk_jobs.claim_next_job(now))  # A long upload that is still making progress
+
+        BulkUpload.objects.filter(pk=job.pk).update(heartbeat_at=now - bulk_jobs.STALE_JOB - timedelta(minutes=1))
+        claimed = bulk_jobs.claim_next_job(now)
+        self.assertEqual((claimed.pk, claimed.status, claimed.started_at), (job.pk, 'running', now))
+
+    def test_progress_keeps_the_heartbeat_fresh(self):
+        self.upload(
+            'title,author,isbn,category,description,published_date,copies\n'
+            'Dune,Frank Herbert,9780441013593,Sci-Fi,Desert planet,1965-08-01,1\n'
+        )
+        job = bulk_jobs.claim_next_job(timezone.now() - timedelta(hours=3))
+        job = bulk_jobs.process_job(job, chunk_size=1)
+        self.assertGreater(job.heartbeat_at, timezone.now() - timedelta(minutes=1))
+
+
+class ReminderDigestTest(TestCase):
+
+    def setUp(self):
+        book = Book.objects.create(title='Overdue Book', isbn='9789000000000', description='x', published_date=date(2015, 1, 1))
+        self.copies = [BookCopy.objects.create(book=book, copy_id=f'RM-{i}') for i in range(5)]
+        self.late = date.today() - timedelta(days=5)
+        self.borrow('dave', 'dave@example.com', self.copies[:3])
+        self.borrow('erin', 'erin@example.com', self.copies[3:4])
+        self.borrow('frank', '', self.copies[4:])
+
+    def borrow(self, username, email, copies):
+        user = User.objects.create_user(username=username, email=email, password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email=f'{username}@profile.test', emergency_contact_no='2')
+        student = Student.objects.create(user_profile=profile, roll_number=username, branch='CS', year=1)
+        for copy in copies:
+            BorrowRecord.objects.create(student=student, book_copy=copy, due_date=self.late)
+
+    def test_one_digest_per_student_from_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            report = send_overdue_reminders(queue=False)
+        self.assertEqual(len(queries), 2)  # one joined read + one ledger insert
+        self.assertEqual((report.sent, report.skipped, report.failed), (2, 1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        dave = next(m for m in mail.outbox if m.to == ['dave@example.com'])
+        self.assertEqual(dave.body.count('"Overdue Book"'), 3)
+
+    def test_trigger_view_reports_queued_reminders(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser(username='admin', password='testpass', email='admin@example.com')
+        request._messages = CookieStorage(request)
+        views.TriggerOverdueReminderView.as_view()(request)
+        self.assertEqual(
+            [str(m) for m in get_messages(request)],
+            ['⚠️ Queued 2 overdue reminders for books overdue 3+ days (1 skipped).'],
+        )
+        self.assertEqual((len(mail.outbox), OutboxEmail.objects.count()), (0, 2))
+
+    def test_failed_message_does_not_stop_the_batch(self):
+        class FlakyBackend(locmem.EmailBackend):
+            def send_messages(self, messages):
+                if any(m.to == ['dave@example.com'] for m in messages):
+                    raise ConnectionError('mailbox unavailable')
+                return super().send_messages(messages)
+
+        report = send_overdue_reminders(connection=FlakyBackend(), queue=False)
+        self.assertEqual((report.sent, report.skipped, report.failed), (1, 1, 1))
+        self.assertIn('dave', report.errors[0])
+
+    def test_failure_midway_through_a_call_sends_nothing_twice(self):
+        class MidwayBackend(locmem.EmailBackend):
+            # Delivers messages in order until erin's, like an SMTP connection dropping mid-call
+            def send_messages(self, messages):
+                for message in messages:
+                    if message.to == ['erin@example.com']:
+                        raise ConnectionError('connection lost')
+                    super().send_messages([message])
+                return len(messages)
+
+        report = send_overdue_reminders(connection=MidwayBackend(), queue=False)
+        self.assertEqual((report.sent, report.failed), (1, 1))
+        self.assertEqual([m.to for m in mail.outbox], [['dave@example.com']])
+        # Only dave's loans are marked as notified; erin's go out on the next run
+        self.assertEqual(
+            set(NotificationLedger.objects.values_list('borrow_record__student__user_profile__user__username', flat=True)),
+            {'dave'},
+        )
+
+    def test_nothing_due_sends_nothing(self):
+        report = send_due_soon_reminders()
+        self.assertEqual((report.sent, report.skipped, report.failed), (0, 0, 0))
+
+    def test_rerun_on_the_same_day_sends_nothing_new(self):
+        send_overdue_reminders(queue=False)
+        report = send_overdue_reminders(queue=False)
+        self.assertEqual((report.sent, report.skipped), (0, 1))  # frank still has no address
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(NotificationLedger.objects.filter(kind='overdue').count(), 4)
+
+        # A different kind of reminder is tracked separately
+        self.assertEqual(send_due_reminders().queued, 2)
+        self.assertEqual(send_due_reminders().queued, 0)
+
+
+class OutboxTest(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='librarian', password='testpass', is_staff=True)
+        user = User.objects.create_user(username='gina', email='gina@example.com', password='testpass')
+        profile = UserProfile.objects.create(user=user, phone_no='1', email='gina@profile.test', emergency_contact_no='2')
+        student = Student.objects.create(user_profile=profile, roll_number='G1', branch='CS', year=1)
+        book = Book.objects.create(title='Queued Book', isbn='9789100000000', description='x', published_date=date(2015, 1, 1))
+        copy = BookCopy.objects.create(book=book, copy_id='OB-1')
+        BorrowRecord.objects.create(student=student, book_copy=copy, due_date=date.today() - timedelta(days=2))
+
+    def test_view_enqueues_instead_of_sending(self):
+        self.client.login(username='librarian', password='testpass')
+        self.client.get(reverse('books:send_reminders'))
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.to_email, queued.status), ('gina@example.com', 'pending'))
+
+        call_command('deliver_outbox', once=True, workers=2, stdout=io.StringIO())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'sent')
+        self.assertEqual(mail.outbox[0].to, ['gina@example.com'])
+
+    def test_failures_back_off_then_dead_letter(self):
+        class DownBackend(locmem.EmailBackend):
+            def send_messages(self, messages):
+                raise ConnectionError('smtp down')
+
+        email = outbox.enqueue('gina@example.com', 'Hi', 'Body')
+        deliverer = outbox.OutboxDeliverer(workers=1, rate_per_host=0, connection_factory=DownBackend)
+        try:
+            for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+                batch = outbox.claim_batch(now=timezone.now() + timedelta(days=attempt))
+                self.assertEqual(deliverer.deliver(batch)[1:], (0, 1) if attempt == outbox.MAX_ATTEMPTS else (1, 0))
+        finally:
+            deliverer.shutdown()
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('dead', outbox.MAX_ATTEMPTS, 'smtp down'))
+        self.assertEqual(outbox.claim_batch(now=timezone.now() + timedelta(days=30)), [])
+
+    def test_connections_are_reopened_and_reused_after_idle_close(self):
+        class SessionBackend(locmem.EmailBackend):
+            # Like the SMTP backend: sends on a closed backend open a session just for that call
+            opened = 0
+
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.connection = None
+
+            def open(self):
+                if self.connection is None:
+                    SessionBackend.opened += 1
+                    self.connection = object()
+                    return True
+                return False
+
+            def close(self):
+                self.connection = None
+
+            def send_messages(self, messages):
+                new_session = self.open()
+                try:
+                    return super().send_messages(messages)
+                finally:
+                    if new_session:
+                        self.close()
+
+        deliverer = outbox.OutboxDeliverer(workers=1, rate_per_host=0, connection_factory=SessionBackend)
+        try:
+            for _ in range(2):
+                for n in range(3):
+                    outbox.enqueue(f'reader{n}@example.com', 'Hi', 'Body')
+                self.assertEqual(deliverer.deliver(outbox.claim_batch())[0], 3)
+                deliverer.close()  # What deliver_outbox does on an idle poll
+        finally:
+            deliverer.shutdown()
+        self.assertEqual(SessionBackend.opened, 2)  # One session per batch, not one per message
+
+    def test_claimed_rows_are_not_claimed_twice(self):
+        outbox.enqueue('gina@example.com', 'Hi', 'Body')
+        self.assertEqual(len(outbox.claim_batch()), 1)
+        self.assertEqual(outbox.claim_batch(), [])
+
+    def test_host_rate_limit_spaces_sends(self):
+        limiter = outbox.HostRateLimiter(rate=20)
+        started = time.monotonic()
+        for _ in range(3):
+            limiter.wait('example.com')
+        limiter.wait('other.org')
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class SchedulerTest(TestCase):
+
+    def test_cron_expression_parsing(self):
+        cron = scheduler.CronSchedule('*/15 9-17 * * 1-5')
+        self.assertTrue(cron.matches(timezone.datetime(2024, 5, 6, 9, 30)))  # Monday
+        self.assertFalse(cron.matches(timezone.datetime(2024, 5, 6, 9, 31)))
+        self.assertFalse(cron.matches(timezone.datetime(2024, 5, 5, 9, 30)))  # Sunday
+        self.assertEqual(scheduler.CronSchedule('0 0,12 * * *').allowed[1], {0, 12})
+        with self.assertRaises(ValueError):
+            scheduler.CronSchedule('61 * * * *')
+
+    def test_day_of_month_and_day_of_week_are_ored_when_both_are_set(self):
+        cron = scheduler.CronSchedule('0 9 1 * 1')
+        self.assertTrue(cron.matches(timezone.datetime(2024, 5, 1, 9, 0)))  # the 1st, a Wednesday
+        self.assertTrue(cron.matches(timezone.datetime(2024, 5, 6, 9, 0)))  # a Monday
+        self.assertFalse(cron.matches(timezone.datetime(2024, 5, 7, 9, 0)))
+        self.assertFalse(scheduler.CronSchedule('0 9 * * 1').matches(timezone.datetime(2024, 5, 1, 9, 0)))
+        self.assertFalse(scheduler.CronSchedule('0 9 1 * *').matches(timezone.datetime(2024, 5, 6, 9, 0)))
+
+    def test_slot_runs_only_once(self):
+        calls = []
+        job = scheduler.Job('ping', '* * * * *', lambda: calls.append(1) or 'pong')
+        slot = timezone.now().replace(second=0, microsecond=0)
+
+        run = scheduler.run_job(job, slot)
+        self.assertEqual((run.status, run.detail), ('succeeded', 'pong'))
+        self.assertIsNotNone(run.duration_ms)
+        self.assertIsNone(scheduler.run_job(job, slot))
+        self.assertEqual(len(calls), 1)
+
+    def test_tick_runs_missed_slots_and_records_failures(self):
+        def broken():
+            raise RuntimeError('boom')
+
+        job = scheduler.Job('broken', '* * * * *', broken)
+        now = timezone.now().replace(second=30, microsecond=0)
+        with self.assertLogs('subscription.scheduler', 'ERROR'):
+            runs = scheduler.tick([job], now - timedelta(minutes=3), now)
+        self.assertEqual(len(runs), 3)
+        self.assertTrue(all(run.status == 'failed' and 'boom' in run.detail for run in runs))
+        self.assertEqual(scheduler.tick([job], now - timedelta(minutes=3), now), [])
+        self.assertEqual(JobRun.objects.count(), 3)
+
+    def test_tick_closes_runs_left_running_by_a_crash(self):
+        now = timezone.now()
+        crashed = JobRun.objects.create(job='ping', scheduled_for=now, started_at=now - timedelta(hours=2))
+        live = JobRun.objects.create(job='ping', scheduled_for=now - timedelta(minutes=1), started_at=now)
+        scheduler.tick([], now, now)
+        crashed.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((crashed.status, crashed.finished_at), ('failed', now))
+        self.assertIn('Abandoned', crashed.detail)
+        self.assertEqual(live.status, 'running')
+
+
+class SubscriptionExpiryTest(TestCase):
+
+    def setUp(self):
+        self.plan = SubscriptionPlan.objects.create(name='Monthly', max_books=3, duration_days=30, price=100)
+        self.students = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'sub{i}', password='testpass')
+            profile = UserProfile.objects.create(user=user, phone_no='1', email=f'sub{i}@example.com', emergency_contact_no='2')
+            self.students.append(Student.objects.create(user_profile=profile, roll_number=f'S{i}', branch='CS', year=1))
+
+    def test_end_date_and_current_pointer_are_stored(self):
+        subscription = StudentSubscription.objects.create(student=self.students[0], plan=self.plan)
+        self.assertEqual(subscription.end_date, date.today() + timedelta(days=30))
+        self.assertEqual(subscription.status, 'active')
+        self.students[0].refresh_from_db()
+        self.assertEqual(self.students[0].current_subscription, subscription)
+
+    def test_sweep_expires_in_bulk(self):
+        today = date.today()
+        for student, days_left in zip(self.students, (-2, 0, 5)):
+            subscription = StudentSubscription.objects.create(student=student, plan=self.plan)
+            StudentSubscription.objects.filter(pk=subscription.pk).update(end_date=today + timedelta(days=days_left))
+
+        self.assertEqual(StudentSubscription.objects.expiring_between(today, today + timedelta(days=7)).count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(expiry.expire_subscriptions(today), 1)
+        self.assertEqual(expiry.expire_subscriptions(today), 0)
+        self.assertEqual(StudentSubscription.objects.active(today).count(), 2)
+        self.assertEqual(
+            StudentSubscription.objects.get(student=self.students[0]).status, 'expired'
+        )
+
+
+class SubscriptionQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """⏱️ Every subscription URL against a generated library."""
+
+    BUDGETS = {
+        'select_plan': ('student', 4),
+        'my_subscription': ('student', 3),
+        'pay_fine': ('student', 4),
+        'upload_bulk_books': ('staff', 4),
+        'bulk_upload_status': ('staff', 3),
+        'bulk_upload_progress': ('staff', 3),
+        'bulk_upload_errors': ('staff', 3),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = build_library(students=30, books=100)
+        cls.job = BulkUpload.objects.create(upload_file='bulk_uploads/books.csv', status='done')
+
+    def test_every_url_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({p.name for p in urlpatterns}, set(self.BUDGETS))
+
+    def test_urls_stay_within_budget(self):
+        from .urls import urlpatterns
+        for pattern in urlpatterns:
+            who, queries = self.BUDGETS[pattern.name]
+            user = self.library.staff_user if who == 'staff' else self.library.student_user
+            kwargs = {'job_id': self.job.pk} if 'job_id' in pattern.pattern.converters else {}
+            with self.subTest(pattern.name):
+                self.client.login(username=user.username, password=PASSWORD)
+                self.assertQueryBudget(reverse(f'subscription:{pattern.name}', kwargs=kwargs), queries)
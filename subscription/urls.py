@@ -4,6 +4,9 @@ from .views import (
     MySubscriptionView,
     PayFineView,
     UploadBulkBooksView,
+    BulkUploadStatusView,
+    BulkUploadProgressView,
+    BulkUploadErrorsView,
 )
 
 app_name = 'subscription'
@@ -13,4 +16,7 @@ urlpatterns = [
     path('my-subscription/', MySubscriptionView.as_view(), name='my_subscription'),
     path('pay-fine/', PayFineView.as_view(), name='pay_fine'),
     path('upload-bulk-books/', UploadBulkBooksView.as_view(), name='upload_bulk_books'),
+    path('bulk-uploads/<int:job_id>/', BulkUploadStatusView.as_view(), name='bulk_upload_status'),
+    path('bulk-uploads/<int:job_id>/progress/', BulkUploadProgressView.as_view(), name='bulk_upload_progress'),
+    path('bulk-uploads/<int:job_id>/errors/', BulkUploadErrorsView.as_view(), name='bulk_upload_errors'),
 ]
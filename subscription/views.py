@@ -1,50 +1,44 @@
 from .custom_email_tasks import send_due_soon_reminders, send_overdue_reminders
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, JsonResponse
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.utils import timezone
 from django.views import View
 from django.views.generic import TemplateView, FormView
-import csv, io
-from .models import SubscriptionPlan, StudentSubscription, Fine, BulkUpload
-from iam.models import Student
+from .models import SubscriptionPlan, StudentSubscription, BulkUpload
+from iam.models import StaffProfile
 from .forms import FinePaymentForm
-from books.models import Book, Author, Category, BookCopy 
+from books.models import Fine  # Fines are accrued on books.Fine
+from books import dashboard
 
 # 🔹 Select Subscription Plan
 class SelectSubscriptionPlanView(LoginRequiredMixin, View):
     def get(self, request):
         plans = SubscriptionPlan.objects.all()
-        try:
-            student = Student.objects.get(user_profile__user=request.user)
-        except Student.DoesNotExist:
+        if not request.patron.is_student:
             return render(request, 'books/error.html', {'message': '⚠️ Student profile not found.'})
 
         return render(request, 'subscription/select_plan.html', {'plans': plans})
 
     def post(self, request):
         plans = SubscriptionPlan.objects.all()
-        try:
-            student = Student.objects.get(user_profile__user=request.user)
-        except Student.DoesNotExist:
+        student = request.patron.student
+        if student is None:
             return render(request, 'books/error.html', {'message': '⚠️ Student profile not found.'})
 
         plan_id = request.POST.get('plan_id')
         if plan_id:
             plan = get_object_or_404(SubscriptionPlan, id=plan_id)
 
-            active_sub = StudentSubscription.objects.filter(
-                student=student
-            ).order_by('-start_date').first()
+            active_sub = request.patron.subscription
 
-            if active_sub:
-                expiry = active_sub.start_date + timezone.timedelta(days=active_sub.plan.duration_days)
-                if expiry >= timezone.now().date():
-                    messages.warning(
-                        request,
-                        f'⚠️ You already have an active plan: {active_sub.plan.name} valid till {expiry}.'
-                    )
-                    return redirect('subscription:my_subscription')
+            if active_sub and active_sub.is_active():
+                messages.warning(
+                    request,
+                    f'⚠️ You already have an active plan: {active_sub.plan.name} valid till {active_sub.end_date}.'
+                )
+                return redirect('subscription:my_subscription')
 
             StudentSubscription.objects.filter(student=student).delete()
 
@@ -65,12 +59,7 @@ class MySubscriptionView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        try:
-            student = Student.objects.get(user_profile__user=self.request.user)
-            subscription = StudentSubscription.objects.filter(student=student).last()
-            context['subscription'] = subscription
-        except Student.DoesNotExist:
-            return render(self.request, 'books/error.html', {'message': '⚠️ Student profile not found.'})
+        context['subscription'] = self.request.patron.subscription
         return context
 
 # 🔹 Pay Fines
@@ -80,95 +69,86 @@ class PayFineView(LoginRequiredMixin, FormView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        try:
-            student = Student.objects.get(user_profile__user=self.request.user)
-            unpaid_fines = Fine.objects.filter(borrow_record__student=student, paid=False)
-            context['fines'] = unpaid_fines
-        except Student.DoesNotExist:
-            return render(self.request, 'books/error.html', {'message': '⚠️ Student profile not found.'})
+        student = self.request.patron.student
+        if student is not None:
+            context['fines'] = Fine.objects.filter(
+                student=student, paid=False,
+            ).select_related('borrow_record__book_copy__book')
         return context
 
     def form_valid(self, form):
         record_id = form.cleaned_data['record_id']
         try:
-            fine = Fine.objects.get(borrow_record__id=record_id)
+            # ✅ Only your own fines; anyone else's record id is "not found"
+            fine = Fine.objects.get(borrow_record__id=record_id, student=self.request.patron.student)
+            fine.paid_amount = fine.amount
             fine.paid = True
             fine.save()
+            dashboard.invalidate(fine.student_id)
             messages.success(self.request, '✅ Fine paid successfully.')
         except Fine.DoesNotExist:
             messages.error(self.request, '❌ Fine record not found.')
         return redirect('subscription:pay_fine')
 
-# ✅🔹 Upload Bulk Books (with CSV Parsing)
-class UploadBulkBooksView(LoginRequiredMixin, UserPassesTestMixin, View):
+# ✅🔹 Staff-only access for bulk uploads
+class StaffUploadMixin(LoginRequiredMixin, UserPassesTestMixin):
     def test_func(self):
         user = self.request.user
         is_staff_user = hasattr(user, 'userprofile') and hasattr(user.userprofile, 'staffprofile')
         return is_staff_user or user.is_superuser  # Allow staff OR admin
 
-    def handle_uploaded_file(self, uploaded_file):
-        decoded_file = uploaded_file.read().decode('utf-8')
-        io_string = io.StringIO(decoded_file)
-        reader = csv.reader(io_string)
-        next(reader)  # skip header row
-        return reader
 
+# ✅🔹 Upload Bulk Books (queued, processed by run_bulk_upload_worker)
+class UploadBulkBooksView(StaffUploadMixin, View):
     def get(self, request):
-        return render(request, 'subscription/upload_bulk_books.html')
+        return render(request, 'subscription/upload_bulk_books.html', {
+            'recent_uploads': BulkUpload.objects.order_by('-uploaded_at')[:10],
+        })
 
     def post(self, request):
-        if not request.FILES.get('upload_file'):
+        uploaded_file = request.FILES.get('upload_file')
+        if not uploaded_file or not uploaded_file.name.lower().endswith('.csv'):
             return render(request, 'subscription/upload_bulk_books.html', {
                 'message': '❌ Please upload a valid CSV file.'
             })
 
-        uploaded_file = request.FILES['upload_file']
-
-        try:
-            reader = self.handle_uploaded_file(uploaded_file)
-        except Exception as e:
-            return render(request, 'subscription/upload_bulk_books.html', {
-                'message': f'❌ Failed to read uploaded file: {str(e)}'
-            })
-
-        added_books = 0
-        for row in reader:
-            try:
-                title, author_name, isbn, category_name, description, published_date, copies = row
-
-                author, _ = Author.objects.get_or_create(name=author_name.strip())
-                category, _ = Category.objects.get_or_create(
-                    name=category_name.strip(), defaults={'location': 'Rack A'}
-                )
-
-                book, created = Book.objects.get_or_create(
-                    title=title.strip(),
-                    isbn=isbn.strip(),
-                    defaults={
-                        'description': description.strip(),
-                        'published_date': published_date.strip(),
-                        'category': category
-                    }
-                )
-
-                book.authors.add(author)
-
-                if created:
-                    for i in range(int(copies)):
-                        BookCopy.objects.create(
-                            book=book,
-                            copy_id=f"{isbn.strip()}-{i+1}",
-                            status='available'
-                        )
-
-                added_books += 1
-
-            except Exception as e:
-                print(f"⚠️ Error processing row {row} → {e}")
-                continue
-
-        messages.success(request, f'✅ Successfully uploaded {added_books} books.')
-        return redirect('subscription:upload_bulk_books')
+        job = BulkUpload.objects.create(
+            uploaded_by=StaffProfile.objects.filter(user_profile__user=request.user).first(),
+            upload_file=uploaded_file,
+        )
+        messages.success(request, f'✅ Upload #{job.pk} queued. Progress updates below.')
+        return redirect('subscription:bulk_upload_status', job_id=job.pk)
+
+
+class BulkUploadStatusView(StaffUploadMixin, View):
+    def get(self, request, job_id):
+        job = get_object_or_404(BulkUpload, id=job_id)
+        return render(request, 'subscription/bulk_upload_status.html', {'job': job})
+
+
+class BulkUploadProgressView(StaffUploadMixin, View):
+    def get(self, request, job_id):
+        job = get_object_or_404(BulkUpload, id=job_id)
+        return JsonResponse({
+            'id': job.pk,
+            'status': job.status,
+            'total_rows': job.total_rows,
+            'processed_rows': job.processed_rows,
+            'failed_rows': job.failed_rows,
+            'created_books': job.created_books,
+            'rows_per_second': job.rows_per_second,
+            'progress_percent': job.progress_percent,
+            'message': job.message,
+            'has_errors': bool(job.error_file),
+        })
+
+
+class BulkUploadErrorsView(StaffUploadMixin, View):
+    def get(self, request, job_id):
+        job = get_object_or_404(BulkUpload, id=job_id)
+        if not job.error_file:
+            raise Http404('No error report for this upload.')
+        return FileResponse(job.error_file.open('rb'), as_attachment=True, filename=f'upload_{job.pk}_errors.csv')
 
 # ✅🔹 Admin-triggered Reminder (Button) Views
 class TriggerDueReminderView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -176,8 +156,8 @@ class TriggerDueReminderView(LoginRequiredMixin, UserPassesTestMixin, View):
         return self.request.user.is_superuser  # Admin only
 
     def get(self, request):
-        send_due_soon_reminders()
-        messages.success(request, "📧 Sent due-date reminders for tomorrow.")
+        report = send_due_soon_reminders()
+        messages.success(request, f"📧 Queued {report.queued} due-date reminders for tomorrow ({report.skipped} skipped).")
         return redirect('subscription:my_subscription')
 
 
@@ -186,6 +166,6 @@ class TriggerOverdueReminderView(LoginRequiredMixin, UserPassesTestMixin, View):
         return self.request.user.is_superuser  # Admin only
 
     def get(self, request):
-        send_overdue_reminders()
-        messages.success(request, "⚠️ Sent overdue reminders for books overdue 3+ days.")
+        report = send_overdue_reminders()
+        messages.success(request, f"⚠️ Queued {report.queued} overdue reminders for books overdue 3+ days ({report.skipped} skipped).")
         return redirect('subscription:my_subscription')